@@ -0,0 +1,386 @@
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+
+from scripts.synthetic import DatasetSpec, generate_dataset
+
+TIERS = {
+    "small": DatasetSpec(rows=1_000, gremlin_rate=0.001),
+    "medium": DatasetSpec(rows=20_000, gremlin_rate=0.001),
+    "large": DatasetSpec(rows=200_000, gremlin_rate=0.001),
+}
+
+ENTRY_POINTS = (
+    "xml_to_csv",
+    "convert_excel_to_csv",
+    "process_and_generate_report",
+    "generate_unique_values_report",
+    "generate_bar_charts",
+)
+
+# Synthetic input format read by each entry point
+INPUT_FORMATS = {
+    "xml_to_csv": "xml",
+    "convert_excel_to_csv": "xlsx",
+    "process_and_generate_report": "csv",
+    "generate_unique_values_report": "csv",
+}
+
+# Modules whose import time is tracked, from the command line down to the report code
+STARTUP_MODULES = ("scripts.cli", "scripts.paths", "scripts.convert_to_csv", "scripts.data_processing")
+
+# Commands of `python -m scripts` timed to their first line of output, as
+# (name, arguments); {xml_dir}, {csv_dir}, {csv_path} and {output_dir} are filled in
+STARTUP_COMMANDS = (
+    ("help", ["--help"]),
+    ("convert", ["convert", "xml", "{xml_dir}", "{output_dir}", "--force"]),
+    ("report", ["report", "{csv_dir}", "--force"]),
+    ("report --html", ["report", "{csv_dir}", "--html", "--force"]),
+    ("unique-values", ["unique-values", "{csv_path}", "material_0"]),
+    ("preview", ["preview", "{csv_dir}", "--seconds", "10"]),
+)
+
+# The repository root, which must be on the path of the interpreters started here
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB.
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(entry_point, workspace, input_path, spec, engine="pandas"):
+    """
+    Runs one entry point on a synthetic input and measures it. Runs in a fresh process,
+    so the peak memory is that of this case alone.
+
+    Parameters:
+        entry_point (str): One of `ENTRY_POINTS`.
+        workspace (str): Directory holding the `data` directory; reports are written next to it.
+        input_path (str): Synthetic input file, or None for `generate_bar_charts`.
+        spec (DatasetSpec): Shape of the synthetic data.
+        engine (str): CSV reader of the report entry points, "pandas" or "pyarrow".
+
+    Returns:
+        dict: Wall time in seconds and peak RSS in MB.
+    """
+    import pandas as pd
+    from scripts.charts import ChartRenderer
+    from scripts.convert_to_csv import convert_excel_to_csv, xml_to_csv
+    from scripts.data_processing import (
+        generate_bar_charts, generate_unique_values_report, process_and_generate_report
+    )
+
+    # Reports locate the `data` directory from the working directory
+    os.chdir(workspace)
+    shutil.rmtree(os.path.join(workspace, "reports"), ignore_errors=True)
+    output_directory = os.path.join(workspace, "output", entry_point)
+    shutil.rmtree(output_directory, ignore_errors=True)
+
+    if entry_point == "generate_bar_charts":
+        chart_df = pd.DataFrame({
+            "Column": [f"column_{i}" for i in range(spec.columns * 4)],
+            "Unique Count": [(i * 7919) % spec.rows for i in range(spec.columns * 4)],
+        })
+        renderer = ChartRenderer()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        if entry_point == "xml_to_csv":
+            xml_to_csv(os.path.dirname(input_path), output_directory, force=True)
+        elif entry_point == "convert_excel_to_csv":
+            convert_excel_to_csv(os.path.dirname(input_path), output_directory, force=True)
+        elif entry_point == "process_and_generate_report":
+            process_and_generate_report(os.path.dirname(input_path), force=True, engine=engine)
+        elif entry_point == "generate_unique_values_report":
+            columns = [col for col in pd.read_csv(input_path, nrows=0).columns if col.startswith("material_")]
+            generate_unique_values_report(input_path, columns, engine=engine)
+        elif entry_point == "generate_bar_charts":
+            generate_bar_charts(chart_df, "Column", "Unique Count", base_title="Benchmark", renderer=renderer)
+        else:
+            raise ValueError(f"Unknown entry point '{entry_point}', use one of: {', '.join(ENTRY_POINTS)}.")
+    seconds = time.perf_counter() - start
+
+    return {"seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def _run_in_fresh_process(*args):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, *args).result()
+
+
+def run_benchmarks(tiers=("small", "medium"), entry_points=ENTRY_POINTS, repeat=1, overrides=None, workspace=None,
+                   engine="pandas"):
+    """
+    Generates synthetic inputs for each size tier and measures every entry point on them.
+
+    Parameters:
+        tiers (tuple): Names of the tiers in `TIERS` to run.
+        entry_points (tuple): Entry points to measure, see `ENTRY_POINTS`.
+        repeat (int): Number of runs per case; the fastest one is reported.
+        overrides (dict): Optional `DatasetSpec` fields applied to every tier, e.g. {"columns": 50}.
+        workspace (str): Optional directory for the synthetic data. A temporary one is used
+            and removed afterwards when not given.
+        engine (str): CSV reader of the report entry points, "pandas" or "pyarrow".
+
+    Returns:
+        dict: Run information and one result per entry point and tier.
+    """
+    unknown = [name for name in entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        raise ValueError(f"Unknown entry points: {', '.join(unknown)}")
+    unknown = [tier for tier in tiers if tier not in TIERS]
+    if unknown:
+        raise ValueError(f"Unknown tiers: {', '.join(unknown)}, use some of: {', '.join(TIERS)}")
+
+    keep_workspace = workspace is not None
+    workspace = workspace or tempfile.mkdtemp(prefix="benchmark_")
+    specs = {tier: replace(TIERS[tier], **(overrides or {})) for tier in tiers}
+
+    results = []
+    try:
+        for tier, spec in specs.items():
+            print(f"Generating {tier} dataset: {spec}")
+            formats = sorted({INPUT_FORMATS[name] for name in entry_points if name in INPUT_FORMATS})
+            paths = generate_dataset(os.path.join(workspace, "data", tier), spec, formats=formats)
+
+            for entry_point in entry_points:
+                input_path = paths.get(INPUT_FORMATS.get(entry_point))
+                result = {
+                    "entry_point": entry_point,
+                    "tier": tier,
+                    "rows": spec.columns * 4 if entry_point == "generate_bar_charts" else spec.rows,
+                    "input_mb": os.path.getsize(input_path) / (1024 * 1024) if input_path else None,
+                    "runs": [],
+                    "error": None,
+                }
+                try:
+                    for _ in range(repeat):
+                        result["runs"].append(_run_in_fresh_process(entry_point, workspace, input_path, spec, engine))
+                except Exception as e:
+                    result["error"] = str(e)
+
+                if result["runs"]:
+                    seconds = min(run["seconds"] for run in result["runs"])
+                    result.update(
+                        seconds=seconds,
+                        rows_per_s=result["rows"] / seconds if seconds else None,
+                        mb_per_s=result["input_mb"] / seconds if seconds and result["input_mb"] else None,
+                        peak_rss_mb=max(run["peak_rss_mb"] for run in result["runs"]),
+                    )
+                print(format_result(result))
+                results.append(result)
+    finally:
+        if not keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "engine": engine,
+        "tiers": {tier: asdict(spec) for tier, spec in specs.items()},
+        "results": results,
+    }
+
+
+def _python_env():
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_import(module, repeat=3):
+    """
+    Measures how long importing a module takes in a fresh interpreter, the fastest of
+    `repeat` runs. The start-up of the interpreter itself is measured alongside, with
+    an empty program, and subtracted.
+
+    Returns:
+        float: Import time in seconds.
+    """
+    def fastest(code):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], env=_python_env(), check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    return max(fastest(f"import {module}") - fastest("pass"), 0.0)
+
+
+def measure_command(args, cwd, repeat=1):
+    """
+    Runs `python -m scripts` with the given arguments and measures the time to its first
+    line of output and to its exit, the fastest of `repeat` runs.
+
+    Returns:
+        dict: "first_output_s" and "seconds", and "error" with the end of stderr when it fails.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", "scripts", *args], cwd=cwd, env=_python_env(),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        first_line = process.stdout.readline()
+        first_output = time.perf_counter() - start if first_line else None
+        process.stdout.read()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            return {"first_output_s": None, "seconds": None, "error": stderr.strip().splitlines()[-1:]}
+        runs.append({"first_output_s": first_output, "seconds": time.perf_counter() - start})
+    return {
+        "first_output_s": min((run["first_output_s"] for run in runs if run["first_output_s"] is not None),
+                              default=None),
+        "seconds": min(run["seconds"] for run in runs),
+        "error": None,
+    }
+
+
+def run_startup_benchmarks(repeat=3, workspace=None):
+    """
+    Measures the start-up of the command line: the import time of `STARTUP_MODULES`, and
+    the time to first output and total time of `STARTUP_COMMANDS` on a small synthetic
+    dataset, so that a heavy dependency imported too early shows up as a regression.
+
+    Parameters:
+        repeat (int): Number of runs per measure; the fastest one is reported.
+        workspace (str): Optional directory for the synthetic data. A temporary one is used
+            and removed afterwards when not given.
+
+    Returns:
+        dict: Import times in seconds per module, and one result per command.
+    """
+    keep_workspace = workspace is not None
+    workspace = workspace or tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        imports = {}
+        for module in STARTUP_MODULES:
+            imports[module] = measure_import(module, repeat)
+            print(f"  import {module:<30} {imports[module]:8.3f}s")
+
+        paths = generate_dataset(os.path.join(workspace, "data", "startup"), TIERS["small"], formats=["xml", "csv"])
+        placeholders = {
+            "xml_dir": os.path.dirname(paths["xml"]),
+            "csv_dir": os.path.dirname(paths["csv"]),
+            "csv_path": paths["csv"],
+            "output_dir": os.path.join(workspace, "output", "startup"),
+        }
+        commands = []
+        for name, args in STARTUP_COMMANDS:
+            result = measure_command([arg.format(**placeholders) for arg in args], workspace, repeat)
+            result["command"] = name
+            print(format_startup_result(result))
+            commands.append(result)
+    finally:
+        if not keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    return {"imports": imports, "commands": commands}
+
+
+def format_startup_result(result):
+    if result["error"]:
+        return f"  {result['command']:<37} failed: {' '.join(result['error'])}"
+    first_output = f"{result['first_output_s']:8.3f}s" if result["first_output_s"] is not None else " " * 9
+    return f"  {result['command']:<37} {first_output} to first output {result['seconds']:8.3f}s total"
+
+
+def format_result(result):
+    if result["error"]:
+        return f"  {result['entry_point']:<32} {result['tier']:<8} failed: {result['error']}"
+    mb_per_s = f"{result['mb_per_s']:8.2f} MB/s" if result["mb_per_s"] else " " * 13
+    return (
+        f"  {result['entry_point']:<32} {result['tier']:<8} {result['seconds']:8.2f}s "
+        f"{result['rows_per_s']:12.0f} rows/s {mb_per_s} {result['peak_rss_mb']:8.1f} MB peak"
+    )
+
+
+def compare_results(previous, current):
+    """
+    Prints how the time and peak memory of each case changed between two runs.
+
+    Parameters:
+        previous (dict): Results of an earlier run, as returned by `run_benchmarks`.
+        current (dict): Results of this run.
+    """
+    before = {(r["entry_point"], r["tier"]): r for r in previous["results"] if not r["error"]}
+    print(f"\nCompared with the run of {previous['created']}:")
+    for result in current["results"]:
+        old = before.get((result["entry_point"], result["tier"]))
+        if old is None or result["error"]:
+            continue
+        print(
+            f"  {result['entry_point']:<32} {result['tier']:<8} "
+            f"{old['seconds']:8.2f}s -> {result['seconds']:8.2f}s ({result['seconds'] / old['seconds']:5.2f}x)  "
+            f"{old['peak_rss_mb']:8.1f} -> {result['peak_rss_mb']:8.1f} MB"
+        )
+
+    if "startup" in previous and "startup" in current:
+        for module, seconds in current["startup"]["imports"].items():
+            old = previous["startup"]["imports"].get(module)
+            if old is not None:
+                print(f"  import {module:<30} {old:8.3f}s -> {seconds:8.3f}s")
+        before = {r["command"]: r for r in previous["startup"]["commands"] if not r["error"]}
+        for result in current["startup"]["commands"]:
+            old = before.get(result["command"])
+            if old is None or result["error"]:
+                continue
+            print(f"  {result['command']:<37} {old['seconds']:8.3f}s -> {result['seconds']:8.3f}s total")
+
+
+def run_benchmark_suite(tiers=("small", "medium"), entry_points=ENTRY_POINTS, repeat=1, overrides=None,
+                        workspace=None, engine="pandas", startup=False, output=None, compare=None):
+    """
+    Runs the benchmarks, see `run_benchmarks`, and saves their results as JSON.
+
+    Parameters:
+        tiers, entry_points, repeat, overrides, workspace, engine: See `run_benchmarks`.
+        startup (bool): Also measure import times and command start-up, see `run_startup_benchmarks`.
+        output (str): JSON file for the results (default: reports/benchmarks/benchmark_<time>.json).
+        compare (str): Optional JSON results of an earlier run to compare with.
+
+    Returns:
+        str: Path of the JSON results.
+    """
+    results = run_benchmarks(tiers, entry_points, repeat, overrides, workspace, engine)
+    if startup:
+        print("Measuring start-up")
+        results["startup"] = run_startup_benchmarks(max(repeat, 3), workspace)
+
+    output = output or os.path.join("reports", "benchmarks", f"benchmark_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Benchmark results saved: {output}")
+
+    if compare:
+        with open(compare, "r") as previous_file:
+            compare_results(json.load(previous_file), results)
+    return output
+
+
+if __name__ == "__main__":
+    from scripts.cli import main
+
+    # Same options as `python -m scripts benchmark`
+    main(["benchmark", *sys.argv[1:]])
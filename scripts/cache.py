@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-256 of a file's content, reading it in chunks.
+
+    Parameters:
+        file_path (str): Path to the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Records, for each input processed into an output directory, its size, mtime and
+    content hash together with the settings used and the outputs produced, so that
+    later runs can skip inputs that have not changed.
+
+    The content hash is only recomputed when the size or mtime of an input differs
+    from the recorded one, so checking an unchanged directory costs one `stat` per file.
+    Hashes are kept by size and mtime for the life of the manifest, so an input hashed
+    by `lookup` is not read again when it is recorded.
+    """
+
+    def __init__(self, manifest_path):
+        self.path = manifest_path
+        self.entries = {}
+        self._digests = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as manifest_file:
+                    self.entries = json.load(manifest_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {manifest_path}: {e}")
+
+    @staticmethod
+    def _key(input_path):
+        return os.path.abspath(input_path)
+
+    def _hash(self, input_path, stat):
+        """
+        Returns the content hash of an input, computed once per size and mtime.
+        """
+        key = (self._key(input_path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            self._digests[key] = hash_file(input_path)
+        return self._digests[key]
+
+    def lookup(self, input_path, settings):
+        """
+        Returns the recorded entry for an input if its content, the settings and all
+        of its outputs are unchanged since it was recorded, otherwise None.
+
+        Parameters:
+            input_path (str): Path to the input file.
+            settings (dict): Settings the output would be produced with.
+
+        Returns:
+            dict or None: The manifest entry, including any extra data recorded with it.
+        """
+        entry = self.entries.get(self._key(input_path))
+        if entry is None or entry["settings"] != settings:
+            return None
+
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return None
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            # Touched but possibly not modified, fall back to the content hash
+            if self._hash(input_path, stat) != entry["sha256"]:
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        if not all(os.path.exists(output) for output in entry["outputs"]):
+            return None
+        return entry
+
+    def record(self, input_path, settings, outputs, **data):
+        """
+        Records an input as processed with the given settings into the given outputs.
+
+        Parameters:
+            input_path (str): Path to the input file.
+            settings (dict): Settings the outputs were produced with.
+            outputs (list): Paths of the files produced for this input.
+            **data: Extra JSON-serializable values to keep with the entry.
+        """
+        stat = os.stat(input_path)
+        self.entries[self._key(input_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": self._hash(input_path, stat),
+            "settings": settings,
+            "outputs": list(outputs),
+            **data,
+        }
+
+    def content_hash(self, input_path):
+        """
+        Returns the content hash recorded for an input, or None if it is not recorded.
+        """
+        entry = self.entries.get(self._key(input_path))
+        return entry["sha256"] if entry else None
+
+    def invalidate(self, input_path=None):
+        """
+        Forgets one input, or every input when no path is given.
+        """
+        if input_path is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(self._key(input_path), None)
+
+    def save(self):
+        """
+        Writes the manifest next to the outputs it describes.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(self.entries, manifest_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def clear_cache(directory):
+    """
+    Invalidates the cache of an output directory by removing its manifest, so the
+    next run reprocesses every input.
+
+    Parameters:
+        directory (str): Output directory (CSV output or report cache directory).
+
+    Returns:
+        bool: True if a manifest was removed.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+        print(f"Cleared cache: {manifest_path}")
+        return True
+    return False
@@ -0,0 +1,246 @@
+import atexit
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+# Bump when the look of the rendered charts changes, so cached images are not reused
+CHART_STYLE_VERSION = 1
+BACKENDS = ("kaleido", "matplotlib")
+
+# Size the on-disk image cache is pruned back to when a renderer closes, least recently used images first
+DISK_CACHE_BYTES = 256 << 20
+
+
+def bar_chart_specs(chart_df, x_axis, y_axis, base_title="", chunk_size=40, xaxis_label="X-Axis", yaxis_label="Y-Axis"):
+    """
+    Splits chart data into chunks of at most `chunk_size` bars and describes each chart
+    as a plain dict, which is all a backend needs to draw it and all the cache hashes.
+
+    Returns:
+        list: One chart spec per chunk.
+    """
+    specs = []
+    for i in range(0, len(chart_df), chunk_size):
+        chunk = chart_df.iloc[i:i + chunk_size]
+        part_number = (i // chunk_size) + 1
+        specs.append({
+            "x_axis": x_axis,
+            "y_axis": y_axis,
+            "x": chunk[x_axis].tolist(),
+            "y": chunk[y_axis].tolist(),
+            "title": f"{base_title} (Part {part_number})",
+            "xaxis_label": xaxis_label,
+            "yaxis_label": yaxis_label,
+        })
+    return specs
+
+
+def render_kaleido(spec):
+    """
+    Renders a bar chart spec to PNG bytes with Plotly and kaleido.
+    """
+    import pandas as pd
+    import plotly.express as px
+
+    chunk = pd.DataFrame({spec["x_axis"]: spec["x"], spec["y_axis"]: spec["y"]})
+    fig = px.bar(
+        chunk,
+        x=spec["x_axis"],
+        y=spec["y_axis"],
+        text=spec["y_axis"],
+        title=spec["title"]
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(
+        xaxis=dict(tickangle=-45),
+        height=600,
+        margin=dict(l=50, r=50, t=50, b=150),
+        xaxis_title=spec["xaxis_label"],
+        yaxis_title=spec["yaxis_label"],
+    )
+    return fig.to_image(format="png")
+
+
+def render_matplotlib(spec):
+    """
+    Renders a bar chart spec to PNG bytes with matplotlib's Agg canvas, which needs no
+    browser process and is much cheaper for plain static bar charts.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(7, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    bars = ax.bar([str(x) for x in spec["x"]], spec["y"], color="#636efa")
+    ax.bar_label(bars, fontsize=8)
+    ax.set_title(spec["title"], loc="left", fontsize=11)
+    ax.set_xlabel(spec["xaxis_label"])
+    ax.set_ylabel(spec["yaxis_label"])
+    ax.tick_params(axis="x", labelrotation=45, labelsize=8)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+RENDERERS = {"kaleido": render_kaleido, "matplotlib": render_matplotlib}
+
+
+def _render(backend, spec):
+    return RENDERERS[backend](spec)
+
+
+def _warm_up(backend):
+    # Start the backend (kaleido launches a browser process) before the first real chart
+    _render(backend, {
+        "x_axis": "x", "y_axis": "y", "x": ["a"], "y": [1],
+        "title": "", "xaxis_label": "", "yaxis_label": "",
+    })
+
+
+class ChartRenderer:
+    """
+    Renders chart specs to PNG bytes, reusing images it has rendered before.
+
+    Images are cached under a hash of the chart data, layout, backend and style version:
+    on disk in `cache_dir` when one is given, otherwise in a bounded in-memory cache. The
+    disk cache is pruned to `disk_cache_bytes` on `close`, dropping the images that were
+    least recently used.
+    With `workers` > 1, charts are rendered in a pool of processes that stays warm for
+    the lifetime of the renderer, so kaleido's start-up is paid once per worker.
+    """
+
+    def __init__(self, backend="kaleido", cache_dir=None, workers=1, memory_cache_size=256,
+                 disk_cache_bytes=DISK_CACHE_BYTES):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown chart backend '{backend}', use one of: {', '.join(BACKENDS)}.")
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.memory_cache_size = memory_cache_size
+        self.disk_cache_bytes = disk_cache_bytes
+        self._memory_cache = OrderedDict()
+        self._executor = None
+
+    def _key(self, spec):
+        payload = json.dumps(
+            {"spec": spec, "backend": self.backend, "version": CHART_STYLE_VERSION}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            image = self._memory_cache.get(key)
+            if image is not None:
+                self._memory_cache.move_to_end(key)
+            return image
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as image_file:
+                image = image_file.read()
+            # The mtime of a cached image is when it was last used, see `prune_cache`
+            os.utime(path)
+            return image
+        return None
+
+    def _store(self, key, image):
+        if self.cache_dir is None:
+            self._memory_cache[key] = image
+            while len(self._memory_cache) > self.memory_cache_size:
+                self._memory_cache.popitem(last=False)
+            return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as image_file:
+            image_file.write(image)
+        os.replace(tmp_path, path)
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_warm_up, initargs=(self.backend,)
+            )
+        return self._executor
+
+    def render(self, specs):
+        """
+        Renders chart specs to PNG bytes, in parallel when there are several to draw.
+
+        Parameters:
+            specs (list): Chart specs, see `bar_chart_specs`.
+
+        Returns:
+            list: PNG bytes for each spec, in order.
+        """
+        keys = [self._key(spec) for spec in specs]
+        images = [self._load(key) for key in keys]
+        missing = [index for index, image in enumerate(images) if image is None]
+
+        if self.workers > 1 and len(missing) > 1:
+            rendered = self._pool().map(_render, [self.backend] * len(missing), [specs[i] for i in missing])
+        else:
+            rendered = (_render(self.backend, specs[i]) for i in missing)
+
+        for index, image in zip(missing, rendered):
+            self._store(keys[index], image)
+            images[index] = image
+        return images
+
+    def prune_cache(self):
+        """
+        Removes the least recently used images from the disk cache until it holds at most
+        `disk_cache_bytes`.
+
+        Returns:
+            int: Number of images removed.
+        """
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return 0
+        images = []
+        for directory, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith(".png"):
+                    stat = os.stat(os.path.join(directory, file_name))
+                    images.append((stat.st_mtime_ns, stat.st_size, os.path.join(directory, file_name)))
+
+        total = sum(size for _, size, _ in images)
+        removed = 0
+        for _, size, path in sorted(images):
+            if total <= self.disk_cache_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.prune_cache()
+
+
+_default_renderer = None
+
+
+def default_renderer():
+    """
+    Returns the renderer shared by calls that do not pass their own: kaleido, rendering
+    in this process, with an in-memory image cache.
+    """
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = ChartRenderer()
+        atexit.register(_default_renderer.close)
+    return _default_renderer
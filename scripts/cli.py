@@ -0,0 +1,320 @@
+import argparse
+import os
+import sys
+
+from scripts.paths import CSV_ENGINES, DROPPED_FORMATS, FORMATS, find_directory
+
+# Only the standard library and `scripts.paths` are imported up front. Each command
+# imports what it needs when it runs: converting XML to CSV never loads pandas, and
+# xhtml2pdf and the chart backends are only loaded by the commands that render.
+
+
+def convert(args):
+    from scripts.cache import clear_cache
+    from scripts.convert_to_csv import convert_excel_to_csv, xml_to_csv
+
+    output_directory = args.output_directory or f"{args.directory.rstrip(os.sep)}_csv"
+    if args.clear_cache:
+        clear_cache(output_directory)
+
+    if args.format == "xml":
+        xml_to_csv(args.directory, output_directory, workers=args.workers, force=args.force,
+                   formats=args.output_formats, profile=args.profile)
+    else:
+        convert_excel_to_csv(args.directory, output_directory, workers=args.workers, force=args.force,
+                             formats=args.output_formats, streaming=args.streaming, engine=args.excel_engine,
+                             profile=args.profile)
+
+
+def report(args):
+    input_path = args.input_path or find_directory("data")
+    if args.html:
+        from scripts.html_report import generate_html_report
+
+        generate_html_report(input_path, force=args.force, chunksize=args.chunksize,
+                             dropped_format=args.dropped_format, engine=args.engine, plotly_js=args.plotly_js,
+                             workers=args.workers, profile=args.profile)
+    else:
+        from scripts.data_processing import process_and_generate_report
+
+        process_and_generate_report(input_path, force=args.force, chunksize=args.chunksize,
+                                    dropped_format=args.dropped_format, chart_backend=args.chart_backend,
+                                    chart_workers=args.chart_workers, workers=args.workers, profile=args.profile,
+                                    engine=args.engine)
+
+
+def unique_values(args):
+    from scripts.data_processing import generate_unique_values_report
+    from scripts.datasets import read_columns
+
+    columns = args.columns or read_columns(args.input_path)
+    generate_unique_values_report(args.input_path, columns, chunksize=args.chunksize, top_n=args.top_n,
+                                  appendix_format=args.appendix_format, profile=args.profile, engine=args.engine)
+
+
+def preview(args):
+    from scripts.preview import generate_preview_report
+
+    generate_preview_report(args.input_path or find_directory("data"), seconds=args.seconds, rows=args.rows,
+                            method=args.method, seed=args.seed, chart_backend=args.chart_backend, engine=args.engine,
+                            profile=args.profile)
+
+
+def xml_report(args):
+    from scripts.pipeline import xml_to_report
+
+    xml_to_report(args.xml_path, args.csv_directory, write_csv=args.write_csv, force=args.force,
+                  chunksize=args.chunksize, dropped_format=args.dropped_format, chart_backend=args.chart_backend,
+                  chart_workers=args.chart_workers, workers=args.workers, profile=args.profile)
+
+
+def watch(args):
+    from scripts.watch import watch as watch_directory
+
+    watch_directory(args.directory, args.output_directory, interval=args.interval, debounce=args.debounce,
+                    workers=args.workers, chart_backend=args.chart_backend, dropped_format=args.dropped_format,
+                    engine=args.engine)
+
+
+def _store_path(args):
+    from scripts.profile_store import STORE_NAME
+
+    return args.store or os.path.join(os.path.dirname(find_directory("data")), "reports", STORE_NAME)
+
+
+def runs(args):
+    from scripts.profile_store import ProfileStore
+
+    with ProfileStore(_store_path(args)) as store:
+        for run in store.runs(args.dataset):
+            print(f"#{run['id']:<5} {run['created']}  {run['dataset']}  "
+                  f"({run['file_count']} files, {run['input_path']})")
+
+
+def diff(args):
+    from scripts.profile_store import write_diff_report
+
+    if len(args.runs) == 1:
+        write_diff_report(_store_path(args), dataset=args.runs[0], output_path=args.output)
+    elif len(args.runs) == 2 and all(run.isdigit() for run in args.runs):
+        write_diff_report(_store_path(args), int(args.runs[0]), int(args.runs[1]), output_path=args.output)
+    else:
+        raise ValueError("Give a dataset, to compare its last two runs, or the ids of the old and new runs.")
+
+
+def normalize(args):
+    from scripts.normalize import normalize_dataset, print_suggestions
+
+    if args.action == "suggest":
+        print_suggestions(args.input_path, args.column, save=args.save)
+    else:
+        normalize_dataset(args.input_path, args.mappings, args.output_path)
+
+
+def benchmark(args):
+    from scripts.benchmark import ENTRY_POINTS, run_benchmark_suite
+
+    overrides = {
+        field: getattr(args, field)
+        for field in ("columns", "null_density", "cardinality", "gremlin_rate", "seed")
+        if getattr(args, field) is not None
+    }
+    run_benchmark_suite(args.tiers, args.entry_points or ENTRY_POINTS, args.repeat, overrides, args.workspace,
+                        args.engine, startup=args.startup, output=args.output, compare=args.compare)
+
+
+def build_parser():
+    """
+    Returns the parser of the `python -m scripts` command line.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts",
+        description="Convert CollectiveAccess exports and generate reports on them.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert XML or Excel exports to CSV.")
+    convert_parser.add_argument("format", choices=["xml", "excel"], help="Type of files to convert.")
+    convert_parser.add_argument("directory", help="Directory containing the files to convert.")
+    convert_parser.add_argument("output_directory", nargs="?",
+                                help="Directory for the CSV files (default: <directory>_csv).")
+    convert_parser.add_argument("--workers", type=int, default=1,
+                                help="Number of processes to use, 0 for every core (default: 1).")
+    convert_parser.add_argument("--force", action="store_true",
+                                help="Convert every file, even those unchanged since the last run.")
+    convert_parser.add_argument("--clear-cache", action="store_true",
+                                help="Forget all previous runs before converting.")
+    convert_parser.add_argument("--output-formats", nargs="+", default=["csv"], choices=list(FORMATS),
+                                help="Formats to write, e.g. --output-formats csv parquet (default: csv).")
+    convert_parser.add_argument("--excel-engine",
+                                help="Excel reader: openpyxl, xlrd or calamine "
+                                     "(default: openpyxl for .xlsx, xlrd for .xls).")
+    convert_parser.add_argument("--streaming", action="store_true",
+                                help="Stream Excel rows in batches instead of loading each sheet; values are then "
+                                     "formatted cell by cell rather than by column.")
+    convert_parser.add_argument("--profile", action="store_true", help="Also profile the run with cProfile.")
+    convert_parser.set_defaults(handler=convert)
+
+    report_parser = subparsers.add_parser("report", help="Generate the report of a dataset file or directory.")
+    report_parser.add_argument("input_path", nargs="?", help="CSV, Parquet or Feather file or directory "
+                                                             "(default: the data directory).")
+    report_parser.add_argument("--html", action="store_true",
+                               help="Write an interactive HTML report instead of the PDF.")
+    report_parser.add_argument("--force", action="store_true", help="Rebuild every section, even for unchanged files.")
+    report_parser.add_argument("--chunksize", type=int, help="Rows to read at a time (default: whole files).")
+    report_parser.add_argument("--dropped-format", default="csv", choices=list(DROPPED_FORMATS),
+                               help="Format of the dropped-columns copies (default: csv).")
+    report_parser.add_argument("--chart-backend", default="kaleido", choices=["kaleido", "matplotlib"],
+                               help="Chart renderer of the PDF report (default: kaleido).")
+    report_parser.add_argument("--chart-workers", type=int, default=1,
+                               help="Processes drawing charts of the PDF report (default: 1).")
+    report_parser.add_argument("--plotly-js", default="inline",
+                               help="How the HTML report loads plotly.js: inline, cdn or directory (default: inline).")
+    report_parser.add_argument("--workers", type=int, default=1,
+                               help="Processes rendering PDF sections and profiling shards of chunked files, "
+                                    "0 for every core (default: 1).")
+    report_parser.add_argument("--engine", default="pandas", choices=CSV_ENGINES,
+                               help="CSV reader, pyarrow parses on every core (default: pandas).")
+    report_parser.add_argument("--profile", action="store_true", help="Also profile the run with cProfile.")
+    report_parser.set_defaults(handler=report)
+
+    values_parser = subparsers.add_parser("unique-values", help="List the unique values of columns of a dataset.")
+    values_parser.add_argument("input_path", help="CSV, Parquet or Feather file.")
+    values_parser.add_argument("columns", nargs="*", help="Columns to list (default: every column).")
+    values_parser.add_argument("--chunksize", type=int, help="Rows to read at a time (default: whole file).")
+    values_parser.add_argument("--top-n", type=int,
+                               help="Show the N most frequent values per column and write the rest to an appendix.")
+    values_parser.add_argument("--appendix-format", default="csv", choices=list(FORMATS),
+                               help="Format of the appendix files (default: csv).")
+    values_parser.add_argument("--engine", default="pandas", choices=CSV_ENGINES,
+                               help="CSV reader, pyarrow parses on every core (default: pandas).")
+    values_parser.add_argument("--profile", action="store_true", help="Also profile the run with cProfile.")
+    values_parser.set_defaults(handler=unique_values)
+
+    preview_parser = subparsers.add_parser("preview", help="Preview a dataset from a sample of its rows, within a "
+                                                           "time budget.")
+    preview_parser.add_argument("input_path", nargs="?", help="CSV, Parquet or Feather file or directory "
+                                                              "(default: the data directory).")
+    preview_parser.add_argument("--seconds", type=float, default=60, help="Time budget of the preview (default: 60).")
+    preview_parser.add_argument("--rows", type=int, default=100000,
+                                help="Rows sampled per file at most (default: 100000).")
+    preview_parser.add_argument("--method", default="auto", choices=["auto", "seek", "stream"],
+                                help="Seek to random offsets of CSV files, stream files in one pass, or pick by size "
+                                     "(default: auto).")
+    preview_parser.add_argument("--seed", type=int, help="Seed of the sample, for previews that can be repeated.")
+    preview_parser.add_argument("--chart-backend", default="matplotlib", choices=["kaleido", "matplotlib"],
+                                help="Chart renderer (default: matplotlib).")
+    preview_parser.add_argument("--engine", default="pandas", choices=CSV_ENGINES,
+                                help="CSV reader of streamed files (default: pandas).")
+    preview_parser.add_argument("--profile", action="store_true", help="Also profile the run with cProfile.")
+    preview_parser.set_defaults(handler=preview)
+
+    xml_parser = subparsers.add_parser("xml-report", help="Generate the report of XML exports straight from the "
+                                                          "parser, without converting them to CSV first.")
+    xml_parser.add_argument("xml_path", help="XML export or directory of XML exports.")
+    xml_parser.add_argument("csv_directory", nargs="?", help="Directory of the CSV files (default: <directory>_csv).")
+    xml_parser.add_argument("--write-csv", action="store_true", help="Also write the CSV files from the same pass.")
+    xml_parser.add_argument("--force", action="store_true", help="Rebuild every section, even for unchanged files.")
+    xml_parser.add_argument("--chunksize", type=int, help="Records profiled at a time, for exports larger than memory.")
+    xml_parser.add_argument("--dropped-format", default="csv", choices=list(DROPPED_FORMATS),
+                            help="Format of the dropped-columns copies (default: csv).")
+    xml_parser.add_argument("--chart-backend", default="kaleido", choices=["kaleido", "matplotlib"],
+                            help="Chart renderer (default: kaleido).")
+    xml_parser.add_argument("--chart-workers", type=int, default=1, help="Processes drawing charts (default: 1).")
+    xml_parser.add_argument("--workers", type=int, default=1,
+                            help="Processes rendering PDF sections, 0 for every core (default: 1).")
+    xml_parser.add_argument("--profile", action="store_true", help="Also profile the run with cProfile.")
+    xml_parser.set_defaults(handler=xml_report)
+
+    watch_parser = subparsers.add_parser("watch", help="Watch a directory of exports or datasets and keep its report "
+                                                       "up to date.")
+    watch_parser.add_argument("directory", nargs="?", help="Directory to watch (default: the data directory).")
+    watch_parser.add_argument("output_directory", nargs="?",
+                              help="Directory for converted exports (default: <name>_csv in the data directory).")
+    watch_parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls (default: 2).")
+    watch_parser.add_argument("--debounce", type=float, default=5.0,
+                              help="Seconds without changes before rebuilding (default: 5).")
+    watch_parser.add_argument("--workers", type=int, default=1,
+                              help="Processes for conversions, PDF rendering and shards of chunked files, "
+                                   "0 for every core (default: 1).")
+    watch_parser.add_argument("--chart-backend", default="kaleido", choices=["kaleido", "matplotlib"],
+                              help="Chart renderer (default: kaleido).")
+    watch_parser.add_argument("--dropped-format", default="csv", choices=list(DROPPED_FORMATS),
+                              help="Format of the dropped-columns copies (default: csv).")
+    watch_parser.add_argument("--engine", default="pandas", choices=CSV_ENGINES,
+                              help="CSV reader, pyarrow parses on every core (default: pandas).")
+    watch_parser.set_defaults(handler=watch)
+
+    runs_parser = subparsers.add_parser("runs", help="List the report runs kept in the profile store.")
+    runs_parser.add_argument("dataset", nargs="?", help="Only list the runs of this dataset.")
+    runs_parser.add_argument("--store", help="Profile store (default: reports/profiles.sqlite next to the data "
+                                             "directory).")
+    runs_parser.set_defaults(handler=runs)
+
+    diff_parser = subparsers.add_parser("diff", help="Write an HTML report of the changes between two stored runs.")
+    diff_parser.add_argument("runs", nargs="+",
+                             help="A dataset, to compare its last two runs, or the ids of the old and new runs.")
+    diff_parser.add_argument("--output", help="HTML file to write.")
+    diff_parser.add_argument("--store", help="Profile store (default: reports/profiles.sqlite next to the data "
+                                             "directory).")
+    diff_parser.set_defaults(handler=diff)
+
+    normalize_parser = subparsers.add_parser("normalize", help="Normalize column values with mapping files, or "
+                                                               "suggest mappings.")
+    actions = normalize_parser.add_subparsers(dest="action", required=True)
+    suggest_parser = actions.add_parser("suggest", help="Print clusters of likely variants of a column.")
+    suggest_parser.add_argument("input_path", help="CSV, Parquet or Feather file.")
+    suggest_parser.add_argument("column", help="Column to cluster.")
+    suggest_parser.add_argument("--save", metavar="DIRECTORY",
+                                help="Add the suggestions to the column's mapping file in this directory.")
+    apply_parser = actions.add_parser("apply", help="Apply the mapping files of a directory to a dataset.")
+    apply_parser.add_argument("input_path", help="CSV, Parquet or Feather file.")
+    apply_parser.add_argument("mappings", help="Directory of <column>.json mapping files.")
+    apply_parser.add_argument("output_path", nargs="?", help="File to write (default: <input>_normalized).")
+    normalize_parser.set_defaults(handler=normalize)
+
+    # Tiers and entry points are checked by `scripts.benchmark`, which loads pandas
+    benchmark_parser = subparsers.add_parser("benchmark", help="Benchmark the conversion and report entry points on "
+                                                               "synthetic data. Runs offline.")
+    benchmark_parser.add_argument("--tiers", nargs="+", default=["small", "medium"],
+                                  help="Dataset sizes to run: small, medium or large (default: small medium).")
+    benchmark_parser.add_argument("--entry-points", nargs="+", help="Entry points to measure (default: all).")
+    benchmark_parser.add_argument("--repeat", type=int, default=1,
+                                  help="Runs per case, the fastest is kept (default: 1).")
+    benchmark_parser.add_argument("--columns", type=int, help="Fields per record, for every tier.")
+    benchmark_parser.add_argument("--null-density", type=float, help="Share of empty values, for every tier.")
+    benchmark_parser.add_argument("--cardinality", type=int,
+                                  help="Distinct values per categorical column, for every tier.")
+    benchmark_parser.add_argument("--gremlin-rate", type=float, help="Share of text values with a control character.")
+    benchmark_parser.add_argument("--seed", type=int, help="Seed of the synthetic data.")
+    benchmark_parser.add_argument("--engine", default="pandas", choices=CSV_ENGINES,
+                                  help="CSV reader of the report entry points (default: pandas).")
+    benchmark_parser.add_argument("--workspace",
+                                  help="Keep the synthetic data in this directory instead of a temporary one.")
+    benchmark_parser.add_argument("--output",
+                                  help="JSON file for the results (default: reports/benchmarks/benchmark_<time>.json).")
+    benchmark_parser.add_argument("--compare", help="JSON results of an earlier run to compare with.")
+    benchmark_parser.add_argument("--startup", action="store_true",
+                                  help="Also measure import times and the time to first output of `python -m scripts`.")
+    benchmark_parser.set_defaults(handler=benchmark)
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the `python -m scripts` command line.
+
+    Parameters:
+        argv (list): Arguments, without the program name (default: `sys.argv[1:]`).
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except ValueError as e:
+        # Invalid inputs or options found by the entry points
+        parser.exit(2, f"{parser.prog} {args.command}: error: {e}\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,35 +1,654 @@
 import os
+import csv
+import codecs
+import datetime
+import re
+import time
 import xml.etree.ElementTree as ET
-import pandas as pd
 from collections import OrderedDict
-import re
+from concurrent.futures import ProcessPoolExecutor
+from scripts.cache import MANIFEST_NAME, Manifest
+from scripts.metrics import current_run, file_size, memory_usage_mb, track_run
+from scripts.paths import COLUMNAR_FORMATS, FORMATS
+
+# pandas and pyarrow are imported by the functions that need them: the streaming
+# conversions to CSV only use the standard library, so they start fast
+
+# Readers for Excel workbooks. calamine (pip install python-calamine) reads both
+# .xls and .xlsx and is several times faster than openpyxl.
+EXCEL_ENGINES = ("openpyxl", "xlrd", "calamine")
+
+# Control characters except newlines and tabs, mapped to None for str.translate
+GREMLINS = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), *range(0x7F, 0xA0)])
 
 """
-    Cleans the content of an XML file by removing non-printable or malformed characters.
+    Read-only, file-like wrapper that removes non-printable or malformed characters
+    from a file as it is read, so the XML parser never sees them and the raw input
+    is left untouched.
+
+    Bytes are decoded as UTF-8 (dropping invalid sequences), control characters are
+    deleted with a translate table, and the result is handed back as UTF-8 bytes.
+    `removed` holds the number of control characters deleted so far.
 """
-def zap_gremlins(file_path):
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-        content = file.read()
-    
-        # print(f"zapping gremlins: {file_path}")
+class GremlinFilter:
+    def __init__(self, file_path, chunk_size=1024 * 1024):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.removed = 0
+        self._file = open(file_path, 'rb')
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._buffer = b''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        raw = self._file.read(self.chunk_size)
+        self._eof = not raw
+        text = self._decoder.decode(raw, final=self._eof)
+        cleaned = text.translate(GREMLINS)
+        self.removed += len(text) - len(cleaned)
+        self._buffer = self._buffer[self._pos:] + cleaned.encode('utf-8')
+        self._pos = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while not self._eof:
+                self._fill()
+            size = len(self._buffer) - self._pos
+        else:
+            while len(self._buffer) - self._pos < size and not self._eof:
+                self._fill()
+        data = self._buffer[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+"""
+    Yields one {tag: text} dict per record (child of the root element) without
+    building the whole tree. Each record is cleared as soon as it has been read,
+    so memory stays flat regardless of the size of the export.
+"""
+def iter_xml_records(source):
+    depth = 0
+    root = None
+    record = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = elem
+            elif depth == 2:
+                record = {}
+            continue
+
+        depth -= 1
+        if depth == 2:
+            record[elem.tag] = elem.text
+        elif depth == 1:
+            yield record
+            record = None
+            elem.clear()
+            root.remove(elem)
+
+
+"""
+    Streams a single XML export to CSV in batches of rows, in a single pass.
+
+    Columns are named in order of first appearance, and the first record and first
+    column are dropped, exactly as the DataFrame based conversion does. The header is
+    written with the first batch; when later records add columns, the file is widened
+    to them once every row is written, see `widen_csv`. The output is byte for byte
+    identical to `DataFrame.to_csv(index=False)`.
+
+    Parameters:
+    xml_file_path (str): Path to the XML file.
+    csv_file_path (str): Path of the CSV file to write.
+    batch_size (int): Number of rows buffered before each write.
+
+    Returns:
+    tuple: Number of gremlin characters filtered out of the input and number of
+        data rows written.
+"""
+def stream_xml_file_to_csv(xml_file_path, csv_file_path, batch_size=10000):
+    with GremlinFilter(xml_file_path) as source, \
+            open(csv_file_path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file, lineterminator=os.linesep)
+
+        records = iter_xml_records(source)
+        seen = dict.fromkeys(next(records, None) or ())  # Drop first row, but keep its columns
+        header = None
+        batch = []
+        row_count = 0
+        for record in records:
+            if not seen.keys() >= record.keys():
+                seen.update(dict.fromkeys(record))
+            batch.append(record)
+            row_count += 1
+            if len(batch) >= batch_size:
+                columns = list(seen)[1:]
+                if header is None:
+                    header = columns
+                    writer.writerow(header)
+                writer.writerows([record.get(col) for col in columns] for record in batch)
+                batch = []
+
+        columns = list(seen)[1:]
+        if header is None:
+            header = columns
+            writer.writerow(header)
+        writer.writerows([record.get(col) for col in columns] for record in batch)
+        removed = source.removed
+
+    if len(columns) > len(header):
+        widen_csv(csv_file_path, columns)
+    return removed, row_count
+
+
+"""
+    Converts a single XML file to CSV by loading it into a DataFrame.
+
+    Returns:
+    tuple: Number of gremlin characters filtered out of the input and number of
+        data rows written.
+"""
+def xml_file_to_csv(xml_file_path, csv_file_path):
+    import pandas as pd
+
+    with GremlinFilter(xml_file_path) as source:
+        tree = ET.parse(source)
+    root = tree.getroot()
+
+    cols = []
+    rows = []
+
+    for x in root:
+        d = {}
+        for y in x:
+            cols.append(y.tag)
+            d["{0}".format(y.tag)] = y.text
+        rows.append(d)
+
+    # Remove repeated columns
+    cols = list(OrderedDict.fromkeys(cols))
+
+    # Create DataFrame
+    df = pd.DataFrame(rows, columns=cols)
+
+    # Drop first column and row
+    df = df.iloc[1:]
+    df = df.iloc[:, 1:]
+
+    # Write DataFrame to CSV
+    df.to_csv(csv_file_path, index=False)
+
+    return source.removed, len(df)
+
+
+"""
+    Checks the requested Excel engine, None or one of `EXCEL_ENGINES`, and returns it.
+"""
+def _check_excel_engine(engine):
+    if engine is not None and engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine '{engine}', use one of: {', '.join(EXCEL_ENGINES)}.")
+    return engine
+
+
+"""
+    Returns the engine used to read an Excel file: openpyxl for .xlsx and xlrd for
+    .xls, unless an engine is asked for.
+"""
+def _excel_engine(file_path, engine=None):
+    if engine is None:
+        return 'openpyxl' if file_path.endswith('.xlsx') else 'xlrd'
+    return engine
+
+
+"""
+    Returns the sheet names of a workbook without reading any rows.
+"""
+def excel_sheet_names(file_path, engine):
+    if engine == "openpyxl":
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, keep_links=False)
+        try:
+            return [sheet.title for sheet in workbook.worksheets]
+        finally:
+            workbook.close()
+
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        return CalamineWorkbook.from_path(file_path).sheet_names
+
+    import xlrd
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        return workbook.sheet_names()
+    finally:
+        workbook.release_resources()
+
+
+def _xlrd_value(cell, datemode):
+    import xlrd
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    return cell.value
+
+
+"""
+    Yields (sheet name, rows) for every sheet of a workbook, where rows is an iterator
+    over tuples of cell values. openpyxl and calamine read the rows one at a time
+    without loading the workbook; xlrd loads one sheet at a time.
+
+    openpyxl reads every cell rather than the range the sheet declares, which many
+    exporters write wrong or leave out; rows then end at their last cell.
+"""
+def iter_excel_sheets(file_path, engine):
+    if engine == "openpyxl":
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            for sheet in workbook.worksheets:
+                sheet.reset_dimensions()
+                yield sheet.title, sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    elif engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        workbook = CalamineWorkbook.from_path(file_path)
+        try:
+            for name in workbook.sheet_names:
+                yield name, workbook.get_sheet_by_name(name).iter_rows()
+        finally:
+            workbook.close()
+
+    else:
+        import xlrd
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            for index in range(workbook.nsheets):
+                sheet = workbook.sheet_by_index(index)
+                yield sheet.name, (
+                    tuple(_xlrd_value(cell, workbook.datemode) for cell in sheet.row(i)) for i in range(sheet.nrows)
+                )
+                workbook.unload_sheet(index)
+        finally:
+            workbook.release_resources()
+
+
+"""
+    Drops the empty cells at the end of a row.
+"""
+def _trim_row(row):
+    row = list(row)
+    while row and row[-1] in (None, ""):
+        row.pop()
+    return row
+
+
+"""
+    Formats one cell value for CSV on its own: whole numbers without a decimal point
+    and dates at midnight without their time. `pd.read_excel(...).to_csv()` formats
+    each column from its dtype instead, see `stream_sheet_to_csv`.
+"""
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+"""
+    Names the columns of a sheet from its header row, the way pandas does: empty
+    header cells become "Unnamed: <position>" and repeated names get a ".1", ".2", ...
+    suffix.
+"""
+def _sheet_columns(header, width):
+    columns = []
+    seen = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = f"Unnamed: {i}" if value in (None, "") else str(_csv_value(value))
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        while count and f"{name}.{count}" in seen:
+            count += 1
+        if count:
+            seen[f"{name}.{count}"] = 1
+            name = f"{name}.{count}"
+        columns.append(name)
+    return columns
+
+
+"""
+    Rewrites the header of a CSV file with the given, wider one and pads every row to
+    it. Used for sheets with values beyond their last header cell, and for XML exports
+    whose later records add columns after the header was written.
+"""
+def widen_csv(csv_file_path, columns):
+    tmp_path = f"{csv_file_path}.tmp"
+    with open(csv_file_path, "r", encoding="utf-8", newline="") as source, \
+            open(tmp_path, "w", encoding="utf-8", newline="") as csv_file:
+        reader = csv.reader(source)
+        writer = csv.writer(csv_file, lineterminator=os.linesep)
+        next(reader, None)
+        writer.writerow(columns)
+        for row in reader:
+            writer.writerow(row + [""] * (len(columns) - len(row)))
+    os.replace(tmp_path, csv_file_path)
+
+
+"""
+    Streams the rows of one sheet to CSV in batches. The first row is the header, even
+    when blank, and blank rows at the end of the sheet are dropped, as `pd.read_excel`
+    does.
+
+    Each value is formatted on its own, see `_csv_value`, since the type of a column is
+    only known once every row has been read. The CSV therefore differs from
+    `pd.read_excel(...).to_csv()` wherever pandas formats a whole column from its dtype:
+    whole numbers in float columns (pandas writes "2.0") or in columns with gaps, booleans
+    in columns with gaps (pandas writes 1.0 and 0.0), and dates at midnight in datetime
+    columns (pandas writes "2020-01-02 00:00:00").
+
+    Parameters:
+    rows (iterable): Tuples of cell values, see `iter_excel_sheets`.
+    csv_file_path (str): Path of the CSV file to write.
+    batch_size (int): Number of rows buffered before each write.
+
+    Returns:
+    int: Number of data rows written.
+"""
+def stream_sheet_to_csv(rows, csv_file_path, batch_size=10000):
+    rows = iter(rows)
+    header = _trim_row(next(rows, ()))
+
+    width = len(header)
+    row_count = 0
+    with open(csv_file_path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file, lineterminator=os.linesep)
+        writer.writerow(_sheet_columns(header, width))
+
+        batch = []
+        blank_rows = 0
+        for row in rows:
+            values = _trim_row(row)
+            if not values:
+                blank_rows += 1
+                continue
+            batch.extend([[""] * len(header)] * blank_rows)
+            row_count += blank_rows
+            blank_rows = 0
+
+            width = max(width, len(values))
+            batch.append([_csv_value(value) for value in values] + [""] * (len(header) - len(values)))
+            row_count += 1
+            if len(batch) >= batch_size:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+
+    if width > len(header):
+        widen_csv(csv_file_path, _sheet_columns(header, width))
+    return row_count
+
+
+"""
+    Returns the CSV path of each sheet of a workbook: the workbook's own CSV path
+    when it has a single sheet, otherwise one file per sheet, named after it.
+"""
+def _sheet_csv_paths(csv_file_path, sheet_names):
+    if len(sheet_names) == 1:
+        return {sheet_names[0]: csv_file_path}
+
+    base_path = os.path.splitext(csv_file_path)[0]
+    paths = {}
+    for index, name in enumerate(sheet_names):
+        safe_name = re.sub(r"[^\w.-]+", "_", name).strip("_") or str(index)
+        paths[name] = f"{base_path}_{safe_name}.csv"
+    return paths
+
+
+"""
+    Runs `convert_file` over a list of tasks, either in this process or across a
+    process pool, and yields each task's result in the order the tasks were given.
+
+    Workers never print; each result carries its own log lines, which are printed
+    here in task order so output from parallel conversions never interleaves.
+
+    Parameters:
+    convert_file (callable): Picklable function taking (input_path, csv_file_path, *options)
+        and returning a result dict.
+    tasks (list): Argument tuples for `convert_file`, one per file.
+    workers (int): Number of processes. 1 runs in this process, 0 uses every core.
+"""
+def run_conversions(convert_file, tasks, workers=1):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        results = (convert_file(*task) for task in tasks)
+        for result in results:
+            for line in result["log"]:
+                print(line)
+            yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        for result in executor.map(convert_file, *zip(*tasks)):
+            for line in result["log"]:
+                print(line)
+            yield result
+
+
+"""
+    Converts only the inputs that changed since the last run into an output directory.
+
+    A manifest in the output directory records the size, mtime and content hash of
+    each input converted there and the settings used. Inputs whose content, settings
+    and outputs are unchanged are skipped and reported as "cached"; the rest are
+    handed to `run_conversions`.
+
+    Parameters:
+    convert_file (callable): Picklable conversion function, see `run_conversions`.
+    tasks (list): Argument tuples for `convert_file`, starting with (input_path, csv_file_path).
+    output_directory (str): Directory holding the outputs and the manifest.
+    settings (dict): Settings that affect the output; changing them reconverts every file.
+    force (bool): Convert every file even if it is unchanged.
+    workers (int): Number of processes, see `run_conversions`.
+
+    Returns:
+    list: One result dict per task, in task order.
+"""
+def run_incremental_conversions(convert_file, tasks, output_directory, settings, force=False, workers=1):
+    manifest = Manifest(os.path.join(output_directory, MANIFEST_NAME))
+
+    results = [None] * len(tasks)
+    pending = []
+    for index, task in enumerate(tasks):
+        input_path = task[0]
+        entry = None if force else manifest.lookup(input_path, settings)
+        if entry:
+            result = _new_result(input_path)
+            result.update(status="cached", outputs=entry["outputs"], log=[f"Skipping unchanged file: {input_path}"])
+            print(result["log"][0])
+            results[index] = result
+        else:
+            pending.append(index)
+
+    conversions = run_conversions(convert_file, [tasks[index] for index in pending], workers=workers)
+    for index, result in zip(pending, conversions):
+        results[index] = result
+        if result["status"] == "converted":
+            manifest.record(result["input"], settings, result["outputs"])
+        else:
+            manifest.invalidate(result["input"])
+
+    manifest.save()
+    for result in results:
+        _record_conversion(result)
+    return results
+
+
+"""
+    Adds a conversion result to the run metrics being recorded, if any. Conversions
+    may run in pool workers, so the time and peak memory measured there are used.
+"""
+def _record_conversion(result):
+    run = current_run()
+    if run is None:
+        return
+    run.add(
+        "cached" if result["status"] == "cached" else "convert",
+        result["input"],
+        seconds=result["seconds"],
+        rows=result["rows"],
+        bytes_read=file_size(result["input"]),
+        bytes_written=sum(file_size(path) or 0 for path in result["outputs"]),
+        status=result["status"],
+        worker_peak_rss_mb=result["peak_rss_mb"],
+    )
+
+
+"""
+    Prints what converted, what failed and how long each file took.
+
+    Parameters:
+    results (list): Result dicts returned by `xml_to_csv` or `convert_excel_to_csv`.
+"""
+def print_conversion_summary(results):
+    converted = [r for r in results if r["status"] == "converted"]
+    cached = [r for r in results if r["status"] == "cached"]
+    failed = [r for r in results if r["status"] == "failed"]
+
+    print(f"\nConverted {len(converted)} of {len(results)} files, {len(cached)} unchanged, {len(failed)} failed.")
+    for result in results:
+        line = f"  {result['status']:<9} {result['seconds']:8.2f}s  {result['input']}"
+        if result["error"]:
+            line += f" ({result['error']})"
+        print(line)
+
+
+def _new_result(input_path):
+    return {
+        "input": input_path,
+        "outputs": [],
+        "status": "converted",
+        "error": None,
+        "seconds": 0.0,
+        "rows": None,
+        "peak_rss_mb": None,
+        "gremlins": 0,
+        "log": [f"Processing file: {input_path}"],
+    }
+
+
+"""
+    Checks the requested output formats and returns them as a tuple.
+"""
+def _check_formats(formats):
+    formats = tuple(formats)
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Output formats must be some of {', '.join(FORMATS)}, got: {', '.join(formats)}")
+    return formats
+
+
+"""
+    Returns the output path for each format, next to the CSV file path.
+"""
+def _output_paths(csv_file_path, formats):
+    base_path = os.path.splitext(csv_file_path)[0]
+    return {fmt: f"{base_path}{FORMATS[fmt]}" for fmt in formats}
+
+
+"""
+    Converts one XML file to CSV and returns its result dict. Runs inside pool workers.
+
+    Columnar formats are converted from the streamed CSV, which is removed afterwards
+    when CSV was not one of the requested formats.
+"""
+def convert_xml_file(xml_file_path, csv_file_path, streaming=True, batch_size=10000, formats=("csv",)):
+    result = _new_result(xml_file_path)
+    start = time.perf_counter()
+    stream_path = csv_file_path if "csv" in formats else f"{csv_file_path}.tmp"
+
+    try:
+        # Parse the XML file through the gremlin filter and write it to CSV
+        if streaming:
+            removed, result["rows"] = stream_xml_file_to_csv(xml_file_path, stream_path, batch_size=batch_size)
+        else:
+            removed, result["rows"] = xml_file_to_csv(xml_file_path, stream_path)
+
+        result["gremlins"] = removed
+        if removed:
+            result["log"].append(f"Removed {removed} gremlin characters from {xml_file_path}")
+
+        for fmt, output_path in _output_paths(csv_file_path, formats).items():
+            if fmt in COLUMNAR_FORMATS:
+                from scripts.datasets import convert_csv_to_columnar
+                convert_csv_to_columnar(stream_path, output_path)
+            result["outputs"].append(output_path)
+            result["log"].append(f"Converted {xml_file_path} to {output_path}")
+
+    except ET.ParseError as e:
+        # Log the error and skip the file
+        result.update(status="failed", error=str(e))
+        result["log"].append(f"Error parsing {xml_file_path}: {e}")
+
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+        result["log"].append(f"Error processing {xml_file_path}: {e}")
+
+    finally:
+        if stream_path != csv_file_path and os.path.exists(stream_path):
+            os.remove(stream_path)
+
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = memory_usage_mb()[1]
+    return result
 
-    # Remove control characters except newlines and tabs
-    cleaned_content = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]', '', content)
 
-    # Overwrite the file with cleaned content
-    with open(file_path, 'w', encoding='utf-8') as file:
-        file.write(cleaned_content)
-        
-        
-        
 """
     Converts XML files in the specified directory to CSV files in another directory.
 
     Parameters:
     xml_directory (str): Path to the directory containing XML files.
     csv_directory (str): Optional Path to the directory where CSV files will be saved.
+    streaming (bool): Parse incrementally and write rows in batches so memory stays
+        flat as files grow. Set to False to build each file as a DataFrame in memory.
+    batch_size (int): Number of rows written per batch in streaming mode.
+    workers (int): Number of processes converting files in parallel. 0 uses every core.
+    force (bool): Convert every file, even those unchanged since the last run.
+    formats (tuple): Output formats, any of "csv", "parquet" and "feather". Parquet and
+        Feather files are typed and compressed, and can be written alongside or instead of CSV.
+    profile (bool): Also profile the run with cProfile. Only this process is profiled,
+        not the pool workers.
+
+    The time, rows, bytes and peak memory of each file are saved to
+    .conversion_metrics.json in the CSV directory.
+
+    Returns:
+    list: One result dict per file with its status, error, outputs and conversion time.
 """
-def xml_to_csv(xml_directory, csv_directory=None):
+def xml_to_csv(xml_directory, csv_directory=None, streaming=True, batch_size=10000, workers=1, force=False,
+               formats=("csv",), profile=False):
+    formats = _check_formats(formats)
     
     # Determine the CSV directory if not provided
     if not csv_directory:
@@ -38,81 +657,139 @@ def xml_to_csv(xml_directory, csv_directory=None):
     # Ensure the CSV directory exists
     os.makedirs(csv_directory, exist_ok=True)
 
+    tasks = []
     for filename in os.listdir(xml_directory):
         xml_file_path = os.path.join(xml_directory, filename)
         if os.path.isfile(xml_file_path):
-            print(f"Processing file: {xml_file_path}")
-            
-            # Clean the XML file
-            zap_gremlins(xml_file_path)
+            # Generate output CSV file path
+            base_filename = os.path.splitext(filename)[0]
+            csv_file_path = os.path.join(csv_directory, f'{base_filename}.csv')
+            tasks.append((xml_file_path, csv_file_path, streaming, batch_size, formats))
 
-            try:
-                # Parse the cleaned XML file
-                tree = ET.parse(xml_file_path)
-                root = tree.getroot()
-                
-                cols = []
-                rows = []
+    settings = {"converter": "xml", "formats": list(formats)}
+    with track_run("xml_to_csv", profile=profile) as run_metrics:
+        results = run_incremental_conversions(
+            convert_xml_file, tasks, csv_directory, settings, force=force, workers=workers
+        )
+    print_conversion_summary(results)
+    run_metrics.save(os.path.join(csv_directory, ".conversion"), formats=("json",))
+    return results
+
+
+"""
+    Converts every sheet of one Excel file to CSV and returns its result dict. Runs
+    inside pool workers.
+
+    In streaming mode rows are written in batches as they are read, and columnar
+    formats are converted from the streamed CSV, which is removed afterwards when
+    CSV was not one of the requested formats.
+"""
+def convert_excel_file(file_path, output_file, formats=("csv",), streaming=False, engine=None, batch_size=10000):
+    result = _new_result(file_path)
+    start = time.perf_counter()
+    stream_paths = []
 
-                for x in root:
-                    d = {}
-                    for y in x:
-                        cols.append(y.tag)
-                        d["{0}".format(y.tag)] = y.text
-                    rows.append(d)
+    try:
+        engine = _excel_engine(file_path, engine)
+        sheet_paths = _sheet_csv_paths(output_file, excel_sheet_names(file_path, engine))
 
-                # Remove repeated columns
-                cols = list(OrderedDict.fromkeys(cols))
+        result["rows"] = 0
+        if streaming:
+            for sheet_name, rows in iter_excel_sheets(file_path, engine):
+                csv_path = sheet_paths[sheet_name]
+                stream_path = csv_path if "csv" in formats else f"{csv_path}.tmp"
+                stream_paths.append(stream_path)
+                result["rows"] += stream_sheet_to_csv(rows, stream_path, batch_size=batch_size)
 
-                # Create DataFrame
-                df = pd.DataFrame(rows, columns=cols)
+                for fmt, output_path in _output_paths(csv_path, formats).items():
+                    if fmt in COLUMNAR_FORMATS:
+                        from scripts.datasets import convert_csv_to_columnar
+                        convert_csv_to_columnar(stream_path, output_path)
+                    result["outputs"].append(output_path)
+                    result["log"].append(f"Converted {file_path} [{sheet_name}] to {output_path}")
+        else:
+            import pandas as pd
+            from scripts.datasets import write_dataset
 
-                # Drop first column and row
-                df = df.iloc[1:]
-                df = df.iloc[:, 1:]
+            sheets = pd.read_excel(file_path, engine=engine, sheet_name=None)
+            for sheet_name, df in sheets.items():
+                result["rows"] += len(df)
+                for output_path in _output_paths(sheet_paths[sheet_name], formats).values():
+                    write_dataset(df, output_path)
+                    result["outputs"].append(output_path)
+                    result["log"].append(f"Converted {file_path} [{sheet_name}] to {output_path}")
 
-                # Generate output CSV file path
-                base_filename = os.path.splitext(filename)[0]
-                csv_file_path = os.path.join(csv_directory, f'{base_filename}.csv')
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+        result["log"].append(f"Error processing {file_path}: {e}")
 
-                # Write DataFrame to CSV
-                df.to_csv(csv_file_path, index=False)
+    finally:
+        for stream_path in stream_paths:
+            if stream_path.endswith(".tmp") and os.path.exists(stream_path):
+                os.remove(stream_path)
 
-                print(f"Converted {xml_file_path} to {csv_file_path}")
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = memory_usage_mb()[1]
+    return result
 
-            except ET.ParseError as e:
-                # Log the error and skip the file
-                print(f"Error parsing {xml_file_path}: {e}")
-                continue  # Skip to the next file
 
 """
     Converts all .xls and .xlsx files in a directory to CSV format.
-"""            
-def convert_excel_to_csv(directory, output_directory=None):
+
+    Parameters:
+    directory (str): Path to the directory containing Excel files.
+    output_directory (str): Optional Path to the directory where CSV files will be saved.
+    workers (int): Number of processes converting files in parallel. 0 uses every core.
+    force (bool): Convert every file, even those unchanged since the last run.
+    formats (tuple): Output formats, any of "csv", "parquet" and "feather".
+    streaming (bool): Read rows one at a time and write them in batches so memory stays
+        flat as workbooks grow, instead of loading each sheet as a DataFrame. Values are
+        then formatted cell by cell rather than by column as pandas does, see
+        `stream_sheet_to_csv`.
+    engine (str): Reader to use, one of `EXCEL_ENGINES`. Defaults to openpyxl for .xlsx
+        and xlrd for .xls files.
+    batch_size (int): Number of rows written per batch in streaming mode.
+    profile (bool): Also profile the run with cProfile, see `xml_to_csv`.
+
+    Every sheet is converted. Workbooks with a single sheet are written to
+    <name>.csv, others to one <name>_<sheet>.csv file per sheet. Run metrics are saved
+    as for `xml_to_csv`.
+
+    Returns:
+    list: One result dict per file with its status, error, outputs and conversion time.
+"""
+def convert_excel_to_csv(directory, output_directory=None, workers=1, force=False, formats=("csv",),
+                         streaming=False, engine=None, batch_size=10000, profile=False):
+    formats = _check_formats(formats)
+    engine = _check_excel_engine(engine)
     if not output_directory:
         output_directory = f"{directory.rstrip(os.sep)}_csv"
 
     os.makedirs(output_directory, exist_ok=True)
 
+    tasks = []
     for filename in os.listdir(directory):
         file_path = os.path.join(directory, filename)
         
         if os.path.isfile(file_path) and filename.endswith(('.xls', '.xlsx')):
-            print(f"Processing file: {file_path}")
-            
-            try:
-                # Use openpyxl for .xlsx files and fallback to xlrd for .xls
-                engine = 'openpyxl' if filename.endswith('.xlsx') else 'xlrd'
-                df = pd.read_excel(file_path, engine=engine)
-                
-                # df = pd.read_excel(file_path, engine='xlrd')
-                
-                base_filename = os.path.splitext(filename)[0]
-                output_file = os.path.join(output_directory, f"{base_filename}.csv")
-                
-                df.to_csv(output_file, index=False)
-                print(f"Converted {file_path} to {output_file}")
-            
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
-                
\ No newline at end of file
+            base_filename = os.path.splitext(filename)[0]
+            output_file = os.path.join(output_directory, f"{base_filename}.csv")
+            tasks.append((file_path, output_file, formats, streaming, engine, batch_size))
+
+    settings = {"converter": "excel", "formats": list(formats), "streaming": streaming, "engine": engine}
+    with track_run("convert_excel_to_csv", profile=profile) as run_metrics:
+        results = run_incremental_conversions(
+            convert_excel_file, tasks, output_directory, settings, force=force, workers=workers
+        )
+    print_conversion_summary(results)
+    run_metrics.save(os.path.join(output_directory, ".conversion"), formats=("json",))
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts convert`
+    main(["convert", *sys.argv[1:]])
@@ -1,24 +1,31 @@
 import pandas as pd
 import os
-import plotly.express as px
 import numpy as np
-from xhtml2pdf import pisa
 import datetime
-from io import BytesIO
 import base64
+import numbers
+import re
+from io import BytesIO
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from scripts.cache import MANIFEST_NAME, Manifest, hash_file
+from scripts.charts import ChartRenderer, bar_chart_specs, default_renderer
+from scripts.metrics import file_size, stage, track_run
+from scripts.datasets import (
+    DROPPED_FORMATS, FORMATS, DatasetWriter, csv_engine, dataset_format, is_dataset, iter_dataset_chunks,
+    list_datasets, read_columns, write_dataset, write_view
+)
+from scripts.paths import dataset_name, find_directory
+from scripts.profile_store import STORE_NAME, ProfileStore
+from scripts.profiling import DatasetProfile, FileSummary
+from scripts.schema import load_dataset
 
-def find_directory(dir_name):
-    """
-    Locates the specified directory (e.g., 'data') by traversing upwards from the current working directory.
-    """
-    root_dir = os.getcwd()
-    while root_dir != os.path.dirname(root_dir):  # Traverse up until the root directory
-        if dir_name in os.listdir(root_dir):
-            return os.path.join(root_dir, dir_name)
-        root_dir = os.path.dirname(root_dir)
-    raise ValueError(f"Could not find '{dir_name}' directory in the path hierarchy.")
+# Bump when the layout of cached report sections changes
+REPORT_CACHE_VERSION = 5
 
-def generate_bar_charts(chart_df, x_axis, y_axis, base_title="", chunk_size=40, xaxis_label="X-Axis", yaxis_label="Y-Axis"):
+CSS_PATH = os.path.join(os.path.dirname(__file__), "../assets/styles.css")
+PAGE_BREAK = '<div style="page-break-before: always;"></div>'
+
+def generate_bar_charts(chart_df, x_axis, y_axis, base_title="", chunk_size=40, xaxis_label="X-Axis", yaxis_label="Y-Axis", renderer=None):
     """
     Generates bar charts in chunks and returns the HTML content for embedding in the report.
 
@@ -30,38 +37,25 @@ def generate_bar_charts(chart_df, x_axis, y_axis, base_title="", chunk_size=40,
         chunk_size (int): Maximum number of bars per chart.
         xaxis_label (str): Label for the x-axis.
         yaxis_label (str): Label for the y-axis.
+        renderer (ChartRenderer): Optional renderer to draw the charts with. Defaults to a
+            shared kaleido renderer that keeps recently drawn charts in memory.
 
     Returns:
         str: HTML content with embedded bar charts.
     """
-    charts_html = ""
-    for i in range(0, len(chart_df), chunk_size):
-        chunk = chart_df.iloc[i:i + chunk_size]
-        part_number = (i // chunk_size) + 1
-
-        # Generate the bar chart
-        fig = px.bar(
-            chunk,
-            x=x_axis,
-            y=y_axis,
-            text=y_axis,
-            title=f"{base_title} (Part {part_number})"
-        )
-        fig.update_traces(textposition="outside")
-        fig.update_layout(
-            xaxis=dict(tickangle=-45),
-            height=600,
-            margin=dict(l=50, r=50, t=50, b=150),
-            xaxis_title=xaxis_label,
-            yaxis_title=yaxis_label,
-        )
+    specs = bar_chart_specs(chart_df, x_axis, y_axis, base_title, chunk_size, xaxis_label, yaxis_label)
+    return render_chart_images(specs, renderer)
+
 
-        # Save the chart image to memory as Base64
-        buffer = BytesIO()
-        fig.write_image(buffer, format="png")
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.read()).decode("utf-8")
-        buffer.close()
+def render_chart_images(specs, renderer=None):
+    """
+    Draws chart specs with a renderer, by default a shared kaleido renderer, and returns
+    the HTML of the images, see `generate_bar_charts`.
+    """
+    renderer = renderer or default_renderer()
+    charts_html = ""
+    for part_number, image in enumerate(renderer.render(specs), start=1):
+        image_base64 = base64.b64encode(image).decode("utf-8")
 
         # Append the chart to the charts_html string
         charts_html += f"""
@@ -71,16 +65,146 @@ def generate_bar_charts(chart_df, x_axis, y_axis, base_title="", chunk_size=40,
     return charts_html
 
 
-def generate_unique_values_report(input_csv, column_names):
+def read_unique_values(input_csv, column_names, chunksize, engine="pandas"):
+    """
+    Collects the unique non-null values of some columns, reading only those columns
+    `chunksize` rows at a time so memory does not grow with the number of rows.
+
+    Parameters:
+        input_csv (str): Path to the input CSV, Parquet or Feather file.
+        column_names (list): Columns to collect unique values for.
+        chunksize (int): Number of rows read per chunk.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+
+    Returns:
+        dict: Array of unique values for each column.
+    """
+    unique_values = {column: set() for column in column_names}
+    try:
+        for chunk in iter_dataset_chunks(input_csv, chunksize, columns=column_names, engine=engine):
+            for column in column_names:
+                unique_values[column].update(chunk[column].dropna().unique().tolist())
+    except Exception as e:
+        raise ValueError(f"Error reading the CSV file: {e}")
+
+    return {column: np.array(list(values), dtype=object) for column, values in unique_values.items()}
+
+
+def count_column_values(series):
+    """
+    Counts the values of a column like `Series.value_counts`. Categorical columns are
+    counted from their codes, and equal counts keep the order a text column gives them
+    (first appearance) rather than the order of the categories.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.value_counts()
+    codes = series.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    order = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(series.cat.categories))[order]
+    index = pd.Index(series.cat.categories[order], name=series.name)
+    return pd.Series(counts, index=index, name="count").sort_values(ascending=False)
+
+
+def count_values(input_csv, column_names, chunksize=None, schema_dir=None, engine="pandas"):
+    """
+    Counts how often each non-null value occurs in some columns, reading only those columns.
+
+    Parameters:
+        input_csv (str): Path to the input CSV, Parquet or Feather file.
+        column_names (list): Columns to count values for.
+        chunksize (int): Optional number of rows to read at a time, for files larger than memory.
+        schema_dir (str): Optional directory of saved schemas, see `load_dataset`.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+
+    Returns:
+        dict: Series of value counts for each column, most frequent first.
+    """
+    try:
+        if not chunksize:
+            df = load_dataset(input_csv, columns=column_names, schema_dir=schema_dir, parse_dates=False, engine=engine)
+            return {column: count_column_values(df[column]) for column in column_names}
+
+        value_counts = {column: pd.Series(dtype="int64") for column in column_names}
+        for chunk in iter_dataset_chunks(input_csv, chunksize, columns=column_names, engine=engine):
+            for column in column_names:
+                value_counts[column] = value_counts[column].add(chunk[column].value_counts(), fill_value=0)
+    except Exception as e:
+        raise ValueError(f"Error reading the CSV file: {e}")
+
+    return {
+        column: counts.astype("int64").sort_values(ascending=False, kind="stable")
+        for column, counts in value_counts.items()
+    }
+
+
+def sort_key(value):
+    """
+    Sort key ordering numbers before text, so columns mixing both (common in Excel
+    exports) can be sorted instead of raising a TypeError.
+    """
+    if isinstance(value, numbers.Number):
+        return (0, value, "")
+    return (1, 0, str(value))
+
+
+def build_table_rows(rows):
+    """
+    Builds the HTML rows of a table from rows of cell values, in one pass.
+
+    Parameters:
+        rows (iterable): Rows, each an iterable of cell values.
+
+    Returns:
+        str: The `<tr>` elements.
+    """
+    parts = []
+    for row in rows:
+        parts.append("<tr>")
+        parts.extend(f"<td>{value}</td>" for value in row)
+        parts.append("</tr>")
+    return "".join(parts)
+
+
+def safe_file_name(name):
+    return re.sub(r"[^\w.-]+", "_", str(name)).strip("_") or "column"
+
+
+def generate_unique_values_report(input_csv, column_names, chunksize=None, top_n=None, appendix_format="csv",
+                                  profile=False, engine="pandas"):
     """
     Generates a PDF containing unique values for specified columns in a CSV file.
+    Parquet and Feather files are accepted too, and only the requested columns are read.
+
+    With `top_n`, each column shows only its N most frequent values with their counts,
+    plus its total and distinct counts, and the full list of values and counts is written
+    to an appendix file per column in `reports/<file name>_unique_vals/`. The PDF then
+    stays the same size however many distinct values a column has.
 
     Parameters:
-        input_csv (str): Path to the input CSV file.
+        input_csv (str): Path to the input CSV, Parquet or Feather file.
         column_names (list): List of column names to extract unique values for.
+        chunksize (int): Optional number of rows to read at a time, for files larger than memory.
+        top_n (int): Optional number of most frequent values to show per column.
+        appendix_format (str): Format of the appendix files: "csv", "parquet" or "feather".
+        profile (bool): Also profile the run with cProfile.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader,
+            which only converts the requested columns. Falls back to pandas without pyarrow.
+
+    Stage metrics are saved next to the PDF, as for `process_and_generate_report`.
 
     Returns:
-        None
+        str: Path of the PDF report.
+    """
+    with track_run("generate_unique_values_report", profile=profile) as run_metrics:
+        output_pdf = build_unique_values_report(input_csv, column_names, chunksize, top_n, appendix_format, engine)
+        run_metrics.save(os.path.splitext(output_pdf)[0])
+    return output_pdf
+
+
+def build_unique_values_report(input_csv, column_names, chunksize, top_n, appendix_format, engine="pandas"):
+    """
+    Builds the report described in `generate_unique_values_report` and returns its path.
     """
     
     # Locate the `data` directory dynamically
@@ -90,35 +214,59 @@ def generate_unique_values_report(input_csv, column_names):
     if not os.path.exists(reports_folder):
         os.makedirs(reports_folder)
 
+    if appendix_format not in FORMATS:
+        raise ValueError(f"Unsupported appendix format '{appendix_format}', use one of: {', '.join(FORMATS)}.")
+    csv_engine(engine)
+
     # Generate the output PDF path
-    base_name = os.path.splitext(os.path.basename(input_csv))[0]
+    base_name = dataset_name(input_csv)
     output_pdf = os.path.join(reports_folder, f"{base_name}_unique_vals.pdf")
+    schema_dir = os.path.join(reports_folder, ".cache", "schemas")
 
-    # Load the CSV file
+    # Validate column names
     try:
-        df = pd.read_csv(input_csv, low_memory=False)
+        header = read_columns(input_csv)
     except Exception as e:
         raise ValueError(f"Error reading the CSV file: {e}")
-
-    # Validate column names
-    missing_columns = [col for col in column_names if col not in df.columns]
+    missing_columns = [col for col in column_names if col not in header]
     if missing_columns:
         raise ValueError(f"The following columns are missing in the CSV file: {', '.join(missing_columns)}")
 
-    # Extract unique values
-    unique_values_html = ""
-    for column in column_names:
-        unique_values = df[column].dropna().unique()
-        unique_values.sort()
+    if top_n:
+        with stage("count_values", input_csv, bytes_read=file_size(input_csv)) as record:
+            column_value_counts = count_values(input_csv, column_names, chunksize, schema_dir, engine)
+            record["rows"] = max((int(counts.sum()) for counts in column_value_counts.values()), default=0)
+        unique_values_html = render_top_values_html(
+            column_value_counts,
+            top_n,
+            os.path.join(reports_folder, f"{base_name}_unique_vals"),
+            appendix_format,
+        )
+    else:
+        with stage("read_values", input_csv, bytes_read=file_size(input_csv)):
+            if chunksize:
+                column_unique_values = read_unique_values(input_csv, column_names, chunksize, engine)
+            else:
+                # Load only the requested columns
+                try:
+                    df = load_dataset(
+                        input_csv, columns=column_names, schema_dir=schema_dir, parse_dates=False, engine=engine
+                    )
+                except Exception as e:
+                    raise ValueError(f"Error reading the CSV file: {e}")
+
+                column_unique_values = {column: df[column].dropna().unique() for column in column_names}
+
+        # Extract unique values
+        unique_values_html = ""
+        for column in column_names:
+            unique_values = sorted(column_unique_values[column], key=sort_key)
 
-        # Format unique values into rows of three columns
-        rows = ""
-        for i in range(0, len(unique_values), 3):
-            row = unique_values[i:i+3]
-            rows += "<tr>" + "".join(f"<td>{val}</td>" for val in row) + "</tr>"
+            # Format unique values into rows of three columns
+            rows = build_table_rows(unique_values[i:i+3] for i in range(0, len(unique_values), 3))
 
-        # Add the table for this column to the HTML
-        unique_values_html += f"""
+            # Add the table for this column to the HTML
+            unique_values_html += f"""
         <h2 class="sub-header">Unique Values in Column: {column}</h2>
         <table class="unique-values-table">
             <tbody>
@@ -142,9 +290,61 @@ def generate_unique_values_report(input_csv, column_names):
     """
 
     # Create the PDF
-    with open(output_pdf, "wb") as pdf_file:
-        pisa.CreatePDF(html_report, dest=pdf_file)
+    from xhtml2pdf import pisa
+
+    with stage("render_pdf", input_csv) as record:
+        with open(output_pdf, "wb") as pdf_file:
+            pisa.CreatePDF(html_report, dest=pdf_file)
+        record["bytes_written"] = file_size(output_pdf)
     print(f"PDF report generated: {output_pdf}")
+    return output_pdf
+
+
+def render_top_values_html(column_value_counts, top_n, appendix_dir, appendix_format="csv"):
+    """
+    Generates the HTML of the most frequent values of each column and writes the full
+    value counts of each column to an appendix file.
+
+    Parameters:
+        column_value_counts (dict): Series of value counts for each column, see `count_values`.
+        top_n (int): Number of most frequent values to show per column.
+        appendix_dir (str): Directory where the appendix files are written.
+        appendix_format (str): Format of the appendix files: "csv", "parquet" or "feather".
+
+    Returns:
+        str: HTML content with one table per column.
+    """
+    os.makedirs(appendix_dir, exist_ok=True)
+
+    sections = []
+    for column, counts in column_value_counts.items():
+        appendix_path = os.path.join(appendix_dir, f"{safe_file_name(column)}{FORMATS[appendix_format]}")
+        with stage("write_appendix", column, rows=len(counts)) as record:
+            write_dataset(pd.DataFrame({"Value": counts.index, "Count": counts.to_numpy()}), appendix_path)
+            record["bytes_written"] = file_size(appendix_path)
+        print(f"Saved value counts for {column}: {appendix_path}")
+
+        # Most frequent first, ties in value order
+        top_values = sorted(counts.head(top_n).items(), key=lambda item: (-item[1], sort_key(item[0])))
+        rows = build_table_rows(top_values)
+
+        sections.append(f"""
+        <h2 class="sub-header">Unique Values in Column: {column}</h2>
+        <p>Total values: {int(counts.sum())}. Distinct values: {len(counts)}.
+        Showing the {min(top_n, len(counts))} most frequent; all values are listed in {os.path.basename(appendix_path)}.</p>
+        <table class="value-counts-table">
+            <thead>
+                <tr>
+                    <th>Value</th>
+                    <th>Count</th>
+                </tr>
+            </thead>
+            <tbody>
+                {rows}
+            </tbody>
+        </table>
+        """)
+    return "".join(sections)
 
 def generate_cover_page(input_path):
     """
@@ -185,53 +385,23 @@ def generate_cover_page(input_path):
     """
     return cover_page_html
 
-def generate_summary_with_xhtml2pdf(directory):
+def render_summary_html(profiles):
     """
-    Generates the HTML content for a summary page using xhtml2pdf.
+    Generates the HTML content for a summary page from per-file profiles.
 
     Parameters:
-        directory (str): Path to the directory containing multiple CSV files.
+        profiles (list): `DatasetProfile` or `FileSummary` of each file.
+
     Returns:
         str: HTML content for the summary.
     """
-    # Ensure the directory exists and contains CSV files
-    if not os.path.isdir(directory):
-        raise ValueError(f"The directory '{directory}' does not exist or is not a directory.")
+    stats = [profile.summary() for profile in profiles]
 
-    csv_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".csv")]
-    if not csv_files:
-        raise ValueError(f"No CSV files found in the directory '{directory}'.")
-
-    # Initialize summary data
-    all_columns = set()
-    file_columns = {}
-    stats = []
-
-    # Collect data from all files
-    for csv_file_path in csv_files:
-        base_file_name = os.path.basename(csv_file_path)
-
-        # Load the dataset
-        try:
-            df = pd.read_csv(csv_file_path, index_col=0, low_memory=False)
-        except Exception as e:
-            print(f"Error loading file {csv_file_path}: {e}")
-            continue
-
-        # Collect columns and compute stats
-        total_columns = df.columns.tolist()
-        dropped_columns = len(df.columns[df.isnull().all()])
-        number_of_rows = df.shape[0]
-
-        file_columns[base_file_name] = total_columns
-        all_columns.update(total_columns)
-
-        stats.append({
-            "File": base_file_name,
-            "Total Columns": len(total_columns),
-            "Dropped Columns": dropped_columns,
-            "Rows": number_of_rows,
-        })
+    # Index the files of each column in one pass, instead of searching every file for every column
+    files_by_column = {}
+    for stat in stats:
+        for column in dict.fromkeys(stat["Columns"]):
+            files_by_column.setdefault(column, []).append(stat["File"])
 
     # Generate HTML content
     html_content = f"""
@@ -249,8 +419,8 @@ def generate_summary_with_xhtml2pdf(directory):
         <tbody>
     """
 
-    for stat in stats:
-        html_content += f"""
+    html_content += "".join(
+        f"""
             <tr>
                 <td>{stat['File']}</td>
                 <td>{stat['Total Columns']}</td>
@@ -258,6 +428,8 @@ def generate_summary_with_xhtml2pdf(directory):
                 <td>{stat['Rows']}</td>
             </tr>
         """
+        for stat in stats
+    )
     
     html_content += """
         </tbody>
@@ -273,14 +445,15 @@ def generate_summary_with_xhtml2pdf(directory):
         <tbody>
     """
 
-    for column in sorted(all_columns):
-        files_with_column = [file for file, cols in file_columns.items() if column in cols]
-        html_content += f"""
+    html_content += "".join(
+        f"""
         <tr>
             <td>{column}</td>
-            <td>{', '.join(files_with_column)}</td>
+            <td>{', '.join(files_by_column[column])}</td>
         </tr>
         """
+        for column in sorted(files_by_column)
+    )
 
     html_content += """
         </tbody>
@@ -289,17 +462,524 @@ def generate_summary_with_xhtml2pdf(directory):
     return html_content
 
 
-def process_and_generate_report(input_path):
+def summarize_file(path, engine="pandas"):
+    """
+    Returns the `FileSummary` of a file, or the error that stopped it. Runs inside pool workers.
+    """
+    try:
+        return FileSummary.from_file(path, engine=engine), None
+    except Exception as e:
+        return None, str(e)
+
+
+def summarize_files(paths, workers=1, engine="pandas"):
+    """
+    Summarizes files for the summary page, spreading them across processes.
+
+    Parameters:
+        paths (list): Paths of the dataset files.
+        workers (int): Number of processes. 1 reads in this process, 0 uses every core.
+        engine (str): CSV reader, "pandas" or "pyarrow". Arrow parses each file on
+            several threads, so it suits a few large files better than many processes.
+
+    Returns:
+        list: `(FileSummary, error)` of each file, in order.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [summarize_file(path, engine) for path in paths]
+
+    workers = min(workers, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Batches keep the per-task overhead low on directories of many small exports
+        return list(executor.map(
+            summarize_file, paths, [engine] * len(paths), chunksize=max(1, len(paths) // (workers * 4))
+        ))
+
+
+def generate_summary_with_xhtml2pdf(directory, workers=1, engine="pandas"):
+    """
+    Generates the HTML content for a summary page using xhtml2pdf. Files are not loaded:
+    their columns come from the headers and their row and null counts from a scan that
+    only reads the columns it needs, see `FileSummary.from_file`.
+
+    Parameters:
+        directory (str): Path to the directory containing multiple CSV files.
+        workers (int): Number of processes scanning files. 0 uses every core.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+    Returns:
+        str: HTML content for the summary.
+    """
+    # Ensure the directory exists and contains CSV files
+    if not os.path.isdir(directory):
+        raise ValueError(f"The directory '{directory}' does not exist or is not a directory.")
+
+    csv_files = list_datasets(directory)
+    if not csv_files:
+        raise ValueError(f"No CSV files found in the directory '{directory}'.")
+
+    # Collect data from all files
+    summaries = []
+    for csv_file_path, (summary, error) in zip(csv_files, summarize_files(csv_files, workers, engine)):
+        if error is not None:
+            print(f"Error loading file {csv_file_path}: {error}")
+            continue
+        summaries.append(summary)
+
+    return render_summary_html(summaries)
+
+
+def unique_count_specs(profile):
+    """
+    Returns the specs of the unique count charts of a file's section, see `bar_chart_specs`.
+    """
+    base_file_name = dataset_name(profile.file_name)
+    current_columns = profile.current_columns
+    chart_df = pd.DataFrame({
+        "Column": [col.name for col in current_columns],
+        "Unique Count": [col.distinct_count for col in current_columns],
+    }).sort_values(by="Unique Count", ascending=False)
+    return bar_chart_specs(
+        chart_df,
+        x_axis="Column",
+        y_axis="Unique Count",
+        base_title=f"Unique Count of Values for {base_file_name}",
+        xaxis_label="Column Names",
+        yaxis_label="Unique Count",
+    )
+
+
+def render_file_section(profile, renderer=None, charts_html=None):
+    """
+    Generates the HTML content of one file's section of the report.
+
+    Parameters:
+        profile (DatasetProfile): Profile of the file.
+        renderer (ChartRenderer): Optional renderer for the charts.
+        charts_html (str): Optional HTML of the charts, in place of the images drawn by `renderer`.
+
+    Returns:
+        str: HTML content for the section.
+    """
+    base_file_name = dataset_name(profile.file_name)
+    dropped_columns = profile.dropped_columns
+    current_columns = profile.current_columns
+
+    # Generate Columns with Zeros section
+    columns_with_zeros_list = [col.name for col in current_columns if col.has_zeros]
+    columns_with_zeros = ""
+    if columns_with_zeros_list:
+        columns_with_zeros = f"""
+            <h2 class="sub-header">Columns with Zeros:</h2>
+            <p>{', '.join(columns_with_zeros_list)}</p>
+        """
+
+    # List unique counts that are estimates, with their error bounds
+    estimated_unique_counts = ""
+    if profile.estimated_columns:
+        estimated_rows = ""
+        for col in profile.estimated_columns:
+            error = col.distinct_error * col.distinct_count
+            estimated_rows += f"""
+            <tr>
+                <td>{col.name}</td>
+                <td>~{col.distinct_count}</td>
+                <td>&plusmn;{error:.0f} ({col.distinct_error:.1%}, 1 std. error)</td>
+            </tr>
+            """
+        estimated_unique_counts = f"""
+        <h2 class="sub-header">Estimated Unique Counts:</h2>
+        <p>These columns have too many distinct values to count exactly; their unique counts are HyperLogLog estimates.</p>
+        <table class="value-counts-table">
+            <thead>
+                <tr>
+                    <th>Column</th>
+                    <th>Unique Count</th>
+                    <th>Error Bound</th>
+                </tr>
+            </thead>
+            <tbody>
+                {estimated_rows}
+            </tbody>
+        </table>
+        """
+
+    # Generate bar charts for unique counts
+    if charts_html is None:
+        with stage("charts", profile.path, rows=len(current_columns)):
+            charts_html = render_chart_images(unique_count_specs(profile), renderer)
+    
+    # Generate table rows for column value counts
+    col_value_table_rows = ""
+    for col in current_columns:
+        col_value_table_rows += f"""
+        <tr>
+            <td>{col.name}</td>
+            <td>{col.non_null_count}</td>
+        </tr>
+        """
+
+    # Add column value counts table
+    column_counts_table = f"""
+    <h2 class="sub-header">Column Value Counts:</h2>
+    <table class="value-counts-table">
+        <thead>
+            <tr>
+                <th>Column</th>
+                <th>Value Count</th>
+            </tr>
+        </thead>
+        <tbody>
+            {col_value_table_rows}
+        </tbody>
+    </table>
+    """
+
+    # Analysis details for the report
+    return f"""
+        <h1 class="header">Report for {base_file_name}</h1>
+        <h2 class="sub-header">Dropped Columns ({len(dropped_columns)}):</h2>
+        <p>{', '.join(dropped_columns) if dropped_columns else "None"}</p>
+        <h2 class="sub-header">Current Columns ({len(current_columns)}):</h2>
+        <p>{', '.join(col.name for col in current_columns)}</p>
+        <h2 class="sub-header">Number of Rows:</h2>
+        <p>{profile.row_count}</p>
+        <h2 class="sub-header">Number of Empty Rows:</h2>
+        <p>{profile.empty_row_count}</p>
+        {column_counts_table}
+        {columns_with_zeros}
+        {estimated_unique_counts}
+        {charts_html}
+        <div style="page-break-before: always;"></div>
+    """
+
+
+def write_dropped_chunks(csv_file_path, dropped_csv_path, columns, chunksize, engine="pandas"):
+    """
+    Writes a copy of a dataset keeping only some columns, `chunksize` rows at a time.
+    CSV values are copied as text, exactly as they appear in the input.
+
+    Parameters:
+        csv_file_path (str): Path to the CSV, Parquet or Feather file.
+        dropped_csv_path (str): Path of the copy to write; its extension sets the format.
+        columns (list): Columns to keep.
+        chunksize (int): Number of rows read per chunk.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+    """
+    chunks = iter_dataset_chunks(
+        csv_file_path, chunksize, index_col=0, engine=engine, dtype=str, keep_default_na=False
+    )
+    with DatasetWriter(dropped_csv_path) as writer:
+        for chunk in chunks:
+            writer.write(chunk[columns])
+
+
+def write_dropped_copy(csv_file_path, dropped_path, profile, df=None, chunksize=None, engine="pandas"):
+    """
+    Writes the dropped-columns copy of a profiled dataset, keeping the columns that hold
+    values. A column view only records them, see `write_view`; other copies are written
+    from the loaded DataFrame or, without one, by reading the file `chunksize` rows at a time.
+
+    Parameters:
+        csv_file_path (str): Path to the CSV, Parquet or Feather file.
+        dropped_path (str): Path of the copy to write; its extension sets the format.
+        profile (DatasetProfile): Profile of the file.
+        df (DataFrame): Optional loaded dataset.
+        chunksize (int): Number of rows read per chunk without `df`.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+    """
+    columns = [col.name for col in profile.current_columns]
+    with stage("write_dropped", csv_file_path, rows=profile.row_count) as record:
+        if dataset_format(dropped_path) == "view":
+            write_view(dropped_path, csv_file_path, columns, profile.dropped_columns, profile.row_count)
+        elif df is not None:
+            write_dataset(df[columns], dropped_path)
+        else:
+            write_dropped_chunks(csv_file_path, dropped_path, columns, chunksize, engine)
+        record["bytes_written"] = file_size(dropped_path)
+    print(f"Saved cleaned {dataset_format(dropped_path).upper()}: {dropped_path}")
+
+
+def profile_file(csv_file_path, dropped_dir, chunksize=None, dropped_format="csv", schema_dir=None, engine="pandas",
+                 executor=None, workers=1):
+    """
+    Profiles one dataset file and saves its dropped-columns copy.
+
+    Parameters:
+        csv_file_path (str): Path to the CSV, Parquet or Feather file.
+        dropped_dir (str): Directory where the copy with dropped columns is saved.
+        chunksize (int): Optional number of rows to read at a time. The file is then profiled
+            out of core and high-cardinality unique counts are estimated.
+        dropped_format (str): Format of the dropped-columns copy, one of `DROPPED_FORMATS`.
+        schema_dir (str): Optional directory where the dtypes inferred for the file are saved
+            and reused, see `load_dataset`.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+        executor (Executor): Optional executor writing the copy in the background. The
+            result then holds the future of the write as "copy".
+        workers (int): Number of processes profiling shards of a CSV file in parallel, when
+            profiling it in chunks. 0 uses every core.
+
+    Returns:
+        dict or None: The file's `DatasetProfile`, or None if the file could not be loaded.
+    """
+    base_file_name = dataset_name(csv_file_path)
+    dropped_path = os.path.join(dropped_dir, f"{base_file_name}_dropped{DROPPED_FORMATS[dropped_format]}")
+
+    def write_copy(**data):
+        if executor is None:
+            write_dropped_copy(csv_file_path, dropped_path, profile, **data)
+            return None
+        return executor.submit(write_dropped_copy, csv_file_path, dropped_path, profile, **data)
+
+    if chunksize:
+        try:
+            with stage("profile", csv_file_path, bytes_read=file_size(csv_file_path)) as record:
+                profile = DatasetProfile.from_chunks(csv_file_path, chunksize, engine=engine, workers=workers)
+                record["rows"] = profile.row_count
+            copy = write_copy(chunksize=chunksize, engine=engine)
+        except Exception as e:
+            print(f"Error loading file {csv_file_path}: {e}")
+            return None
+    else:
+        # Load CSV data
+        try:
+            with stage("load", csv_file_path, bytes_read=file_size(csv_file_path)) as record:
+                df = load_dataset(csv_file_path, index_col=0, schema_dir=schema_dir, engine=engine)
+                record["rows"] = len(df)
+        except Exception as e:
+            print(f"Error loading file {csv_file_path}: {e}")
+            return None
+
+        with stage("profile", csv_file_path, rows=len(df)):
+            profile = DatasetProfile.from_dataframe(df, csv_file_path)
+
+        # Save the cleaned DataFrame
+        copy = write_copy(df=df)
+
+    return {"profile": profile, "copy": copy}
+
+
+def generate_file_section(csv_file_path, dropped_dir, chunksize=None, dropped_format="csv", renderer=None,
+                          schema_dir=None, engine="pandas", executor=None, workers=1):
+    """
+    Profiles one dataset file, saves its dropped-columns copy and generates its report
+    section. The options are those of `profile_file`, and `renderer` optionally draws the charts.
+
+    Returns:
+        dict or None: The section HTML and the file's `DatasetProfile`, or None if the file could not be loaded.
+    """
+    section = profile_file(csv_file_path, dropped_dir, chunksize, dropped_format, schema_dir, engine, executor, workers)
+    if section is not None:
+        section["html"] = render_file_section(section["profile"], renderer)
+    return section
+
+
+def html_document(body_html, footer=False):
+    """
+    Wraps report content in an HTML document with the report styles and page layout.
+
+    Parameters:
+        body_html (str): Content of the document body.
+        footer (bool): Whether pages define the footer frame, filled by an element with id `footer_content`.
+
+    Returns:
+        str: The HTML document.
+    """
+    # Inline the CSS
+    with open(CSS_PATH, "r") as css_file:
+        inline_styles = f"<style>{css_file.read()}</style>"
+
+    footer_frame = ""
+    if footer:
+        footer_frame = """
+                    @frame footer_frame {
+                        -pdf-frame-content: footer_content;
+                        bottom: 1cm; 
+                        left: 1cm;
+                        width: 19cm;
+                        height: 1cm;
+                    }"""
+
+    return f"""
+    <html>
+        <head>
+            {inline_styles}
+            <style>
+                @page {{
+                    size: A4;
+                    margin: 2cm;{footer_frame}
+                }}
+            </style>
+        </head>
+        <body>
+            {body_html}
+        </body>
+    </html>
+    """
+
+
+def render_pdf(html):
+    """
+    Renders an HTML document to PDF bytes. Runs inside pool workers.
+    """
+    # xhtml2pdf takes about a second to import, so it is only loaded to render
+    from xhtml2pdf import pisa
+
+    buffer = BytesIO()
+    result = pisa.CreatePDF(html, dest=buffer)
+    if result.err:
+        print(f"Errors while rendering PDF: {result.err}")
+    return buffer.getvalue()
+
+
+def render_pdfs(documents, workers=1):
+    """
+    Renders HTML documents to PDF, spreading them across processes. xhtml2pdf slows down
+    more than linearly on long documents, so many short ones render much faster.
+
+    Parameters:
+        documents (list): HTML documents to render.
+        workers (int): Number of processes. 1 renders in this process, 0 uses every core.
+
+    Returns:
+        list: PDF bytes of each document, in order.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(documents) <= 1:
+        return [render_pdf(html) for html in documents]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(documents))) as executor:
+        return list(executor.map(render_pdf, documents))
+
+
+def render_page_footers(page_count):
+    """
+    Renders a PDF of `page_count` pages holding only the "Page X of Y" footer, to stamp
+    onto a report assembled from separately rendered parts.
+    """
+    pages = f"{PAGE_BREAK}".join(["<p>&nbsp;</p>"] * page_count)
+    return render_pdf(html_document(f"""
+            <!-- Footer Definition -->
+            <div id="footer_content" class="footer">
+                Page <pdf:pageNumber> of <pdf:pageCount>
+            </div>
+            {pages}
+    """, footer=True))
+
+
+def merge_pdfs(parts, pdf_path):
+    """
+    Concatenates PDF parts into one report and numbers its pages in the footer.
+
+    Parameters:
+        parts (list): Paths or bytes of the PDFs to merge, in order.
+        pdf_path (str): Path of the merged PDF.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        reader = PdfReader(BytesIO(part) if isinstance(part, bytes) else part)
+        for page in reader.pages:
+            writer.add_page(page)
+
+    footers = PdfReader(BytesIO(render_page_footers(len(writer.pages))))
+    for page, footer in zip(writer.pages, footers.pages):
+        page.merge_page(footer)
+
+    with open(pdf_path, "wb") as pdf_file:
+        writer.write(pdf_file)
+
+
+def report_inputs(input_path):
+    """
+    Returns the dataset files a report covers and the name of the report.
+
+    Parameters:
+        input_path (str): Path to a CSV, Parquet or Feather file or a directory of them.
+
+    Returns:
+        tuple: The paths of the files and the report name, after the file or directory.
+    """
+    if os.path.isfile(input_path):
+        if not is_dataset(input_path):
+            raise ValueError(f"The input file '{input_path}' is not a CSV, Parquet or Feather file.")
+        return [input_path], dataset_name(input_path)
+    if os.path.isdir(input_path):
+        csv_files = list_datasets(input_path)
+        if not csv_files:
+            raise ValueError(f"No CSV files found in the directory '{input_path}'.")
+        return csv_files, os.path.basename(os.path.normpath(input_path))
+    raise ValueError(f"The input path '{input_path}' is neither a valid file nor a directory.")
+
+
+def process_and_generate_report(input_path, force=False, chunksize=None, dropped_format="csv",
+                                chart_backend="kaleido", chart_workers=1, workers=1, profile=False, engine="pandas"):
     """
     Cleans the data, performs analysis, and generates a PDF report for one or more CSV files.
     Saves processed CSV files with dropped columns into a 'dropped' folder within the 'data' directory.
     Saves reports in a sibling folder to the 'data' directory.
 
+    The cover and summary and each file's section are rendered to separate PDFs, in
+    parallel with `workers` > 1, then merged and given page numbers.
+
+    Per-file sections and their PDFs are cached under `reports/.cache/<report name>/` together
+    with a manifest of the inputs they were built from, and reused while the inputs are unchanged.
+
+    Parquet and Feather files written by the converters are read directly, with their types.
+    Files are loaded with compact dtypes (downcast numbers, dates, categorical text), and
+    the dtypes inferred for each file are saved under `reports/.cache/schemas/` and reused.
+
+    Chart images are cached under `reports/.cache/charts/` by a hash of their data and
+    layout, so identical charts are only drawn once across files and runs.
+
+    The duration, rows, bytes and memory of each stage (loading, profiling, charts, PDF
+    rendering, ...) of each file are saved next to the PDF in `<report>_metrics.json` and
+    `<report>_metrics.csv`, and logged as JSON lines on the `scripts.metrics` logger.
+
     Parameters:
         input_path (str): Path to a CSV file or a directory containing multiple CSV files.
+        force (bool): Rebuild every section, even for files unchanged since the last run.
+        chunksize (int): Optional number of rows to read at a time, so files larger than memory
+            can be profiled. Unique counts of high-cardinality columns are then estimated and
+            shown with their error bounds.
+        dropped_format (str): Format of the dropped-columns copies: "csv", "csv.gz" (gzip-compressed
+            CSV), "parquet" or "feather", or "view" to write no copy but a column view of each file,
+            a small JSON file the loaders read as the file without its dropped columns.
+        chart_backend (str): "kaleido" for Plotly charts, or "matplotlib" for lighter static charts.
+        chart_workers (int): Number of processes drawing charts in parallel. Each one keeps its
+            renderer running for the whole report.
+        workers (int): Number of processes rendering PDF sections in parallel, and of threads
+            writing the dropped-columns copies while the next files are profiled. With `chunksize`,
+            also the number of processes profiling shards of each CSV file, so one large file
+            uses every core too. 0 uses every core.
+        profile (bool): Also profile the run with cProfile, saving the stats to `<report>_profile.prof`.
+        engine (str): CSV reader: "pandas" for pandas' C parser, or "pyarrow" for Arrow's
+            multi-threaded reader, whose parse time scales with the cores. Values are typed
+            as pandas would, so reports are the same with both. Falls back to pandas when
+            pyarrow is not installed or cannot parse a file.
 
     Returns:
-        None
+        str: Path of the PDF report.
+    """
+    with track_run("process_and_generate_report", profile=profile) as run_metrics:
+        pdf_path = build_report(
+            input_path, force, chunksize, dropped_format, chart_backend, chart_workers, workers, engine
+        )
+        run_metrics.save(os.path.splitext(pdf_path)[0])
+    return pdf_path
+
+
+def build_report(input_path, force, chunksize, dropped_format, chart_backend, chart_workers, workers, engine="pandas",
+                 source=None):
+    """
+    Builds the report described in `process_and_generate_report` and returns its path.
+
+    `source` optionally profiles the input files itself instead of reading them as
+    datasets, see `scripts.pipeline.XmlSource`. It names the report and provides the
+    files to report on and the section of each file.
     """
     
     # Locate the `data` directory dynamically
@@ -310,16 +990,17 @@ def process_and_generate_report(input_path):
     os.makedirs(reports_folder, exist_ok=True)
     
     # Check if input is a file or a directory
-    if os.path.isfile(input_path):
-        csv_files = [input_path]
-        pdf_name = os.path.splitext(os.path.basename(input_path))[0] + "_report.pdf"
-        dropped_dir = os.path.join(data_directory, os.path.splitext(os.path.basename(input_path))[0] + "_dropped")
-    elif os.path.isdir(input_path):
-        csv_files = [os.path.join(input_path, f) for f in os.listdir(input_path) if f.endswith(".csv")]
-        pdf_name = os.path.basename(os.path.normpath(input_path)) + "_report.pdf"
-        dropped_dir = os.path.join(data_directory, os.path.basename(os.path.normpath(input_path)) + "_dropped")
+    if dropped_format not in DROPPED_FORMATS:
+        raise ValueError(f"Unsupported dropped format '{dropped_format}', use one of: {', '.join(DROPPED_FORMATS)}.")
+    csv_engine(engine)
+
+    if source is not None:
+        csv_files = source.files
+        report_name = source.name
     else:
-        raise ValueError(f"The input path '{input_path}' is neither a valid file nor a directory.")
+        csv_files, report_name = report_inputs(input_path)
+    pdf_name = report_name + "_report.pdf"
+    dropped_dir = os.path.join(data_directory, report_name + "_dropped")
 
     # os.makedirs(output_folder, exist_ok=True)
     os.makedirs(dropped_dir, exist_ok=True)
@@ -327,214 +1008,127 @@ def process_and_generate_report(input_path):
     # Generate the cover page
     cover_page_html = generate_cover_page(input_path)
 
+    # Generate the per-file sections, reusing cached ones for unchanged files
+    cache_dir = os.path.join(reports_folder, ".cache", os.path.splitext(pdf_name)[0])
+    manifest = Manifest(os.path.join(cache_dir, MANIFEST_NAME))
+    settings = {
+        "report": REPORT_CACHE_VERSION,
+        "dropped_dir": os.path.abspath(dropped_dir),
+        "dropped_format": dropped_format,
+        "chunksize": chunksize,
+        "chart_backend": chart_backend,
+        "styles": hash_file(CSS_PATH),
+    }
+    if source is not None:
+        settings["source"] = source.settings
+    os.makedirs(cache_dir, exist_ok=True)
+    renderer = ChartRenderer(
+        chart_backend, cache_dir=os.path.join(reports_folder, ".cache", "charts"), workers=chart_workers
+    )
+    # Dropped-columns copies are written in threads while the next files are profiled
+    copy_workers = (os.cpu_count() or 1) if workers == 0 else workers
+    copier = ThreadPoolExecutor(max_workers=copy_workers) if copy_workers > 1 and source is None else None
+    copies = []
+
+    profiles = []
+    profile_paths = []
+    section_pdfs = []
+    pending = []
+    for csv_file_path in csv_files:
+        base_file_name = dataset_name(csv_file_path)
+        section_path = os.path.join(cache_dir, f"{base_file_name}.html")
+        section_pdf_path = os.path.join(cache_dir, f"{base_file_name}.pdf")
+        dropped_csv_path = os.path.join(dropped_dir, f"{base_file_name}_dropped{DROPPED_FORMATS[dropped_format]}")
+
+        entry = None if force else manifest.lookup(csv_file_path, settings)
+        if entry:
+            print(f"Reusing report section for unchanged file: {csv_file_path}")
+            with stage("reuse_section", csv_file_path):
+                profile = DatasetProfile.from_dict(entry["profile"])
+        else:
+            if source is not None:
+                section = source.build_section(csv_file_path, dropped_dir, chunksize, dropped_format, renderer)
+            else:
+                section = generate_file_section(
+                    csv_file_path, dropped_dir, chunksize=chunksize, dropped_format=dropped_format, renderer=renderer,
+                    schema_dir=os.path.join(reports_folder, ".cache", "schemas"), engine=engine, executor=copier,
+                    workers=workers,
+                )
+            if section is None:
+                manifest.invalidate(csv_file_path)
+                continue
+            if section.get("copy") is not None:
+                copies.append((csv_file_path, section["copy"]))
+                # Each waiting copy keeps its dataset in memory, so wait for a free thread
+                running = [copy for _, copy in copies if not copy.done()]
+                if len(running) >= copy_workers:
+                    wait(running, return_when=FIRST_COMPLETED)
+            with open(section_path, "w") as section_file:
+                section_file.write(section["html"])
+            profile = section["profile"]
+            # Other files written with the section, such as the CSV sink of `source`
+            outputs = [section_path, dropped_csv_path, *section.get("outputs", []), section_pdf_path]
+            pending.append((csv_file_path, section, outputs))
+
+        profiles.append(profile)
+        profile_paths.append(csv_file_path)
+        section_pdfs.append(section_pdf_path)
+
+    renderer.close()
+
+    failed_copies = set()
+    for csv_file_path, copy in copies:
+        try:
+            copy.result()
+        except Exception as e:
+            print(f"Error saving the dropped columns of {csv_file_path}: {e}")
+            failed_copies.add(csv_file_path)
+    if copier is not None:
+        copier.shutdown()
+
     # Generate summary HTML content
     summary_html = ""
     if os.path.isdir(input_path):
-        summary_html = generate_summary_with_xhtml2pdf(input_path)
-    
-    # Inline the CSS
-    css_path = os.path.join(os.path.dirname(__file__), "../assets/styles.css")
-    with open(css_path, "r") as css_file:
-        inline_styles = f"<style>{css_file.read()}</style>"
-    
-    html_report = f"""
-    <html>
-        <head>
-            {inline_styles}
-            <style>
-                @page {{
-                    size: A4;
-                    margin: 2cm;
-                    @frame footer_frame {{
-                        -pdf-frame-content: footer_content;
-                        bottom: 1cm; 
-                        left: 1cm;
-                        width: 19cm;
-                        height: 1cm;
-                    }}
-                }}
-            </style>
-        </head>
-        <body>
+        with stage("summary", rows=len(profiles)):
+            summary_html = render_summary_html(profiles)
+
+    front_html = f"""
             <!-- Cover Page -->
             {cover_page_html}
             
-            <div style="page-break-before: always;"></div>
-            
-            <!-- Footer Definition -->
-            <div id="footer_content" class="footer">
-                Page <pdf:pageNumber> of <pdf:pageCount>
-            </div>
+            {PAGE_BREAK}
             
             <!-- Summary Content -->
             {summary_html}
-            
-            <div style="page-break-before: always;"></div>
-
-            <!-- Report Content -->
     """
 
-    for csv_file_path in csv_files:
-        base_file_name = os.path.splitext(os.path.basename(csv_file_path))[0]
-
-        # Load CSV data
-        try:
-            df = pd.read_csv(csv_file_path, index_col=0, low_memory=False)
-        except Exception as e:
-            print(f"Error loading file {csv_file_path}: {e}")
+    # Render the cover and summary and every new section to PDF, in parallel
+    documents = [html_document(front_html)] + [html_document(section["html"]) for _, section, _ in pending]
+    with stage("render_pdf", rows=len(documents)) as record:
+        front_pdf, *new_pdfs = render_pdfs(documents, workers=workers)
+        record["bytes_written"] = len(front_pdf) + sum(len(section_pdf) for section_pdf in new_pdfs)
+    for (csv_file_path, section, outputs), section_pdf in zip(pending, new_pdfs):
+        with open(outputs[-1], "wb") as pdf_file:
+            pdf_file.write(section_pdf)
+        if csv_file_path in failed_copies:
+            manifest.invalidate(csv_file_path)
             continue
+        manifest.record(csv_file_path, settings, outputs, profile=section["profile"].to_dict())
+    manifest.save()
 
-        # Perform data analysis
-        original_columns = df.columns.tolist()
-        original_row_count = df.shape[0]
-        empty_row_count = df.isnull().all(axis=1).sum()
-        df = df.dropna(axis=1, how='all')
-        current_columns = df.columns.tolist()
-        dropped_columns = [col for col in original_columns if col not in current_columns]
-        number_of_dropped_columns = len(dropped_columns)
-        number_of_current_columns = len(current_columns)
-        column_value_counts = df.count()
-        unique_values = {col: np.atleast_1d(df[col].unique()) for col in current_columns}
-        columns_with_zeros = {
-            col: (df[col] == 0).sum() > 0 for col in current_columns if not pd.api.types.is_numeric_dtype(df[col])
-        }
-        
-        # Save the cleaned DataFrame
-        dropped_csv_path = os.path.join(dropped_dir, f"{base_file_name}_dropped.csv")
-        df.to_csv(dropped_csv_path, index=False)
-        print(f"Saved cleaned CSV: {dropped_csv_path}")
-        
-        # Data Cleaning and Analysis
-        # Display summary in the notebook
-        # print("\nDropped Columns:", dropped_columns)
-        # print(f"Number of Dropped Columns: {number_of_dropped_columns}")
-        # print("\nCurrent Columns:", current_columns)
-        # print(f"Number of Current Columns: {number_of_current_columns}")
-        # print(f"\nNumber of Rows: {current_row_count}")
-        # print(f"Number of Empty Rows: {empty_row_count}")
-        # print("\nNumber of Values in Each Column:")
-        # print(column_value_counts)
-        # print("\nUnique Values for Each Column:")
-        # for col, unique_count in unique_values.items():
-        #     print(f"{col}: {unique_count}")
-        # print("\nColumns with Zeros (Non-Numerical):")
-        # for col, has_zeros in columns_with_zeros.items():
-        #     if has_zeros:
-        #         print(f"{col}: Contains zeros")
-        
-        
-        # Generate Columns with Zeros section
-        columns_with_zeros_list = [col for col, has_zeros in columns_with_zeros.items() if has_zeros]
-        columns_with_zeros = ""
-        if columns_with_zeros_list:
-            columns_with_zeros = f"""
-                <h2 class="sub-header">Columns with Zeros:</h2>
-                <p>{', '.join(columns_with_zeros_list)}</p>
-            """
-
-        # # Generate bar charts in chunks if needed
-        # chunk_size = 40  # Maximum number of bars per chart
-        # chart_df = pd.DataFrame({
-        #     'Column': unique_values.keys(),
-        #     'Unique Count': [len(values) for values in unique_values.values()]
-        # })
-        # chart_df = chart_df.sort_values(by='Unique Count', ascending=False)
-
-        # # Generate charts and embed directly in HTML
-        # charts_html = ""  # Accumulate all charts' HTML here
-        # for i in range(0, len(chart_df), chunk_size):
-        #     chunk = chart_df.iloc[i:i + chunk_size]
-        #     part_number = (i // chunk_size) + 1
-
-        #     # Generate the bar chart
-        #     fig = px.bar(chunk, x='Column', y='Unique Count', text='Unique Count', title=f'Unique Count of Values for {base_file_name} (Part {part_number})')
-        #     fig.update_traces(textposition='outside')
-        #     fig.update_layout(
-        #         xaxis=dict(tickangle=-45),
-        #         height=600,
-        #         margin=dict(l=50, r=50, t=50, b=150),
-        #         xaxis_title='Column Names',
-        #         yaxis_title='Unique Count',
-        #     )
-
-        #     # Save the chart image to memory as Base64
-        #     buffer = BytesIO()
-        #     fig.write_image(buffer, format="png")
-        #     buffer.seek(0)
-        #     image_base64 = base64.b64encode(buffer.read()).decode("utf-8")
-        #     buffer.close()
-        #     # Append the chart to the charts_html string
-            
-        #     charts_html += f"""
-        #         <h2 class="sub-header"></h2>
-        #         <img src="data:image/png;base64,{image_base64}" alt="Bar Chart Part {part_number}">
-        #     """
-        
-        # Generate bar charts for unique counts
-        chart_df = pd.DataFrame({
-            "Column": unique_values.keys(),
-            "Unique Count": [len(values) for values in unique_values.values()],
-        }).sort_values(by="Unique Count", ascending=False)
-        charts_html = generate_bar_charts(
-            chart_df, 
-            x_axis="Column", 
-            y_axis="Unique Count", 
-            base_title=f"Unique Count of Values for {base_file_name}",
-            xaxis_label="Column Names",
-            yaxis_label="Unique Count"
-        )
-        
-        # Generate table rows for column value counts
-        col_value_table_rows = ""
-        for col, count in column_value_counts.items():
-            col_value_table_rows += f"""
-            <tr>
-                <td>{col}</td>
-                <td>{count}</td>
-            </tr>
-            """
-
-        # Add column value counts table
-        column_counts_table = f"""
-        <h2 class="sub-header">Column Value Counts:</h2>
-        <table class="value-counts-table">
-            <thead>
-                <tr>
-                    <th>Column</th>
-                    <th>Value Count</th>
-                </tr>
-            </thead>
-            <tbody>
-                {col_value_table_rows}
-            </tbody>
-        </table>
-        """
-
-        # Append analysis details to the report
-        html_report += f"""
-            <h1 class="header">Report for {base_file_name}</h1>
-            <h2 class="sub-header">Dropped Columns ({number_of_dropped_columns}):</h2>
-            <p>{', '.join(dropped_columns) if dropped_columns else "None"}</p>
-            <h2 class="sub-header">Current Columns ({number_of_current_columns}):</h2>
-            <p>{', '.join(current_columns)}</p>
-            <h2 class="sub-header">Number of Rows:</h2>
-            <p>{original_row_count}</p>
-            <h2 class="sub-header">Number of Empty Rows:</h2>
-            <p>{empty_row_count}</p>
-            {column_counts_table}
-            {columns_with_zeros}
-            {charts_html}
-            <div style="page-break-before: always;"></div>
-        """
-    
-    html_report += """
-        </body>
-    </html>
-    """
+    # Keep the profiles of the run, so runs can be compared without reading the files again
+    with stage("store_profiles", rows=len(profiles)):
+        with ProfileStore(os.path.join(reports_folder, STORE_NAME)) as store:
+            store.record_run(report_name, input_path, [
+                (path, manifest.content_hash(path) or hash_file(path), profile)
+                for path, profile in zip(profile_paths, profiles)
+            ])
 
     # Create the final PDF
     pdf_path = os.path.join(reports_folder, pdf_name)
-    with open(pdf_path, "wb") as pdf_file:
-        pisa.CreatePDF(html_report, dest=pdf_file)
+    with stage("merge_pdf", rows=len(section_pdfs) + 1) as record:
+        merge_pdfs([front_pdf] + section_pdfs, pdf_path)
+        record["bytes_written"] = file_size(pdf_path)
 
     print(f"PDF report generated: {pdf_path}")
+    return pdf_path
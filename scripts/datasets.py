@@ -0,0 +1,765 @@
+import csv
+import gzip
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.cache import hash_file
+from scripts.paths import (
+    COLUMNAR_FORMATS, COMPRESSED_CSV_EXTENSION, CSV_ENGINES, DROPPED_FORMATS, FORMATS, dataset_format, dataset_name,
+    is_dataset
+)
+
+COMPRESSION = "zstd"
+# CSV files are gzip-compressed at the fastest level, which already makes them several times smaller
+CSV_COMPRESSION_LEVEL = 1
+
+# The values pandas reads as NaN by default, so both engines find the same nulls
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+# Bytes parsed per block by the Arrow reader; blocks are parsed in parallel
+ARROW_BLOCK_SIZE = 16 << 20
+# Lines tried after an arbitrary offset of a CSV file to find where a row starts; a line is
+# not taken to be inside a quoted value when no quote follows it within RESYNC_BYTES
+RESYNC_LINES = 64
+RESYNC_BYTES = 64 << 10
+# Bytes read at most after a split point of a CSV file to find where a row starts
+RESYNC_WINDOW_BYTES = 4 << 20
+
+
+def list_datasets(directory):
+    """
+    Lists the dataset files in a directory, one per dataset. When the same dataset was
+    converted to several formats, the columnar copy is used instead of the CSV. A column
+    view and a copy of the same dataset are left behind when the report switches between
+    them, see `write_dropped_copy`, so the newer of the two is used.
+
+    Parameters:
+        directory (str): Path to the directory.
+
+    Returns:
+        list: Paths of the dataset files, in directory listing order.
+    """
+    preference = list(COLUMNAR_FORMATS) + ["csv"]
+    datasets = {}
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if not os.path.isfile(path) or not is_dataset(path):
+            continue
+        name = dataset_name(path)
+        current = datasets.get(name)
+        if current is None:
+            datasets[name] = path
+        elif "view" in (dataset_format(path), dataset_format(current)):
+            if os.path.getmtime(path) > os.path.getmtime(current):
+                datasets[name] = path
+        elif preference.index(dataset_format(path)) < preference.index(dataset_format(current)):
+            datasets[name] = path
+    return list(datasets.values())
+
+
+def write_view(path, source_path, columns, dropped_columns=(), row_count=None):
+    """
+    Writes a column view of a dataset: a small JSON file naming the dataset and the
+    columns to keep, instead of a copy of the dataset without the other columns. The
+    readers of this module, and `load_dataset`, read a view as that projection of its
+    dataset, reading only the kept columns.
+
+    The size and mtime of the dataset are recorded, and a view of a dataset whose
+    content changed since is not read.
+
+    Parameters:
+        path (str): Path of the view, ending in `VIEW_EXTENSION`.
+        source_path (str): Path to the CSV, Parquet or Feather dataset.
+        columns (list): Columns to keep, in file order.
+        dropped_columns (list): Columns left out, recorded for reference.
+        row_count (int): Optional number of rows of the dataset.
+    """
+    stat = os.stat(source_path)
+    view = {
+        "source": os.path.relpath(os.path.abspath(source_path), os.path.dirname(os.path.abspath(path))),
+        "columns": list(columns),
+        "dropped_columns": list(dropped_columns),
+        "row_count": row_count,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(source_path),
+    }
+    with open(path, "w") as view_file:
+        json.dump(view, view_file, indent=2)
+
+
+def read_view(path):
+    """
+    Reads a column view, see `write_view`, with the absolute path of its dataset as
+    `source`. Raises ValueError if the dataset is gone or its content changed.
+    """
+    with open(path, "r") as view_file:
+        view = json.load(view_file)
+    view["source"] = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), view["source"]))
+    try:
+        stat = os.stat(view["source"])
+    except OSError:
+        raise ValueError(f"The dataset of the column view {path} is missing: {view['source']}")
+    # Touched but possibly not modified, fall back to the content hash
+    if stat.st_size != view["size"] or stat.st_mtime_ns != view["mtime_ns"] and hash_file(view["source"]) != view["sha256"]:
+        raise ValueError(f"The dataset of the column view {path} changed since the view was written: {view['source']}")
+    return view
+
+
+def resolve_view(path, columns=None):
+    """
+    Returns the file to read for a dataset path and the columns to read from it. For
+    a column view, these are its dataset and the requested columns among those it
+    keeps, all of them by default; other paths are returned as they are.
+    """
+    if dataset_format(path) != "view":
+        return path, columns
+    view = read_view(path)
+    if columns is None:
+        return view["source"], view["columns"]
+    missing = [col for col in columns if col not in view["columns"]]
+    if missing:
+        raise ValueError(f"The column view {path} does not keep the columns: {', '.join(missing)}")
+    return view["source"], list(columns)
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"Reading and writing {fmt} files requires pyarrow: pip install pyarrow")
+
+
+def csv_engine(engine):
+    """
+    Returns the CSV reader to use for `engine`: "pyarrow" falls back to "pandas" when
+    pyarrow is not installed.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unsupported CSV engine '{engine}', use one of: {', '.join(CSV_ENGINES)}.")
+    if engine == "pyarrow":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            return "pandas"
+    return engine
+
+
+def _arrow_csv_options(path, columns=None, keep_default_na=True):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # The header is read by pandas, so both engines name duplicate columns alike
+    names = read_columns(path)
+    if columns is not None:
+        # Columns come back in file order, as with pandas' `usecols`
+        wanted = set(columns)
+        columns = [name for name in names if name in wanted]
+    read_options = pacsv.ReadOptions(column_names=names, skip_rows=1, block_size=ARROW_BLOCK_SIZE)
+    # Every column is read as text and typed afterwards, see `_pandas_types`
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in names},
+        null_values=NA_VALUES if keep_default_na else [],
+        strings_can_be_null=keep_default_na,
+        quoted_strings_can_be_null=keep_default_na,
+        include_columns=columns,
+    )
+    return read_options, pacsv.ParseOptions(newlines_in_values=True), convert_options
+
+
+def _infer_column(column):
+    # The C parser's inference: integers, then floats, then booleans, else text
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not len(column):
+        return column
+    if column.null_count == len(column):
+        return column.cast(pa.float64())
+    values = column.drop_null()
+    for arrow_type in (pa.int64(), pa.float64()):
+        try:
+            # A failed cast is slow, and text columns usually fail on their first value
+            values.slice(0, 1).cast(arrow_type)
+            return column.cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    if pc.all(pc.is_in(values, value_set=pa.array(TRUE_VALUES + FALSE_VALUES))).as_py():
+        flags = pc.is_in(column, value_set=pa.array(TRUE_VALUES))
+        return pc.if_else(pc.is_valid(column), flags, pa.scalar(None, pa.bool_()))
+    return column
+
+
+def _pandas_types(table, dtype=None):
+    """
+    Types the text columns of an Arrow table as `pd.read_csv` would and converts it to
+    pandas. Numeric columns without nulls are handed over without copying, and Arrow
+    buffers are released column by column as they are converted. `dtype` is applied as
+    by `pd.read_csv`: `str` keeps every column as text.
+    """
+    import pyarrow as pa
+
+    if dtype is str:
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    dtype = dtype or {}
+    columns = [column if name in dtype else _infer_column(column) for name, column in zip(table.column_names, table.columns)]
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if dtype:
+        df = df.astype({col: col_type for col, col_type in dtype.items() if col in df.columns})
+    return df
+
+
+def _read_csv_arrow(path, columns=None, dtype=None):
+    import pyarrow.csv as pacsv
+    read_options, parse_options, convert_options = _arrow_csv_options(path, columns)
+    table = pacsv.read_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    return _pandas_types(table, dtype)
+
+
+def open_csv_arrow(path, columns=None, keep_default_na=True):
+    """
+    Opens a streaming Arrow reader over a CSV file, yielding record batches of text
+    columns in which the values pandas reads as NaN are null. Blocks of the file are
+    parsed in parallel.
+    """
+    import pyarrow.csv as pacsv
+    read_options, parse_options, convert_options = _arrow_csv_options(path, columns, keep_default_na)
+    return pacsv.open_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+
+
+def _iter_csv_arrow(path, chunksize, columns=None, dtype=None, keep_default_na=True):
+    import pyarrow as pa
+    reader = open_csv_arrow(path, columns, keep_default_na)
+
+    # Blocks are cut into chunks of exactly `chunksize` rows, as pandas reads them
+    pending = reader.schema.empty_table()
+    offset = 0
+    finished = False
+    while not finished:
+        try:
+            pending = pa.concat_tables([pending, pa.Table.from_batches([reader.read_next_batch()])])
+        except StopIteration:
+            finished = True
+        while pending.num_rows >= chunksize or finished and pending.num_rows:
+            chunk = _pandas_types(pending.slice(0, chunksize), dtype)
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            pending = pending.slice(chunksize)
+            yield chunk
+    if not offset:
+        # pandas yields one empty chunk for a file without rows
+        yield _pandas_types(pending, dtype)
+
+
+def text_table(data):
+    """
+    Builds an Arrow table of text columns from lists of values, None for a missing
+    value. Missing values are empty strings, as they would be in a CSV file, see
+    `text_frame`.
+    """
+    import pyarrow as pa
+    return pa.table({name: pa.array(values, pa.string()).fill_null("") for name, values in data.items()})
+
+
+def text_frame(tables, columns, dtype=None, keep_default_na=True):
+    """
+    Converts Arrow tables of text from `text_table` into one DataFrame, typed as
+    `pd.read_csv` would type the same values read from a CSV file with these columns.
+    Columns missing from a table are empty in its rows.
+
+    Parameters:
+        tables (list): The tables, in row order.
+        columns (list): Columns of the DataFrame.
+        dtype: Optional dtypes, `str` to keep every column as text.
+        keep_default_na (bool): Whether the values pandas reads as NaN become null.
+
+    Returns:
+        DataFrame: The dataset.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    padded = []
+    for table in tables:
+        for name in columns:
+            if name not in table.column_names:
+                table = table.append_column(name, pa.nulls(table.num_rows, pa.string()).fill_null(""))
+        padded.append(table.select(columns))
+    if padded:
+        table = pa.concat_tables(padded)
+    else:
+        table = pa.schema([(name, pa.string()) for name in columns]).empty_table()
+    if keep_default_na:
+        na_values = pa.array(NA_VALUES)
+        table = pa.Table.from_arrays(
+            [pc.if_else(pc.is_in(column, value_set=na_values), pa.scalar(None, pa.string()), column)
+             for column in table.columns],
+            names=columns,
+        )
+    return _pandas_types(table, dtype)
+
+
+def read_columns(path):
+    """
+    Returns the column names of a dataset without reading its rows.
+    """
+    fmt = dataset_format(path)
+    if fmt == "view":
+        return read_view(path)["columns"]
+    if fmt == "csv":
+        return pd.read_csv(path, nrows=0).columns.tolist()
+
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+
+    import pyarrow.ipc as ipc
+    with ipc.open_file(path) as reader:
+        return reader.schema.names
+
+
+def _set_index(df, index_col):
+    if index_col is None:
+        return df
+    return df.set_index(df.columns[index_col])
+
+
+def read_dataset(path, columns=None, index_col=None, dtype=None, engine="pandas"):
+    """
+    Loads a CSV, Parquet or Feather dataset into a DataFrame. Columnar files keep the
+    types they were written with and only the requested columns are read. Column views
+    read their columns of their dataset, see `write_view`.
+
+    CSV files are read with pandas' C parser, or with `engine="pyarrow"` by Arrow's
+    multi-threaded reader, which only converts the requested columns and types them as
+    pandas would. Files Arrow cannot parse, such as rows with missing fields, are read
+    with pandas instead.
+
+    Parameters:
+        path (str): Path to the dataset file.
+        columns (list): Optional columns to read. Cannot be combined with `index_col`.
+        index_col (int): Optional position of the column to use as the index.
+        dtype (dict): Optional dtypes of some columns, used for CSV files only.
+        engine (str): CSV reader, "pandas" or "pyarrow".
+
+    Returns:
+        DataFrame: The dataset.
+    """
+    path, columns = resolve_view(path, columns)
+    fmt = dataset_format(path)
+    if fmt == "csv":
+        if csv_engine(engine) == "pyarrow":
+            import pyarrow as pa
+            try:
+                return _set_index(_read_csv_arrow(path, columns, dtype), index_col)
+            except pa.ArrowInvalid:
+                pass
+        return pd.read_csv(path, usecols=columns, index_col=index_col, dtype=dtype, low_memory=False)
+
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
+    return _set_index(df, index_col)
+
+
+def iter_dataset_chunks(path, chunksize, columns=None, index_col=None, engine="pandas", **csv_options):
+    """
+    Reads a dataset `chunksize` rows at a time.
+
+    With `engine="pyarrow"`, CSV files are streamed by Arrow, which parses blocks of the
+    file in parallel. Other `csv_options` than `dtype` and `keep_default_na` need pandas.
+    A file Arrow cannot parse is read with pandas, unless the error comes after the first
+    chunks were yielded, in which case it is raised.
+
+    Parameters:
+        path (str): Path to the dataset file.
+        chunksize (int): Number of rows per chunk.
+        columns (list): Optional columns to read. Cannot be combined with `index_col`.
+        index_col (int): Optional position of the column to use as the index.
+        engine (str): CSV reader, "pandas" or "pyarrow".
+        **csv_options: Extra `pd.read_csv` options, used for CSV files only.
+
+    Yields:
+        DataFrame: The next chunk of rows.
+    """
+    path, columns = resolve_view(path, columns)
+    fmt = dataset_format(path)
+    if fmt == "csv":
+        if csv_engine(engine) == "pyarrow" and set(csv_options) <= {"dtype", "keep_default_na"}:
+            import pyarrow as pa
+            started = False
+            try:
+                for chunk in _iter_csv_arrow(path, chunksize, columns, **csv_options):
+                    started = True
+                    yield _set_index(chunk, index_col)
+                return
+            except pa.ArrowInvalid:
+                if started:
+                    raise
+        yield from pd.read_csv(path, usecols=columns, index_col=index_col, chunksize=chunksize, **csv_options)
+        return
+
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        if parquet_file.metadata.num_rows == 0:
+            empty = parquet_file.schema_arrow.empty_table()
+            yield _set_index(empty.select(columns or empty.column_names).to_pandas(), index_col)
+            return
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield _set_index(batch.to_pandas(), index_col)
+        return
+
+    import pyarrow.ipc as ipc
+    with ipc.open_file(path) as reader:
+        if reader.num_record_batches == 0:
+            empty = reader.schema.empty_table()
+            yield _set_index(empty.select(columns or empty.column_names).to_pandas(), index_col)
+        for number in range(reader.num_record_batches):
+            batch = reader.get_batch(number)
+            if columns:
+                batch = batch.select(columns)
+            for offset in range(0, max(batch.num_rows, 1), chunksize):
+                yield _set_index(batch.slice(offset, chunksize).to_pandas(), index_col)
+
+
+class LineWindow:
+    """
+    Lines of a binary file from its current position, read as they are needed, with the
+    offset each starts at. Reading stops after `max_bytes`, and `exhausted` is then set,
+    as it is at the end of the file.
+    """
+
+    def __init__(self, binary_file, max_bytes):
+        self.binary_file = binary_file
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.lines = []
+        self.starts = []
+        self.exhausted = False
+
+    def read_to(self, index):
+        """
+        Reads up to line `index` and returns whether the window has it.
+        """
+        while len(self.lines) <= index and not self.exhausted:
+            if self.size >= self.max_bytes:
+                self.exhausted = True
+                break
+            start = self.binary_file.tell()
+            line = self.binary_file.readline()
+            if not line:
+                self.exhausted = True
+                break
+            self.starts.append(start)
+            self.lines.append(line)
+            self.size += len(line)
+        return index < len(self.lines)
+
+    def has_quote(self, first, max_bytes):
+        """
+        Returns whether a quote follows the start of line `first` within `max_bytes`.
+        """
+        index = first
+        while self.read_to(index) and self.starts[index] - self.starts[first] < max_bytes:
+            if b'"' in self.lines[index]:
+                return True
+            index += 1
+        return False
+
+    def texts(self, first, prefix=""):
+        """
+        Yields the lines from line `first` as text, the first one after `prefix`.
+        """
+        index = first
+        while self.read_to(index):
+            text = self.lines[index].decode("utf-8", errors="replace")
+            yield prefix + text if index == first else text
+            index += 1
+
+    def end(self, index):
+        """
+        Returns the offset where line `index` starts, or where the window ends.
+        """
+        return self.starts[index] if index < len(self.starts) else self.binary_file.tell()
+
+
+def parse_csv_records(window, first, field_count, limit, quoted=False):
+    """
+    Parses up to `limit` records from line `first` of a `LineWindow`, strictly, as the
+    start of a row or, with `quoted`, as the middle of a quoted value, whose first record
+    is then the rest of a row and may hold fewer fields. Blank lines are skipped.
+
+    Parameters:
+        window (LineWindow): Lines of the CSV file.
+        first (int): Line to start at.
+        field_count (int): Number of fields of a row.
+        limit (int): Number of records to parse at most.
+        quoted (bool): Parse the lines as the middle of a quoted value.
+
+    Returns:
+        tuple: The (first line, end line) span of each record read, and how parsing
+        stopped: "ok" after `limit` records, "end" at the end of the window, or "error" on
+        a record that is not `field_count` fields.
+    """
+    reader = csv.reader(window.texts(first, '"' if quoted else ""), strict=True)
+    records = []
+    consumed = 0
+    while len(records) < limit:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return records, "end"
+        except csv.Error:
+            at_end = window.exhausted and first + reader.line_num >= len(window.lines)
+            return records, "end" if at_end else "error"
+        partial = quoted and not consumed
+        if row and (len(row) > field_count if partial else len(row) != field_count):
+            return records, "error"
+        if row:
+            records.append((first + consumed, first + reader.line_num))
+        consumed = reader.line_num
+    return records, "ok"
+
+
+def find_row_start(window, field_count):
+    """
+    Returns the first line of a `LineWindow` that starts a row of a CSV file, or None
+    when none of the first `RESYNC_LINES` lines is found to.
+
+    A line may start a row or continue a quoted value holding newlines, and both readings
+    often parse into rows of `field_count` fields. On a well-formed file the right reading
+    never fails, so a line is only taken as a row start once reading it as the middle of a
+    quoted value fails: no quote follows within `RESYNC_BYTES`, a field count is off, or a
+    closing quote is not followed by a delimiter.
+
+    Parameters:
+        window (LineWindow): Lines following an arbitrary offset of the file.
+        field_count (int): Number of fields of a row.
+
+    Returns:
+        int or None: Index of the line in the window.
+    """
+    for first in range(RESYNC_LINES):
+        if not window.read_to(first):
+            return None
+        if not window.has_quote(first, RESYNC_BYTES):
+            return first
+        quoted_records, outcome = parse_csv_records(window, first, field_count, 2, quoted=True)
+        if outcome == "error" or (outcome == "end" and not quoted_records):
+            return first
+    return None
+
+
+def csv_shard_offsets(path, count):
+    """
+    Splits an uncompressed CSV file into about `count` byte ranges starting on rows,
+    without reading it whole: each split point is moved from an even share of the file
+    to the next line found to start a row, see `find_row_start`, so only a few lines are
+    read around each. The first range starts at the header.
+
+    Quotes inside unquoted values (`12" ruler`) are read as the csv module reads them,
+    which pandas does not, so callers should check that each range but the last parses
+    to its end outside a quoted value.
+
+    Parameters:
+        path (str): Path to an uncompressed CSV file with a header row.
+        count (int): Number of ranges to split the file into.
+
+    Returns:
+        list or None: The byte offset where each range starts, fewer than `count` when
+        split points meet, or None when no row start is found after one of them.
+    """
+    size = os.path.getsize(path)
+    field_count = len(read_columns(path))
+    offsets = [0]
+    with open(path, "rb") as csv_file:
+        for number in range(1, count):
+            offset = size * number // count
+            if offset <= offsets[-1]:
+                continue
+            csv_file.seek(offset - 1)
+            csv_file.readline()
+            window = LineWindow(csv_file, RESYNC_WINDOW_BYTES)
+            if not window.read_to(0):
+                break
+            first = find_row_start(window, field_count)
+            if first is None:
+                return None
+            offsets.append(window.starts[first])
+    return offsets
+
+
+def _arrow_compatible(df):
+    # Arrow columns hold one type; text columns with a few numbers in them
+    # (common in Excel sheets) are stored as strings.
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _csv_compatible(df):
+    # pandas formats datetimes for CSV one value at a time. Columns holding dates only
+    # (as loaded by `load_dataset`) are formatted once per distinct date instead,
+    # exactly as pandas would write them.
+    date_columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, np.dtype) and dtype.kind == "M"]
+    if not date_columns:
+        return df
+    df = df.copy(deep=False)
+    for col in date_columns:
+        values = df[col].to_numpy()
+        days = values.astype("datetime64[D]")
+        if not ((days == values) | np.isnat(values)).all():
+            continue
+        codes, unique_days = pd.factorize(days)
+        text = np.append(np.datetime_as_string(unique_days, unit="D").astype(object), None)
+        df[col] = text[codes]
+    return df
+
+
+def _write_compressed_csv(df, csv_file, header=True):
+    # Arrow formats CSV several times faster than pandas, and neither it nor gzip holds
+    # the GIL, so copies written in threads run alongside other work
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        df.to_csv(csv_file, index=False, header=header)
+        return
+    table = pa.Table.from_pandas(_arrow_compatible(df), preserve_index=False)
+    pacsv.write_csv(table, csv_file, pacsv.WriteOptions(include_header=header, quoting_style="needed"))
+
+
+def _check_writable(fmt):
+    if fmt == "view":
+        raise ValueError("Column views are not written row by row, see `write_view`.")
+    if fmt != "csv":
+        _require_pyarrow(fmt)
+
+
+def write_dataset(df, path):
+    """
+    Writes a DataFrame, without its index, as CSV, Parquet or Feather depending on the
+    extension. Files ending in `.csv.gz` are written as gzip-compressed CSV.
+
+    Parameters:
+        df (DataFrame): The data to write.
+        path (str): Path of the file to write.
+    """
+    fmt = dataset_format(path)
+    _check_writable(fmt)
+    if path.lower().endswith(COMPRESSED_CSV_EXTENSION):
+        with gzip.open(path, "wb", compresslevel=CSV_COMPRESSION_LEVEL) as csv_file:
+            _write_compressed_csv(_csv_compatible(df), csv_file)
+        return
+    if fmt == "csv":
+        _csv_compatible(df).to_csv(path, index=False)
+        return
+
+    df = _arrow_compatible(df).reset_index(drop=True)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+    else:
+        df.to_feather(path, compression=COMPRESSION)
+
+
+def convert_csv_to_columnar(csv_path, output_path):
+    """
+    Converts a CSV file to Parquet or Feather with Arrow's multi-threaded reader,
+    which infers a type for every column. Empty values become nulls.
+
+    Parameters:
+        csv_path (str): Path to the CSV file.
+        output_path (str): Path of the Parquet or Feather file to write.
+    """
+    fmt = dataset_format(output_path)
+    _require_pyarrow(fmt)
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # Exports without any records convert to a CSV with an empty header line
+    with open(csv_path, "rb") as csv_file:
+        has_header = bool(csv_file.readline().strip())
+
+    if has_header:
+        table = pacsv.read_csv(
+            csv_path,
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+        )
+    else:
+        table = pa.table({})
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, output_path, compression=COMPRESSION)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, output_path, compression=COMPRESSION)
+
+
+class DatasetWriter:
+    """
+    Writes a dataset chunk by chunk as CSV, gzip-compressed CSV, Parquet or Feather, so
+    large outputs never have to be held in memory. Every chunk must have the same columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = dataset_format(path)
+        _check_writable(self.format)
+        self.compressed = path.lower().endswith(COMPRESSED_CSV_EXTENSION)
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        if self.format == "csv":
+            header = self._file is None
+            if self.compressed:
+                if header:
+                    self._file = gzip.open(self.path, "wb", compresslevel=CSV_COMPRESSION_LEVEL)
+                _write_compressed_csv(_csv_compatible(df), self._file, header)
+                return
+            if header:
+                self._file = open(self.path, "w", encoding="utf-8", newline="")
+            _csv_compatible(df).to_csv(self._file, index=False, header=header)
+            return
+
+        import pyarrow as pa
+        table = pa.Table.from_pandas(_arrow_compatible(df), preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression=COMPRESSION)
+            else:
+                import pyarrow.ipc as ipc
+                options = ipc.IpcWriteOptions(compression=COMPRESSION)
+                self._writer = ipc.new_file(self.path, self._schema, options=options)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
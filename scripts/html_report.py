@@ -0,0 +1,270 @@
+import html
+import json
+import os
+
+from scripts.cache import MANIFEST_NAME, Manifest
+from scripts.data_processing import (
+    CSS_PATH,
+    generate_cover_page,
+    profile_file,
+    render_file_section,
+    render_summary_html,
+    report_inputs,
+    unique_count_specs,
+)
+from scripts.datasets import DROPPED_FORMATS, csv_engine
+from scripts.metrics import file_size, stage, track_run
+from scripts.paths import dataset_name, find_directory
+from scripts.profiling import DatasetProfile
+
+# Bump when the cached profiles of the HTML report change
+HTML_REPORT_VERSION = 1
+
+# How the page gets plotly.js: inlined into the page, from the plotly CDN, or from a
+# copy written once next to the reports
+PLOTLY_JS_MODES = ("inline", "cdn", "directory")
+PLOTLY_CDN_URL = "https://cdn.plot.ly/plotly-{version}.min.js"
+
+# Additions to assets/styles.css for the screen
+HTML_STYLES = """
+    body { max-width: 1100px; margin: 0 auto; padding: 0 20px; }
+    .cover-page-container { height: auto; padding: 40px 0; }
+    .file-section { border: 1px solid #ddd; margin-bottom: 10px; }
+    .file-section > summary { cursor: pointer; padding: 8px; background-color: #f2f2f2; font-size: 14px; }
+    .file-section > summary span { color: #777; margin-left: 10px; }
+    .file-section > div { padding: 0 10px; }
+    .plotly-chart { min-height: 600px; }
+"""
+
+# Sections are kept in <template> tags, which the browser does not render, until they
+# are opened, and charts are only drawn once they are scrolled into view
+HTML_SCRIPT = """
+    function drawChart(element) {
+        var spec = JSON.parse(element.dataset.spec);
+        Plotly.newPlot(element, [{
+            type: "bar", x: spec.x, y: spec.y, text: spec.y, textposition: "outside",
+            marker: {color: "#636efa"}
+        }], {
+            title: spec.title, height: 600, margin: {l: 50, r: 50, t: 50, b: 150},
+            xaxis: {tickangle: -45, title: spec.xaxis_label}, yaxis: {title: spec.yaxis_label}
+        }, {responsive: true});
+    }
+
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                drawChart(entry.target);
+            }
+        });
+    }, {rootMargin: "200px"});
+
+    function expand(section) {
+        var template = section.querySelector("template");
+        if (!template) {
+            return;
+        }
+        var content = template.content.cloneNode(true);
+        content.querySelectorAll(".plotly-chart").forEach(function (chart) { observer.observe(chart); });
+        template.replaceWith(content);
+    }
+
+    document.querySelectorAll("details.file-section").forEach(function (section) {
+        if (section.open) {
+            expand(section);
+        }
+        section.addEventListener("toggle", function () {
+            if (section.open) {
+                expand(section);
+            }
+        });
+    });
+"""
+
+
+def render_chart_divs(specs):
+    """
+    Returns the placeholders of the charts of a section, each holding its chart spec
+    (see `bar_chart_specs`) for plotly.js to draw in the browser.
+    """
+    return "".join(
+        f'<div class="plotly-chart" data-spec="{html.escape(json.dumps(spec, default=str))}"></div>'
+        for spec in specs
+    )
+
+
+def render_lazy_section(profile, open_section=False):
+    """
+    Wraps the section of one file in a collapsible block, whose content is only built by
+    the browser when the block is opened.
+
+    Parameters:
+        profile (DatasetProfile): Profile of the file.
+        open_section (bool): Whether the block starts open, as for a single-file report.
+
+    Returns:
+        str: HTML content for the section.
+    """
+    stat = profile.summary()
+    section_html = render_file_section(profile, charts_html=render_chart_divs(unique_count_specs(profile)))
+    return f"""
+    <details class="file-section"{" open" if open_section else ""}>
+        <summary>{html.escape(stat['File'])}
+            <span>{stat['Rows']} rows, {stat['Total Columns']} columns, {stat['Dropped Columns']} dropped</span>
+        </summary>
+        <div><template>{section_html}</template></div>
+    </details>
+    """
+
+
+def plotly_script(mode, reports_folder):
+    """
+    Returns the tag loading plotly.js once for the whole page.
+
+    Parameters:
+        mode (str): One of `PLOTLY_JS_MODES`. "inline" makes the page work offline,
+            "cdn" keeps it small, and "directory" writes the library once next to the reports.
+        reports_folder (str): Directory of the report.
+
+    Returns:
+        str: The script tag.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if mode == "inline":
+        return f"<script>{get_plotlyjs()}</script>"
+    if mode == "cdn":
+        return f'<script src="{PLOTLY_CDN_URL.format(version=get_plotlyjs_version())}"></script>'
+
+    script_name = f"plotly-{get_plotlyjs_version()}.min.js"
+    script_path = os.path.join(reports_folder, script_name)
+    if not os.path.exists(script_path):
+        with open(script_path, "w", encoding="utf-8") as script_file:
+            script_file.write(get_plotlyjs())
+    return f'<script src="{script_name}"></script>'
+
+
+def html_page(title, body_html, plotly_tag):
+    """
+    Wraps report content in a standalone HTML page with the report styles.
+    """
+    with open(CSS_PATH, "r") as css_file:
+        styles = css_file.read()
+
+    return f"""<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>{html.escape(title)}</title>
+        <style>{styles}</style>
+        <style>{HTML_STYLES}</style>
+        {plotly_tag}
+    </head>
+    <body>
+        {body_html}
+        <script>{HTML_SCRIPT}</script>
+    </body>
+</html>
+"""
+
+
+def generate_html_report(input_path, force=False, chunksize=None, dropped_format="csv", engine="pandas",
+                         plotly_js="inline", workers=1, profile=False):
+    """
+    Generates an interactive HTML report for one or more CSV files, with the same content
+    as the PDF report of `process_and_generate_report` but none of its rendering: charts
+    are drawn in the browser by plotly.js, included once for the whole page, instead of
+    being rasterized with kaleido, and the page is not laid out with xhtml2pdf.
+
+    Each file's section is collapsed and only built when opened, and its charts only when
+    scrolled into view, so reports of large directories open at once.
+
+    The dropped-columns copies are saved like for the PDF report. Profiles are cached under
+    `reports/.cache/<report name>_report_html/` and reused while the inputs are unchanged.
+
+    Parameters:
+        input_path (str): Path to a CSV file or a directory containing multiple CSV files.
+        force (bool): Profile every file again, even if unchanged since the last run.
+        chunksize (int): Optional number of rows to read at a time, see `process_and_generate_report`.
+        dropped_format (str): Format of the dropped-columns copies, one of `DROPPED_FORMATS`.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+        plotly_js (str): How the page loads plotly.js, one of `PLOTLY_JS_MODES`.
+        workers (int): With `chunksize`, number of processes profiling shards of each CSV file. 0 uses every core.
+        profile (bool): Also profile the run with cProfile, saving the stats to `<report>_profile.prof`.
+
+    Returns:
+        str: Path of the HTML report.
+    """
+    if plotly_js not in PLOTLY_JS_MODES:
+        raise ValueError(f"Unsupported plotly.js mode '{plotly_js}', use one of: {', '.join(PLOTLY_JS_MODES)}.")
+    if dropped_format not in DROPPED_FORMATS:
+        raise ValueError(f"Unsupported dropped format '{dropped_format}', use one of: {', '.join(DROPPED_FORMATS)}.")
+    csv_engine(engine)
+
+    with track_run("generate_html_report", profile=profile) as run_metrics:
+        data_directory = find_directory("data")
+        reports_folder = os.path.join(os.path.dirname(data_directory), "reports")
+        os.makedirs(reports_folder, exist_ok=True)
+
+        csv_files, report_name = report_inputs(input_path)
+        dropped_dir = os.path.join(data_directory, report_name + "_dropped")
+        os.makedirs(dropped_dir, exist_ok=True)
+
+        cache_dir = os.path.join(reports_folder, ".cache", f"{report_name}_report_html")
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = Manifest(os.path.join(cache_dir, MANIFEST_NAME))
+        settings = {
+            "report": HTML_REPORT_VERSION,
+            "dropped_dir": os.path.abspath(dropped_dir),
+            "dropped_format": dropped_format,
+            "chunksize": chunksize,
+        }
+
+        profiles = []
+        for csv_file_path in csv_files:
+            entry = None if force else manifest.lookup(csv_file_path, settings)
+            if entry:
+                print(f"Reusing profile for unchanged file: {csv_file_path}")
+                profiles.append(DatasetProfile.from_dict(entry["profile"]))
+                continue
+            section = profile_file(
+                csv_file_path, dropped_dir, chunksize=chunksize, dropped_format=dropped_format,
+                schema_dir=os.path.join(reports_folder, ".cache", "schemas"), engine=engine, workers=workers,
+            )
+            if section is None:
+                manifest.invalidate(csv_file_path)
+                continue
+            base_file_name = dataset_name(csv_file_path)
+            dropped_path = os.path.join(dropped_dir, f"{base_file_name}_dropped{DROPPED_FORMATS[dropped_format]}")
+            manifest.record(csv_file_path, settings, [dropped_path], profile=section["profile"].to_dict())
+            profiles.append(section["profile"])
+        manifest.save()
+
+        with stage("render_html", rows=len(profiles)) as record:
+            summary_html = render_summary_html(profiles) if os.path.isdir(input_path) else ""
+            sections_html = "".join(
+                render_lazy_section(file_profile, open_section=len(profiles) == 1) for file_profile in profiles
+            )
+            page = html_page(
+                f"Report for {report_name}",
+                generate_cover_page(input_path) + summary_html + sections_html,
+                plotly_script(plotly_js, reports_folder),
+            )
+            html_path = os.path.join(reports_folder, report_name + "_report.html")
+            with open(html_path, "w", encoding="utf-8") as html_file:
+                html_file.write(page)
+            record["bytes_written"] = file_size(html_path)
+
+        run_metrics.save(os.path.join(reports_folder, report_name + "_report_html"))
+
+    print(f"HTML report generated: {html_path}")
+    return html_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts report --html`
+    main(["report", "--html", *sys.argv[1:]])
@@ -0,0 +1,192 @@
+import cProfile
+import csv
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ["run", "stage", "file", "start", "seconds", "rows", "bytes_read", "bytes_written", "rss_mb", "peak_rss_mb"]
+
+
+def memory_usage_mb():
+    """
+    Returns the current and peak resident memory of this process in MB. The current
+    value needs psutil and is None without it.
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        current_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        current_mb = None
+    return current_mb, peak_mb
+
+
+def file_size(path):
+    return os.path.getsize(path) if path and os.path.exists(path) else None
+
+
+class RunMetrics:
+    """
+    Durations, rows, bytes and memory of the stages of one pipeline run.
+
+    Each record is logged as one JSON line on the `scripts.metrics` logger at INFO level,
+    and the run can be saved as JSON and CSV. With `profile`, the run is also profiled with
+    cProfile and the stats are saved alongside, for `python -m pstats` or snakeviz.
+
+    Memory is sampled when a stage ends: `rss_mb` is the process's resident memory at
+    that point and `peak_rss_mb` its high-water mark so far, so the stage after which the
+    peak jumps is the one that needed the memory.
+    """
+
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.started = datetime.datetime.now()
+        self._start = time.perf_counter()
+        self.records = []
+        self.profiler = cProfile.Profile() if profile else None
+
+    def add(self, stage, file=None, seconds=None, **data):
+        """
+        Records a stage measured elsewhere, e.g. in a worker process.
+        """
+        rss_mb, peak_rss_mb = memory_usage_mb()
+        record = {field: None for field in FIELDS}
+        record.update(
+            run=self.name,
+            stage=stage,
+            file=file,
+            start=round(time.perf_counter() - self._start - (seconds or 0), 6),
+            seconds=seconds,
+            rss_mb=rss_mb,
+            peak_rss_mb=peak_rss_mb,
+            **data,
+        )
+        self.records.append(record)
+        logger.info(json.dumps(record, default=str))
+        return record
+
+    @contextmanager
+    def stage(self, stage, file=None, **data):
+        """
+        Times a stage. The yielded dict can be filled with `rows`, `bytes_read` and
+        `bytes_written` (or any other value) while the stage runs.
+        """
+        values = dict(data)
+        start = time.perf_counter()
+        try:
+            yield values
+        finally:
+            self.add(stage, file, seconds=time.perf_counter() - start, **values)
+
+    def totals(self):
+        """
+        Returns the total time, rows and bytes of each stage, slowest stage first.
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(
+                record["stage"], {"stage": record["stage"], "count": 0, "seconds": 0.0,
+                                  "rows": 0, "bytes_read": 0, "bytes_written": 0}
+            )
+            total["count"] += 1
+            for key in ("seconds", "rows", "bytes_read", "bytes_written"):
+                total[key] += record[key] or 0
+        return sorted(totals.values(), key=lambda total: total["seconds"], reverse=True)
+
+    def to_dict(self):
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": time.perf_counter() - self._start,
+            "peak_rss_mb": memory_usage_mb()[1],
+            "stages": self.totals(),
+            "records": self.records,
+        }
+
+    def save(self, base_path, formats=("json", "csv")):
+        """
+        Writes the run to `<base_path>_metrics.json` and `<base_path>_metrics.csv`, and its
+        profile to `<base_path>_profile.prof` when profiling.
+
+        Returns:
+            list: Paths of the files written.
+        """
+        paths = []
+        if "json" in formats:
+            paths.append(f"{base_path}_metrics.json")
+            with open(paths[-1], "w") as json_file:
+                json.dump(self.to_dict(), json_file, indent=2, default=str)
+        if "csv" in formats:
+            paths.append(f"{base_path}_metrics.csv")
+            with open(paths[-1], "w", newline="") as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=FIELDS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(self.records)
+        if self.profiler is not None:
+            paths.append(f"{base_path}_profile.prof")
+            self.profiler.dump_stats(paths[-1])
+
+        for path in paths:
+            print(f"Run metrics saved: {path}")
+        return paths
+
+
+_active_runs = []
+
+
+def current_run():
+    """
+    Returns the run being recorded, or None.
+    """
+    return _active_runs[-1] if _active_runs else None
+
+
+@contextmanager
+def track_run(name, profile=False):
+    """
+    Records the stages of a run. Stages entered with `stage` anywhere in the pipeline
+    while the run is active are added to it.
+
+    Parameters:
+        name (str): Name of the run, usually the entry point.
+        profile (bool): Also profile the run with cProfile.
+
+    Yields:
+        RunMetrics: The run.
+    """
+    run = RunMetrics(name, profile=profile)
+    _active_runs.append(run)
+    if run.profiler is not None:
+        run.profiler.enable()
+    try:
+        yield run
+    finally:
+        if run.profiler is not None:
+            run.profiler.disable()
+        _active_runs.remove(run)
+        summary = run.to_dict()
+        del summary["records"]
+        logger.info(json.dumps(summary, default=str))
+
+
+@contextmanager
+def stage(name, file=None, **data):
+    """
+    Times a stage of the current run, see `RunMetrics.stage`. Does nothing but yield a
+    dict when no run is being recorded.
+    """
+    run = current_run()
+    if run is None:
+        yield dict(data)
+        return
+    with run.stage(name, file, **data) as values:
+        yield values
@@ -0,0 +1,362 @@
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from scripts.datasets import write_dataset
+from scripts.schema import load_dataset
+
+# Value clustering: character n-grams of the folded values are the blocking keys, and
+# keys shared by more values than this are too common to tell variants apart
+NGRAM_SIZE = 3
+MAX_BLOCK_SIZE = 200
+# Values may differ by one edit per this many characters to be suggested as variants
+EDIT_RATIO = 0.2
+MIN_EDIT_LENGTH = 5
+
+_PUNCTUATION = re.compile(r"[^\w\s]|_", re.UNICODE)
+
+
+def load_mappings(directory):
+    """
+    Loads the normalization rules of a directory holding one `<column>.json` file per
+    column. Each file maps a canonical value to the variants that should become it:
+
+        {"3-D": ["3 - D", "3D", "3_D"], "Textile": ["Texile", "Txtile"]}
+
+    Returns:
+        dict: The variant -> canonical lookup of each column.
+    """
+    mappings = {}
+    if not os.path.isdir(directory):
+        return mappings
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name), "r") as mapping_file:
+                rules = json.load(mapping_file)
+            mappings[file_name[:-len(".json")]] = variant_lookup(rules)
+    return mappings
+
+
+def variant_lookup(rules):
+    """
+    Turns canonical -> variants rules into a variant -> canonical lookup.
+    """
+    lookup = {}
+    for canonical, variants in rules.items():
+        for variant in variants:
+            if lookup.setdefault(variant, canonical) != canonical:
+                raise ValueError(f"'{variant}' is listed as a variant of both '{lookup[variant]}' and '{canonical}'.")
+    return lookup
+
+
+def save_mapping(directory, column, rules):
+    """
+    Adds canonical -> variants rules to the mapping file of a column, keeping the rules
+    already in it.
+
+    Returns:
+        str: Path of the mapping file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{column}.json")
+    merged = {}
+    if os.path.exists(path):
+        with open(path, "r") as mapping_file:
+            merged = json.load(mapping_file)
+    for canonical, variants in rules.items():
+        merged[canonical] = sorted(set(merged.get(canonical, [])) | set(variants))
+    variant_lookup(merged)
+    with open(path, "w") as mapping_file:
+        json.dump(merged, mapping_file, indent=2, ensure_ascii=False)
+        mapping_file.write("\n")
+    return path
+
+
+def normalize_column(series, lookup):
+    """
+    Replaces the variants of a column by their canonical values in one vectorized pass.
+    Each distinct value is looked up once: categorical columns are recoded through their
+    categories, other columns through `pd.factorize`.
+
+    Parameters:
+        series (Series): The column.
+        lookup (dict): Variant -> canonical value.
+
+    Returns:
+        tuple: The normalized column and the number of values replaced.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    mapped = uniques.map(lambda value: lookup.get(value, value))
+    changed = np.asarray(mapped != uniques)
+    if not changed.any():
+        return series, 0
+    replaced = int(np.isin(codes, np.flatnonzero(changed)).sum())
+
+    new_codes, categories = pd.factorize(mapped)
+    codes = np.where(codes >= 0, new_codes[codes], -1)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = pd.Categorical.from_codes(codes, categories=categories)
+    else:
+        values = np.append(categories.to_numpy(dtype=object), None)[codes]
+    return pd.Series(values, index=series.index, name=series.name), replaced
+
+
+def normalize_frame(df, mappings):
+    """
+    Applies the normalization rules of every mapped column of a DataFrame, in place.
+    Columns without rules, and rules for columns the DataFrame does not have, are skipped.
+
+    Parameters:
+        df (DataFrame): The dataset.
+        mappings (dict): Variant -> canonical lookup of each column, see `load_mappings`.
+
+    Returns:
+        dict: Number of values replaced in each mapped column.
+    """
+    replaced = {}
+    for column, lookup in mappings.items():
+        if column in df.columns:
+            df[column], replaced[column] = normalize_column(df[column], lookup)
+    return replaced
+
+
+def fold(value):
+    """
+    Lowercases a value and strips its accents, punctuation and surrounding whitespace.
+    """
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _PUNCTUATION.sub(" ", value.lower()).strip()
+
+
+def fingerprint(value):
+    """
+    Key of values made of the same words: folded, split on whitespace, deduplicated and
+    sorted, so "Linen, Handkerchief" and "handkerchief linen" collide.
+    """
+    return " ".join(sorted(set(fold(value).split())))
+
+
+def ngram_fingerprint(value, size=2):
+    """
+    Key of values made of the same character n-grams once whitespace and punctuation
+    are removed, so "3 - D", "3D" and "3_D" collide.
+    """
+    text = "".join(fold(value).split())
+    grams = {text[start:start + size] for start in range(max(len(text) - size + 1, 1))}
+    return "".join(sorted(grams))
+
+
+def edit_distance(first, second, limit):
+    """
+    Levenshtein distance between two strings, or `limit` + 1 once it exceeds `limit`.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, start=1):
+        current = [row]
+        for column, second_char in enumerate(second, start=1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+@dataclass
+class Cluster:
+    """
+    Distinct values of a column that are probably variants of one another.
+
+    Attributes:
+        values (dict): Each value and its number of rows, most frequent first.
+        methods (list): The keys the values were matched on.
+    """
+    values: dict
+    methods: list = field(default_factory=list)
+
+    @property
+    def canonical(self):
+        """The most frequent value, suggested as the one to keep."""
+        return next(iter(self.values))
+
+    @property
+    def variants(self):
+        return list(self.values)[1:]
+
+    @property
+    def row_count(self):
+        return sum(self.values.values())
+
+    def to_rules(self):
+        return {self.canonical: self.variants}
+
+
+class _DisjointSets:
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.methods = defaultdict(set)
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second, method):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[second] = first
+            self.methods[first] |= self.methods.pop(second, set())
+        self.methods[first].add(method)
+
+
+def suggest_clusters(series, methods=("fingerprint", "ngram", "edit"), ngram_size=NGRAM_SIZE,
+                     max_block_size=MAX_BLOCK_SIZE, edit_ratio=EDIT_RATIO):
+    """
+    Groups the distinct values of a column that look like variants of one another.
+
+    Only distinct values are compared, so the row count of the column barely matters:
+    - "fingerprint" and "ngram" group values with the same `fingerprint` or
+      `ngram_fingerprint` key, in one pass.
+    - "edit" finds values a few typing errors apart ("Texile", "Textile"). Values are
+      only compared within blocks of values sharing a character n-gram, and blocks of
+      more than `max_block_size` values are skipped, so the work grows about linearly
+      with the number of distinct values instead of with its square.
+
+    Parameters:
+        series (Series): The column.
+        methods (tuple): The matching methods to use.
+        ngram_size (int): Length of the character n-grams used as blocking keys.
+        max_block_size (int): Largest block whose values are compared pairwise.
+        edit_ratio (float): Edits allowed per character of the shorter value.
+
+    Returns:
+        list: One `Cluster` per group of two or more values, largest first.
+    """
+    counts = series.value_counts()
+    counts = counts[counts.index.map(lambda value: isinstance(value, str))]
+    values = counts.index.tolist()
+    sets = _DisjointSets(len(values))
+
+    for method, key in (("fingerprint", fingerprint), ("ngram", ngram_fingerprint)):
+        if method not in methods:
+            continue
+        first_with_key = {}
+        for number, value in enumerate(values):
+            value_key = key(value)
+            first = first_with_key.setdefault(value_key, number)
+            if value_key and first != number:
+                sets.union(first, number, method)
+
+    if "edit" in methods:
+        folded = [fold(value) for value in values]
+        grams = [
+            {text[start:start + ngram_size] for start in range(len(text) - ngram_size + 1)}
+            if len(text) >= MIN_EDIT_LENGTH else set()
+            for text in folded
+        ]
+        blocks = defaultdict(list)
+        for number, value_grams in enumerate(grams):
+            for gram in value_grams:
+                blocks[gram].append(number)
+        blocks = {gram: np.array(block) for gram, block in blocks.items() if len(block) <= max_block_size}
+        for first, first_grams in enumerate(grams):
+            first_blocks = [blocks[gram] for gram in first_grams if gram in blocks]
+            if not first_blocks:
+                continue
+            others = np.concatenate(first_blocks)
+            others, shared = np.unique(others[others > first], return_counts=True)
+            # Each edit changes at most `ngram_size` n-grams, so values sharing fewer
+            # n-grams than this are too far apart to compare
+            most_edits = int(len(folded[first]) * edit_ratio)
+            for second in others[shared >= len(first_grams) - most_edits * ngram_size].tolist():
+                limit = int(min(len(folded[first]), len(folded[second])) * edit_ratio)
+                if limit and sets.find(first) != sets.find(second) \
+                        and edit_distance(folded[first], folded[second], limit) <= limit:
+                    sets.union(first, second, "edit")
+
+    groups = defaultdict(list)
+    for number in range(len(values)):
+        groups[sets.find(number)].append(number)
+    clusters = [
+        Cluster(
+            values={values[number]: int(counts.iloc[number]) for number in members},
+            methods=sorted(sets.methods[root]),
+        )
+        for root, members in groups.items() if len(members) > 1
+    ]
+    return sorted(clusters, key=lambda cluster: cluster.row_count, reverse=True)
+
+
+def print_suggestions(input_path, column, save=None):
+    """
+    Prints the clusters of likely variants of a column, see `suggest_clusters`.
+
+    Parameters:
+        input_path (str): CSV, Parquet or Feather file.
+        column (str): Column to cluster.
+        save (str): Optional directory whose mapping file of the column gets the suggestions.
+
+    Returns:
+        list: The clusters.
+    """
+    df = load_dataset(input_path, columns=[column], parse_dates=False)
+    clusters = suggest_clusters(df[column])
+    for cluster in clusters:
+        print(f"{cluster.canonical} ({', '.join(cluster.methods)})")
+        for value, count in cluster.values.items():
+            print(f"    {count:>8}  {value}")
+    print(f"{len(clusters)} clusters of likely variants in '{column}'.")
+    if save and clusters:
+        rules = {}
+        for cluster in clusters:
+            rules.update(cluster.to_rules())
+        print(f"Mapping saved: {save_mapping(save, column, rules)}")
+    return clusters
+
+
+def normalize_dataset(input_path, mappings_directory, output_path=None):
+    """
+    Applies the mapping files of a directory to a dataset and writes the result.
+
+    Parameters:
+        input_path (str): CSV, Parquet or Feather file.
+        mappings_directory (str): Directory of <column>.json mapping files.
+        output_path (str): File to write (default: <input>_normalized, in the same format).
+
+    Returns:
+        str: Path of the normalized dataset.
+    """
+    base_path, extension = os.path.splitext(input_path)
+    output_path = output_path or f"{base_path}_normalized{extension}"
+    df = load_dataset(input_path, parse_dates=False)
+    for column, count in normalize_frame(df, load_mappings(mappings_directory)).items():
+        print(f"{column}: {count} values normalized")
+    write_dataset(df, output_path)
+    print(f"Normalized dataset saved: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts normalize`
+    main(["normalize", *sys.argv[1:]])
@@ -0,0 +1,67 @@
+import os
+
+# This module only uses the standard library, so command-line entry points can name
+# formats and find directories without loading pandas, see `scripts.cli`.
+
+# Columnar formats are typed and compressed, and are preferred over CSV when a
+# directory holds the same dataset in several formats.
+COLUMNAR_FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+FORMATS = {"csv": ".csv", **COLUMNAR_FORMATS}
+
+# CSV files can also be gzip-compressed
+COMPRESSED_CSV_EXTENSION = ".csv.gz"
+# A column view is a small JSON file naming a dataset and some of its columns, read as
+# that projection of the dataset, see `scripts.datasets.write_view`
+VIEW_EXTENSION = ".columns.json"
+# Formats of the dropped-columns copies of the reports
+DROPPED_FORMATS = {**FORMATS, "csv.gz": COMPRESSED_CSV_EXTENSION, "view": VIEW_EXTENSION}
+
+# CSV readers: pandas' C parser, or Arrow's multi-threaded reader when pyarrow is installed
+CSV_ENGINES = ("pandas", "pyarrow")
+
+
+def find_directory(dir_name):
+    """
+    Locates the specified directory (e.g., 'data') by traversing upwards from the current working directory.
+    """
+    root_dir = os.getcwd()
+    while root_dir != os.path.dirname(root_dir):  # Traverse up until the root directory
+        if dir_name in os.listdir(root_dir):
+            return os.path.join(root_dir, dir_name)
+        root_dir = os.path.dirname(root_dir)
+    raise ValueError(f"Could not find '{dir_name}' directory in the path hierarchy.")
+
+
+def dataset_format(path):
+    """
+    Returns the format of a dataset file ("csv", "parquet", "feather", or "view" for a
+    column view) from its extension. Gzip-compressed CSV files are "csv".
+    """
+    lower_path = path.lower()
+    if lower_path.endswith(VIEW_EXTENSION):
+        return "view"
+    if lower_path.endswith(COMPRESSED_CSV_EXTENSION):
+        return "csv"
+    extension = os.path.splitext(lower_path)[1]
+    for fmt, fmt_extension in FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+
+def dataset_name(path):
+    """
+    Returns the file name of a dataset without its extension, the whole of ".csv.gz"
+    and ".columns.json" included, so a dataset is named alike in every format.
+    """
+    file_name = os.path.basename(path)
+    for extension in (VIEW_EXTENSION, COMPRESSED_CSV_EXTENSION):
+        if file_name.lower().endswith(extension):
+            return file_name[:-len(extension)]
+    return os.path.splitext(file_name)[0]
+
+
+def is_dataset(path):
+    lower_path = path.lower()
+    return lower_path.endswith((VIEW_EXTENSION, COMPRESSED_CSV_EXTENSION)) \
+        or os.path.splitext(lower_path)[1] in FORMATS.values()
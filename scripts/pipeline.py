@@ -0,0 +1,323 @@
+import csv
+import os
+import pickle
+import tempfile
+
+from scripts.cache import MANIFEST_NAME, Manifest
+from scripts.convert_to_csv import GremlinFilter, iter_xml_records, widen_csv
+from scripts.data_processing import build_report, render_file_section, write_dropped_copy
+from scripts.datasets import DROPPED_FORMATS, DatasetWriter, dataset_format, text_frame, text_table
+from scripts.metrics import file_size, stage, track_run
+from scripts.profiling import DatasetAccumulator, DatasetProfile
+from scripts.schema import compact_frame
+
+# Records parsed per batch when files are profiled whole; chunked profiling uses the chunk size
+BATCH_SIZE = 10000
+
+
+def _batch_columns(records, columns):
+    return {col: [record.get(col) for record in records] for col in columns}
+
+
+def iter_record_batches(source, batch_size=BATCH_SIZE):
+    """
+    Reads the records of an XML export in batches, in a single pass.
+
+    Each batch is yielded as {column: values}, None for a missing value, with the
+    columns seen so far in order of first appearance. The first record and the first
+    column are dropped, as `stream_xml_file_to_csv` does, so the columns are those of
+    the converted CSV file; columns first found in later records are missing from the
+    earlier batches. A file without records yields one empty batch.
+
+    Parameters:
+        source (file): The XML export, usually a `GremlinFilter`.
+        batch_size (int): Number of records per batch.
+
+    Yields:
+        dict: Values of each column.
+    """
+    records = iter_xml_records(source)
+    seen = dict.fromkeys(next(records, None) or ())
+    batch = []
+    yielded = False
+    for record in records:
+        if not seen.keys() >= record.keys():
+            seen.update(dict.fromkeys(record))
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield _batch_columns(batch, list(seen)[1:])
+            yielded = True
+            batch = []
+    if batch or not yielded:
+        yield _batch_columns(batch, list(seen)[1:])
+
+
+class CsvSink:
+    """
+    Writes the batches of `iter_record_batches` to a CSV file, byte for byte as
+    `stream_xml_file_to_csv` converts the same export. When later batches add columns
+    the file is padded to the full header on `close`.
+    """
+
+    def __init__(self, csv_file_path):
+        self.path = csv_file_path
+        self.columns = None
+        self._file = open(csv_file_path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file, lineterminator=os.linesep)
+
+    def write(self, data):
+        if self.columns is None:
+            self.columns = list(data)
+            self._writer.writerow(self.columns)
+        self._writer.writerows(zip(*data.values()))
+
+    def close(self, columns):
+        if self.columns is None:
+            self.columns = list(columns)
+            self._writer.writerow(self.columns)
+        self._file.close()
+        if len(columns) > len(self.columns):
+            widen_csv(self.path, columns)
+
+
+class _Spool:
+    """
+    Keeps Arrow tables in a temporary file until they can be written out.
+    """
+
+    def __init__(self, directory):
+        self._file = tempfile.TemporaryFile(dir=directory)
+
+    def append(self, table):
+        pickle.dump(table, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self):
+        self._file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._file)
+            except EOFError:
+                return
+
+    def close(self):
+        self._file.close()
+
+
+def profile_xml_file(xml_file_path, csv_file_path, dropped_path, chunksize=None, write_csv=False):
+    """
+    Profiles an XML export straight out of the parser and writes its dropped-columns
+    copy, without converting it to CSV first. The records are parsed once, batch by
+    batch, and each batch of text is typed in Arrow as `pd.read_csv` would type the
+    converted file, so the profile is the same as the CSV flow's.
+
+    Without `chunksize` the whole file is held as compact Arrow text, typed and
+    compacted at the end, as `load_dataset` loads a CSV file. With `chunksize` each
+    batch of that many records is profiled and discarded; as the columns to keep are
+    only known at the end, the text of the batches is spooled to a temporary file next
+    to the copy in the meantime. A column view of the CSV file needs no spooling, but
+    needs `write_csv`.
+
+    Parameters:
+        xml_file_path (str): Path to the XML export.
+        csv_file_path (str): Path of the converted CSV file. The profile is named after it,
+            and with `write_csv` the records are also written there as they are parsed.
+        dropped_path (str): Path of the copy with dropped columns; its extension sets the format.
+        chunksize (int): Optional number of records to profile at a time.
+        write_csv (bool): Also write the CSV file, see `CsvSink`.
+
+    Returns:
+        tuple: The `DatasetProfile` of the file and the number of gremlin characters
+            filtered out of the input.
+    """
+    view = dataset_format(dropped_path) == "view"
+    if view and not write_csv:
+        raise ValueError("A column view of an XML export needs its CSV file, see `write_csv`.")
+    batch_size = chunksize or BATCH_SIZE
+    accumulator = DatasetAccumulator(csv_file_path) if chunksize else None
+    spool = _Spool(os.path.dirname(dropped_path) or ".") if chunksize and not view else None
+    sink = CsvSink(csv_file_path) if write_csv else None
+    tables = []
+    columns = []
+
+    try:
+        with stage("stream", xml_file_path, bytes_read=file_size(xml_file_path)) as record, \
+                GremlinFilter(xml_file_path) as source:
+            for data in iter_record_batches(source, batch_size):
+                columns = list(data)
+                if not columns:
+                    raise ValueError(f"No columns found in {xml_file_path}")
+                table = text_table(data)
+                if sink is not None:
+                    sink.write(data)
+                if accumulator is None:
+                    tables.append(table)
+                    continue
+                chunk = text_frame([table], columns).set_index(columns[0])
+                for col in chunk.columns:
+                    if col not in accumulator.columns and accumulator.row_count:
+                        accumulator.add_null_column(col)
+                accumulator.update(chunk)
+                if spool is not None:
+                    spool.append(table)
+            record["rows"] = accumulator.row_count if accumulator else sum(table.num_rows for table in tables)
+            removed = source.removed
+        if sink is not None:
+            sink.close(columns)
+            sink = None
+
+        if accumulator is None:
+            with stage("profile", xml_file_path, rows=record["rows"]):
+                df = text_frame(tables, columns).set_index(columns[0])
+                tables = None
+                compact_frame(df)
+                profile = DatasetProfile.from_dataframe(df, csv_file_path)
+            write_dropped_copy(csv_file_path, dropped_path, profile, df=df)
+        elif view:
+            profile = accumulator.to_profile()
+            write_dropped_copy(csv_file_path, dropped_path, profile)
+        else:
+            profile = accumulator.to_profile()
+            kept = [col.name for col in profile.current_columns]
+            with stage("write_dropped", xml_file_path, rows=profile.row_count) as record:
+                # Values are copied as text, as `write_dropped_chunks` copies them
+                with DatasetWriter(dropped_path) as writer:
+                    for table in spool:
+                        writer.write(text_frame([table], columns, dtype=str, keep_default_na=False)[kept])
+                record["bytes_written"] = file_size(dropped_path)
+            print(f"Saved cleaned {dataset_format(dropped_path).upper()}: {dropped_path}")
+    finally:
+        if sink is not None:
+            sink.close(columns)
+        if spool is not None:
+            spool.close()
+
+    return profile, removed
+
+
+class XmlSource:
+    """
+    The XML exports of a file or directory as the inputs of a report, profiled straight
+    out of the parser by `profile_xml_file`. Passed to `build_report` as its `source`.
+
+    Attributes:
+        files (list): Paths of the XML exports.
+        name (str): Name of the report, after the file or directory.
+        settings (dict): Settings of the pipeline, cached with the report sections.
+    """
+
+    def __init__(self, xml_path, csv_directory=None, write_csv=False):
+        if os.path.isfile(xml_path):
+            self.files = [xml_path]
+            self.name = os.path.splitext(os.path.basename(xml_path))[0]
+            csv_directory = csv_directory or os.path.dirname(xml_path)
+        elif os.path.isdir(xml_path):
+            self.files = [
+                os.path.join(xml_path, file_name) for file_name in os.listdir(xml_path) if file_name.endswith(".xml")
+            ]
+            if not self.files:
+                raise ValueError(f"No XML files found in the directory '{xml_path}'.")
+            self.name = os.path.basename(os.path.normpath(xml_path))
+            csv_directory = csv_directory or f"{os.path.normpath(xml_path)}_csv"
+        else:
+            raise ValueError(f"The input path '{xml_path}' is neither a valid file nor a directory.")
+
+        self.csv_directory = csv_directory
+        self.write_csv = write_csv
+        self.settings = {"pipeline": "xml", "csv": os.path.abspath(csv_directory) if write_csv else None}
+        if write_csv:
+            os.makedirs(csv_directory, exist_ok=True)
+
+    def csv_path(self, xml_file_path):
+        base_file_name = os.path.splitext(os.path.basename(xml_file_path))[0]
+        return os.path.join(self.csv_directory, f"{base_file_name}.csv")
+
+    def build_section(self, xml_file_path, dropped_dir, chunksize, dropped_format, renderer):
+        """
+        Profiles one XML export and generates its report section, as `generate_file_section`
+        does for a dataset file.
+
+        Returns:
+            dict or None: The section HTML, the file's `DatasetProfile` and the CSV file
+                written alongside if any, or None if the file could not be parsed.
+        """
+        csv_file_path = self.csv_path(xml_file_path)
+        base_file_name = os.path.splitext(os.path.basename(xml_file_path))[0]
+        dropped_path = os.path.join(dropped_dir, f"{base_file_name}_dropped{DROPPED_FORMATS[dropped_format]}")
+
+        print(f"Processing file: {xml_file_path}")
+        try:
+            profile, removed = profile_xml_file(
+                xml_file_path, csv_file_path, dropped_path, chunksize=chunksize, write_csv=self.write_csv
+            )
+        except Exception as e:
+            print(f"Error processing {xml_file_path}: {e}")
+            return None
+        if removed:
+            print(f"Removed {removed} gremlin characters from {xml_file_path}")
+
+        outputs = []
+        if self.write_csv:
+            # Later `xml_to_csv` runs skip the file as already converted
+            manifest = Manifest(os.path.join(self.csv_directory, MANIFEST_NAME))
+            manifest.record(xml_file_path, {"converter": "xml", "formats": ["csv"]}, [csv_file_path])
+            manifest.save()
+            print(f"Converted {xml_file_path} to {csv_file_path}")
+            outputs.append(csv_file_path)
+
+        return {"html": render_file_section(profile, renderer), "profile": profile, "outputs": outputs}
+
+
+def xml_to_report(xml_path, csv_directory=None, write_csv=False, force=False, chunksize=None, dropped_format="csv",
+                  chart_backend="kaleido", chart_workers=1, workers=1, profile=False):
+    """
+    Generates the PDF report of XML exports in one pass over each file: records stream
+    from the parser into the column profiler and the report, without writing a CSV
+    file and reading it back. The report has the same sections as converting the
+    exports with `xml_to_csv` and reporting on the CSV directory with
+    `process_and_generate_report`, and is named after the XML file or directory.
+
+    The dropped-columns copies are written as usual, and the CSV files can be written
+    from the same stream with `write_csv`; they are then recorded as converted, so a
+    later `xml_to_csv` into the same directory skips them. Sections are cached like
+    those of `process_and_generate_report`. Requires pyarrow.
+
+    Parameters:
+        xml_path (str): Path to an XML export or a directory of XML exports.
+        csv_directory (str): Directory of the CSV files (default: <xml directory>_csv).
+        write_csv (bool): Also write the CSV files.
+        force (bool): Rebuild every section, even for files unchanged since the last run.
+        chunksize (int): Optional number of records to profile at a time, for exports larger
+            than memory. Unique counts of high-cardinality columns are then estimated.
+        dropped_format (str): Format of the dropped-columns copies, see `process_and_generate_report`.
+            Column views ("view") need `write_csv`.
+        chart_backend (str): "kaleido" for Plotly charts, or "matplotlib" for lighter static charts.
+        chart_workers (int): Number of processes drawing charts in parallel.
+        workers (int): Number of processes rendering PDF sections in parallel. 0 uses every core.
+        profile (bool): Also profile the run with cProfile, saving the stats to `<report>_profile.prof`.
+
+    Returns:
+        str: Path of the PDF report.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("The XML pipeline requires pyarrow: pip install pyarrow")
+
+    if dropped_format == "view" and not write_csv:
+        raise ValueError("Column views of XML exports need their CSV files, pass write_csv=True.")
+    source = XmlSource(xml_path, csv_directory, write_csv)
+    with track_run("xml_to_report", profile=profile) as run_metrics:
+        pdf_path = build_report(
+            xml_path, force, chunksize, dropped_format, chart_backend, chart_workers, workers, source=source
+        )
+        run_metrics.save(os.path.splitext(pdf_path)[0])
+    return pdf_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts xml-report`
+    main(["xml-report", *sys.argv[1:]])
@@ -0,0 +1,798 @@
+import io
+import math
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from scripts.charts import ChartRenderer, bar_chart_specs
+from scripts.data_processing import (
+    PAGE_BREAK, generate_cover_page, html_document, render_chart_images, render_pdf, render_summary_html,
+    report_inputs,
+)
+from scripts.datasets import (
+    LineWindow, csv_engine, dataset_format, find_row_start, iter_dataset_chunks, parse_csv_records, read_columns,
+    resolve_view
+)
+from scripts.metrics import file_size, stage, track_run
+from scripts.paths import COMPRESSED_CSV_EXTENSION, dataset_name, find_directory
+
+# Ways of drawing the sample: "seek" reads short blocks of rows at random offsets of an
+# uncompressed CSV file, "stream" keeps a uniform reservoir of the rows read in one pass
+PREVIEW_METHODS = ("auto", "seek", "stream")
+
+# Normal quantile of the 95% confidence intervals
+Z_95 = 1.959964
+
+# Share of the time budget spent sampling and estimating, the rest is left for the charts and the PDF
+SAMPLING_SHARE = 0.5
+
+# Seconds kept for the charts and the PDF at least: loading the chart backend and the PDF
+# renderer, then the sections of each file
+RENDER_SECONDS = 2.0
+RENDER_FILE_SECONDS = 0.5
+
+# With "auto", CSV files smaller than this are streamed whole rather than seeked into
+SEEK_MIN_BYTES = 64 << 20
+
+# Consecutive rows read at each random offset
+BLOCK_ROWS = 16
+
+# Bytes read at most after a random offset
+BLOCK_WINDOW_BYTES = 4 << 20
+
+# Rows read per chunk when streaming
+STREAM_CHUNKSIZE = 20000
+
+
+@dataclass
+class Estimate:
+    """
+    A figure of a preview report, estimated from a sample.
+
+    Attributes:
+        value (float): Point estimate.
+        low (float): Lower end of its interval.
+        high (float): Upper end of its interval, or None when the sample gives no upper bound.
+        exact (bool): True when the figure was computed from every row.
+    """
+    value: float
+    low: float
+    high: float = None
+    exact: bool = False
+
+    @classmethod
+    def exactly(cls, value):
+        return cls(value, value, value, exact=True)
+
+    def format(self, percent=False):
+        def number(value):
+            return f"{value:.1%}" if percent else f"{value:,.0f}"
+
+        if self.exact:
+            return number(self.value)
+        if self.high is None:
+            return f"at least {number(self.low)}"
+        return f"~{number(self.value)} ({number(self.low)} - {number(self.high)})"
+
+    def __str__(self):
+        return self.format()
+
+
+def proportion_interval(p, n, z=Z_95):
+    """
+    Returns the Wilson score interval of a proportion `p` observed in `n` rows. Unlike the
+    normal approximation it stays within [0, 1] and is not empty when `p` is 0 or 1.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(centre - half_width, 0.0), min(centre + half_width, 1.0)
+
+
+def effective_sizes(indicators, clusters):
+    """
+    Returns the effective sample size of the share of rows flagged in each column of
+    `indicators`, given that rows were drawn in clusters of consecutive rows.
+
+    Rows of a cluster tend to look alike, so a clustered sample carries less information
+    than as many independent rows. The variance of each share is estimated from the
+    cluster totals, as for a ratio estimator, and the sample size is divided by the design
+    effect, its ratio to the variance of a simple random sample (never below 1). When
+    every row or none is flagged, the variance is zero and the number of clusters is used.
+
+    Parameters:
+        indicators (DataFrame): Boolean flags, one column per figure.
+        clusters (ndarray): Cluster of each row. Each row is its own cluster in a simple
+            random sample, and the effective size is then the sample size.
+
+    Returns:
+        tuple: The shares (Series) and their effective sample sizes (ndarray).
+    """
+    n = len(indicators)
+    shares = indicators.mean() if n else indicators.sum().astype(float)
+    cluster_count = len(np.unique(clusters))
+    if n == 0:
+        return shares, np.zeros(len(shares))
+    if cluster_count == n or cluster_count < 2:
+        return shares, np.full(len(shares), float(cluster_count if cluster_count < 2 else n))
+
+    totals = indicators.groupby(clusters).sum().to_numpy(dtype=float)
+    sizes = np.bincount(pd.factorize(clusters)[0]).astype(float)
+    p = shares.to_numpy(dtype=float)
+    residuals = totals - sizes[:, None] * p
+    cluster_variance = cluster_count / (cluster_count - 1) * (residuals ** 2).sum(axis=0) / (n * n)
+    random_variance = p * (1 - p) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        design_effect = np.where(random_variance > 0, cluster_variance / random_variance, np.nan)
+    sizes = np.where(np.isnan(design_effect), float(cluster_count), n / np.maximum(design_effect, 1.0))
+    return shares, sizes
+
+
+@dataclass
+class Sample:
+    """
+    Rows drawn from a dataset for a preview.
+
+    Attributes:
+        frame (DataFrame): The sampled rows, indexed like the reports read files.
+        clusters (ndarray): Block each row was read in; every row is its own block when streaming.
+        method (str): "seek" or "stream".
+        row_count (Estimate): Rows of the whole dataset.
+        rows_read (int): Rows parsed to draw the sample.
+        bytes_read (int): Bytes read to draw the sample, when known.
+        complete (bool): Whether every row of the dataset was read.
+        seconds (float): Time spent sampling.
+    """
+    frame: pd.DataFrame
+    clusters: np.ndarray
+    method: str
+    row_count: Estimate
+    rows_read: int
+    bytes_read: int = None
+    complete: bool = False
+    seconds: float = 0.0
+
+    @property
+    def exact(self):
+        """Whether the sample holds every row of the dataset."""
+        return self.complete and len(self.frame) == self.rows_read
+
+
+def _read_block(csv_file, offset, field_count, block_rows, seen):
+    # Reads the rows following `offset`, skipping those whose start is in `seen` so that
+    # blocks do not overlap. Returns the bytes of the new rows, their number and the bytes
+    # they span, or None when no row start is found, see `find_row_start`.
+    csv_file.seek(offset - 1)
+    csv_file.readline()
+    window = LineWindow(csv_file, BLOCK_WINDOW_BYTES)
+    first = find_row_start(window, field_count)
+    if first is None:
+        return None
+
+    records, outcome = parse_csv_records(window, first, field_count, block_rows)
+    if outcome == "error":
+        return None
+    data = b""
+    spanned = 0
+    starts = []
+    for record_first, record_end in records:
+        length = window.end(record_end) - window.starts[record_first]
+        if window.starts[record_first] not in seen:
+            starts.append(window.starts[record_first])
+            data += b"".join(window.lines[record_first:record_end])
+            spanned += length
+    if records:
+        # Blank lines between the rows are skipped by the readers but still take up bytes of the file
+        span = window.end(records[-1][1]) - window.starts[records[0][0]]
+        spanned += span - sum(window.end(end) - window.starts[start] for start, end in records)
+    seen.update(starts)
+    return data, len(starts), spanned
+
+
+def seek_sample(path, row_budget, deadline, rng, block_rows=BLOCK_ROWS):
+    """
+    Samples an uncompressed CSV file without reading it whole: blocks of `block_rows`
+    consecutive rows are read at random byte offsets until `row_budget` rows are drawn or
+    `deadline` passes, whichever comes first. At least one block is always read, and rows
+    are never drawn twice.
+
+    The number of rows of the file is estimated from the bytes per row of the blocks, with
+    a 95% confidence interval from their spread. The first row of a block follows a row
+    chosen in proportion to its length, which does not bias its own values.
+
+    Parameters:
+        path (str): Path to the CSV file.
+        row_budget (int): Maximum number of rows to draw.
+        deadline (float): `time.perf_counter()` value at which to stop.
+        rng (Generator): Random number generator drawing the offsets.
+        block_rows (int): Rows read at each offset.
+
+    Returns:
+        Sample: The sampled rows.
+    """
+    start = time.perf_counter()
+    names = read_columns(path)
+    size = os.path.getsize(path)
+    blocks = []
+    block_bytes = []
+    block_sizes = []
+    seen = set()
+    sampled_rows = 0
+    rejected = 0
+    repeated = 0
+    with open(path, "rb") as csv_file:
+        csv_file.readline()
+        data_start = csv_file.tell()
+        if data_start >= size:
+            raise ValueError(f"{path} has no rows to sample")
+
+        while sampled_rows < row_budget and (not blocks or time.perf_counter() < deadline):
+            offset = int(rng.integers(data_start, size))
+            block = _read_block(csv_file, offset, len(names), min(block_rows, row_budget - sampled_rows), seen)
+            if block is None:
+                rejected += 1
+                if rejected > 2 * (len(blocks) + 10):
+                    raise ValueError(f"could not find where rows start at random offsets of {path}")
+                continue
+            data, records, spanned = block
+            if not records:
+                # Offsets keep landing on rows already read once the sample holds most of the file
+                repeated += 1
+                if repeated > 10 * (len(blocks) + 10):
+                    break
+                continue
+            blocks.append(data)
+            block_bytes.append(spanned)
+            block_sizes.append(records)
+            sampled_rows += records
+
+    frame = pd.read_csv(io.BytesIO(b"".join(blocks)), header=None, names=names, index_col=0, low_memory=False)
+    if len(frame) != sampled_rows:
+        raise ValueError(f"expected {sampled_rows} sampled rows in {path}, read {len(frame)}")
+
+    # Rows per byte of the sampled blocks, as a ratio estimator over the blocks
+    sizes = np.array(block_sizes, dtype=float)
+    lengths = np.array(block_bytes, dtype=float)
+    data_bytes = size - data_start
+    rate = sizes.sum() / lengths.sum() if lengths.sum() else 0.0
+    value = rate * data_bytes
+    if len(blocks) > 1:
+        rate_error = math.sqrt(
+            len(blocks) / (len(blocks) - 1) * ((sizes - rate * lengths) ** 2).sum()
+        ) / lengths.sum()
+        margin = Z_95 * rate_error * data_bytes
+        row_count = Estimate(value, max(value - margin, float(len(frame))), value + margin)
+    else:
+        row_count = Estimate(value, float(len(frame)))
+
+    return Sample(
+        frame=frame,
+        clusters=np.repeat(np.arange(len(block_sizes)), block_sizes),
+        method="seek",
+        row_count=row_count,
+        rows_read=len(frame),
+        bytes_read=int(lengths.sum()),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def known_row_count(path):
+    """
+    Returns the number of rows of a Parquet or Feather file, or of the dataset of a column
+    view, from its metadata, or None for CSV files.
+    """
+    path, _ = resolve_view(path)
+    fmt = dataset_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    if fmt == "feather":
+        # Counted from the record batch headers, without decompressing the batches
+        import pyarrow.dataset as ds
+        return ds.dataset(path, format="feather").count_rows()
+    return None
+
+
+def stream_sample(path, row_budget, deadline, rng, engine="pandas", chunksize=STREAM_CHUNKSIZE):
+    """
+    Samples a dataset of any format in one pass: every row read gets a random key and the
+    `row_budget` rows with the smallest keys are kept, a uniform sample of the rows read.
+    The first chunk is always read; no other chunk is read once `deadline` has passed.
+
+    When the whole dataset is read, its number of rows is exact. Otherwise the sample only
+    covers the rows read so far; the number of rows is then read from the metadata of
+    columnar files, and only bounded below for CSV files.
+
+    Parameters:
+        path (str): Path to the dataset file.
+        row_budget (int): Maximum number of rows to keep.
+        deadline (float): `time.perf_counter()` value at which to stop.
+        rng (Generator): Random number generator drawing the keys.
+        engine (str): CSV reader, "pandas" or "pyarrow".
+        chunksize (int): Rows read at a time.
+
+    Returns:
+        Sample: The sampled rows.
+    """
+    start = time.perf_counter()
+    reservoir = None
+    keys = np.empty(0)
+    rows_read = 0
+    complete = True
+    for chunk in iter_dataset_chunks(path, chunksize, index_col=0, engine=engine):
+        rows_read += len(chunk)
+        reservoir = chunk if reservoir is None else pd.concat([reservoir, chunk])
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(reservoir) > row_budget:
+            keep = np.sort(np.argpartition(keys, row_budget)[:row_budget])
+            reservoir, keys = reservoir.iloc[keep], keys[keep]
+        if time.perf_counter() >= deadline:
+            complete = False
+            break
+
+    known_rows = None
+    if not complete:
+        known_rows = known_row_count(path)
+        # CSV chunks have exactly `chunksize` rows, so a shorter one was the last
+        complete = len(chunk) < chunksize if known_rows is None else known_rows == rows_read
+    if complete:
+        row_count = Estimate.exactly(rows_read)
+    elif known_rows is not None:
+        row_count = Estimate.exactly(known_rows)
+    else:
+        row_count = Estimate(rows_read, rows_read)
+
+    return Sample(
+        frame=reservoir,
+        clusters=np.arange(len(reservoir)),
+        method="stream",
+        row_count=row_count,
+        rows_read=rows_read,
+        bytes_read=file_size(path) if complete else None,
+        complete=complete,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def can_seek(path):
+    return dataset_format(path) == "csv" and not path.lower().endswith(COMPRESSED_CSV_EXTENSION)
+
+
+def sample_dataset(path, row_budget, deadline, rng, method="auto", engine="pandas"):
+    """
+    Draws the sample of one dataset file for a preview, see `seek_sample` and
+    `stream_sample`. With "auto", uncompressed CSV files of at least `SEEK_MIN_BYTES` are
+    sampled at random offsets and other files are streamed; a CSV file whose rows cannot
+    be found at random offsets is streamed instead, in the time left before `deadline`.
+    """
+    if method not in PREVIEW_METHODS:
+        raise ValueError(f"Unsupported sampling method '{method}', use one of: {', '.join(PREVIEW_METHODS)}.")
+    if method == "seek" and not can_seek(path):
+        raise ValueError(f"Only uncompressed CSV files can be sampled at random offsets: {path}")
+
+    if method == "seek" or (method == "auto" and can_seek(path) and os.path.getsize(path) >= SEEK_MIN_BYTES):
+        try:
+            return seek_sample(path, row_budget, deadline, rng)
+        except ValueError as e:
+            if method == "seek":
+                raise
+            # Most likely rows that do not parse on their own, see `_read_block`
+            print(f"Could not sample {path} at random offsets, streaming it instead: {e}")
+    return stream_sample(path, row_budget, deadline, rng, engine)
+
+
+@dataclass
+class ColumnEstimate:
+    """
+    Estimated statistics for one column of a sampled dataset.
+
+    Attributes:
+        name (str): Column name.
+        dtype (str): Pandas dtype of the column in the sample.
+        non_null (Estimate): Number of non-null values.
+        null_rate (Estimate): Share of null values.
+        distinct (Estimate): Number of distinct values, counting null as a value like the
+            full report does. Its interval is the range of counts consistent with the sample.
+        sample_distinct (int): Distinct non-null values in the sample.
+        has_zeros (bool): Whether a non-numeric column holds the value 0 in the sample.
+    """
+    name: str
+    dtype: str
+    non_null: Estimate
+    null_rate: Estimate
+    distinct: Estimate
+    sample_distinct: int
+    has_zeros: bool = False
+
+    @property
+    def all_null(self):
+        """Whether no sampled row holds a value, not that the column is empty."""
+        return self.non_null.value == 0
+
+    @property
+    def distinct_count(self):
+        return self.distinct.value
+
+
+def distinct_estimate(counts, population, exact):
+    """
+    Estimates the distinct non-null values of a column from its sampled values, with the
+    Duj1 estimator of Haas and Stokes (also used by PostgreSQL's ANALYZE): n * d / (n - f1
+    + f1 * n / N) for d distinct values, f1 of them seen once, in n of N values. It is d
+    when no value is seen once and N when every value is.
+
+    No sample bounds a distinct count for certain, so the range goes from the d values
+    seen to the count if every value seen once stood for N / n values, as in the bounds
+    of Charikar et al.'s Guaranteed-Error Estimator, with N at the top of its interval.
+
+    Parameters:
+        counts (ndarray): Number of times each distinct non-null value is sampled.
+        population (Estimate): Non-null values of the column in the whole dataset.
+        exact (bool): Whether the sample holds every row.
+
+    Returns:
+        Estimate: The distinct count.
+    """
+    seen = len(counts)
+    if exact:
+        return Estimate.exactly(seen)
+    if seen == 0:
+        return Estimate(0, 0, population.high)
+
+    n = int(counts.sum())
+    singletons = int((counts == 1).sum())
+    population_size = max(population.value, n)
+    value = n * seen / (n - singletons + singletons * n / population_size)
+    high = max(population.high if population.high is not None else population_size, n) / n * singletons \
+        + seen - singletons
+    return Estimate(min(max(value, seen), high), seen, high)
+
+
+@dataclass
+class PreviewProfile:
+    """
+    Estimated statistics for one file, computed from a sample of its rows. Has the
+    properties the summary table and charts of the full reports read from a
+    `DatasetProfile`, with `Estimate` values in place of counts.
+
+    Attributes:
+        path (str): Path of the sampled file.
+        sample (Sample): How the rows were sampled; not saved with the profile.
+        row_count (Estimate): Number of rows.
+        empty_row_count (Estimate): Number of rows in which every value is null.
+        columns (list): One `ColumnEstimate` per column, in file order.
+    """
+    path: str
+    sample: Sample = field(repr=False)
+    row_count: Estimate
+    empty_row_count: Estimate
+    columns: list = field(default_factory=list)
+
+    @classmethod
+    def from_sample(cls, path, sample):
+        """
+        Estimates the statistics of a file from its sample, with 95% confidence intervals
+        that allow for the sample being drawn in blocks of consecutive rows, see
+        `effective_sizes`. Counts combine the interval of the share with that of the
+        number of rows.
+
+        Parameters:
+            path (str): Path of the file.
+            sample (Sample): Rows drawn from it.
+
+        Returns:
+            PreviewProfile: The estimated profile.
+        """
+        df = sample.frame
+        row_count = sample.row_count
+        exact = sample.exact
+        not_null = df.notna()
+        indicators = pd.concat([not_null, (~not_null.any(axis=1)).rename(None)], axis=1, ignore_index=True)
+        shares, sizes = effective_sizes(indicators, sample.clusters)
+
+        def share_estimate(share, size):
+            if exact:
+                return Estimate.exactly(share * row_count.value)
+            low, high = proportion_interval(share, size)
+            return Estimate(
+                share * row_count.value, low * row_count.low, None if row_count.high is None else high * row_count.high
+            )
+
+        columns = []
+        for position, col in enumerate(df.columns):
+            share, size = shares.iloc[position], sizes[position]
+            non_null = share_estimate(share, size)
+            if exact:
+                null_rate = Estimate.exactly(1 - share)
+            else:
+                low, high = proportion_interval(share, size)
+                null_rate = Estimate(1 - share, 1 - high, 1 - low)
+
+            # Nulls are coded -1 and left out of the counts
+            codes, uniques = pd.factorize(df[col])
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            distinct = distinct_estimate(counts, non_null, exact)
+            if null_rate.value > 0 or not len(uniques):
+                # Null counts as a value, as in `ColumnProfile.distinct_count`
+                distinct = Estimate(distinct.value + 1, distinct.low + 1,
+                                    None if distinct.high is None else distinct.high + 1, distinct.exact)
+            has_zeros = not pd.api.types.is_numeric_dtype(df[col]) and bool(pd.Series(uniques).eq(0).any())
+            columns.append(ColumnEstimate(
+                name=col,
+                dtype=str(df[col].dtype),
+                non_null=non_null,
+                null_rate=null_rate,
+                distinct=distinct,
+                sample_distinct=len(uniques),
+                has_zeros=has_zeros,
+            ))
+
+        return cls(
+            path=path,
+            sample=sample,
+            row_count=row_count,
+            empty_row_count=share_estimate(shares.iloc[-1], sizes[-1]),
+            columns=columns,
+        )
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def dropped_columns(self):
+        """Columns without a value in any sampled row."""
+        return [column.name for column in self.columns if column.all_null]
+
+    @property
+    def current_columns(self):
+        return [column for column in self.columns if not column.all_null]
+
+    def summary(self):
+        """
+        Returns the statistics shown for this file in the summary page.
+        """
+        return {
+            "File": self.file_name,
+            "Total Columns": len(self.columns),
+            "Dropped Columns": len(self.dropped_columns),
+            "Rows": str(self.row_count),
+            "Columns": self.column_names,
+        }
+
+    def describe_sample(self):
+        """
+        Returns a sentence saying how the figures of the file were obtained.
+        """
+        sample = self.sample
+        rows = len(sample.frame)
+        if sample.exact:
+            return f"Computed from all {rows:,} rows, read in {sample.seconds:.1f} s."
+        if sample.method == "seek":
+            blocks = len(np.unique(sample.clusters))
+            text = (f"Estimated from {rows:,} rows read in {blocks:,} blocks at random offsets of the file, "
+                    f"in {sample.seconds:.1f} s.")
+        elif sample.complete:
+            text = f"Estimated from a uniform sample of {rows:,} rows, read in {sample.seconds:.1f} s."
+        else:
+            text = (f"Estimated from a uniform sample of {rows:,} of the first {sample.rows_read:,} rows, read in "
+                    f"{sample.seconds:.1f} s. The rest of the file was not read, so the figures only describe "
+                    f"its beginning.")
+        return text + (" Figures marked ~ are estimates followed by their 95% confidence interval; unique counts "
+                       "are followed by the range of counts consistent with the sample.")
+
+
+def preview_count_specs(preview):
+    """
+    Returns the specs of the estimated unique count charts of a file's section, see `bar_chart_specs`.
+    """
+    base_file_name = dataset_name(preview.file_name)
+    label = "Unique Count" if preview.sample.exact else "Estimated Unique Count"
+    current_columns = preview.current_columns
+    chart_df = pd.DataFrame({
+        "Column": [col.name for col in current_columns],
+        label: [round(col.distinct_count) for col in current_columns],
+    }).sort_values(by=label, ascending=False)
+    return bar_chart_specs(
+        chart_df,
+        x_axis="Column",
+        y_axis=label,
+        base_title=f"{label} of Values for {base_file_name}",
+        xaxis_label="Column Names",
+        yaxis_label=label,
+    )
+
+
+def render_preview_section(preview, renderer=None):
+    """
+    Generates the HTML content of one file's section of a preview report, laid out like
+    the sections of the full report, see `render_file_section`.
+
+    Parameters:
+        preview (PreviewProfile): Estimated profile of the file.
+        renderer (ChartRenderer): Optional renderer for the charts.
+
+    Returns:
+        str: HTML content for the section.
+    """
+    base_file_name = dataset_name(preview.file_name)
+    empty_columns = preview.dropped_columns
+    current_columns = preview.current_columns
+
+    # Columns without values in the sample may still hold a few
+    empty_columns_note = ""
+    if empty_columns and not preview.sample.exact:
+        upper_bound = max(1 - col.null_rate.low for col in preview.columns if col.all_null)
+        empty_columns_note = f"<p>Each of these may still hold values in up to {upper_bound:.1%} of the rows.</p>"
+
+    columns_with_zeros_list = [col.name for col in current_columns if col.has_zeros]
+    columns_with_zeros = ""
+    if columns_with_zeros_list:
+        columns_with_zeros = f"""
+            <h2 class="sub-header">Columns with Zeros in the Sample:</h2>
+            <p>{', '.join(columns_with_zeros_list)}</p>
+        """
+
+    with stage("charts", preview.path, rows=len(current_columns)):
+        charts_html = render_chart_images(preview_count_specs(preview), renderer)
+
+    col_value_table_rows = ""
+    for col in current_columns:
+        col_value_table_rows += f"""
+        <tr>
+            <td>{col.name}</td>
+            <td>{col.non_null}</td>
+            <td>{col.null_rate.format(percent=True)}</td>
+            <td>{col.distinct}</td>
+        </tr>
+        """
+
+    column_counts_table = f"""
+    <h2 class="sub-header">Column Value Counts:</h2>
+    <table class="value-counts-table">
+        <thead>
+            <tr>
+                <th>Column</th>
+                <th>Value Count</th>
+                <th>Null Rate</th>
+                <th>Unique Count</th>
+            </tr>
+        </thead>
+        <tbody>
+            {col_value_table_rows}
+        </tbody>
+    </table>
+    """
+
+    return f"""
+        <h1 class="header">Preview of {base_file_name}</h1>
+        <p>{preview.describe_sample()}</p>
+        <h2 class="sub-header">Columns Empty in the Sample ({len(empty_columns)}):</h2>
+        <p>{', '.join(empty_columns) if empty_columns else "None"}</p>
+        {empty_columns_note}
+        <h2 class="sub-header">Current Columns ({len(current_columns)}):</h2>
+        <p>{', '.join(col.name for col in current_columns)}</p>
+        <h2 class="sub-header">Number of Rows:</h2>
+        <p>{preview.row_count}</p>
+        <h2 class="sub-header">Number of Empty Rows:</h2>
+        <p>{preview.empty_row_count}</p>
+        {column_counts_table}
+        {columns_with_zeros}
+        {charts_html}
+        {PAGE_BREAK}
+    """
+
+
+def generate_preview_report(input_path, seconds=60, rows=100000, method="auto", seed=None, chart_backend="matplotlib",
+                            engine="pandas", profile=False):
+    """
+    Generates a quick PDF preview of one or more dataset files from a sample of their rows,
+    to check whether a new export looks sane without profiling it whole. The report has
+    the cover, summary and per-file sections of `process_and_generate_report`, but every
+    figure computed from the sample is marked as an estimate and shown with its 95%
+    confidence interval.
+
+    The preview is bounded by `seconds` from the call. The time of the charts and the PDF
+    is reserved first: the rest of the budget after `SAMPLING_SHARE` of it, and at least
+    `RENDER_SECONDS` and `RENDER_FILE_SECONDS` per file. Sampling and estimating share out
+    what is left between the files in turn, so time a file does not use goes to the next
+    ones. At most `rows` rows are sampled per file. Files small enough to be read whole
+    within their share are previewed exactly.
+
+    Nothing is written next to the data and no cache or run profile is updated: previews
+    only write `reports/<name>_preview.pdf` and its run metrics.
+
+    Parameters:
+        input_path (str): Path to a CSV, Parquet or Feather file or a directory of them.
+        seconds (float): Time budget of the whole preview.
+        rows (int): Maximum number of rows sampled per file.
+        method (str): "seek" to read blocks of rows at random offsets of uncompressed CSV
+            files, "stream" to keep a uniform sample of the rows read in one pass, or "auto"
+            to seek into CSV files of at least `SEEK_MIN_BYTES` and stream the others.
+        seed (int): Optional seed of the sample, for previews that can be repeated.
+        chart_backend (str): "matplotlib" for static charts that start quickly, or "kaleido".
+        engine (str): CSV reader of streamed files, "pandas" or "pyarrow".
+        profile (bool): Also profile the run with cProfile, saving the stats to `<report>_profile.prof`.
+
+    Returns:
+        str: Path of the PDF preview.
+    """
+    start = time.perf_counter()
+    if seconds <= 0 or rows <= 0:
+        raise ValueError("The time and row budgets of a preview must be positive.")
+    if method not in PREVIEW_METHODS:
+        raise ValueError(f"Unsupported sampling method '{method}', use one of: {', '.join(PREVIEW_METHODS)}.")
+    csv_engine(engine)
+
+    with track_run("generate_preview_report", profile=profile) as run_metrics:
+        data_directory = find_directory("data")
+        reports_folder = os.path.join(os.path.dirname(data_directory), "reports")
+        os.makedirs(reports_folder, exist_ok=True)
+
+        files, report_name = report_inputs(input_path)
+        render_seconds = max(seconds * (1 - SAMPLING_SHARE), RENDER_SECONDS + RENDER_FILE_SECONDS * len(files))
+        if render_seconds >= seconds:
+            raise ValueError(f"A preview of {len(files)} files needs more than {render_seconds:g}s to render, "
+                             f"give it a larger time budget.")
+        rng = np.random.default_rng(seed)
+        sampling_end = start + seconds - render_seconds
+
+        previews = []
+        for number, path in enumerate(files):
+            # The time left is shared between the files left, so what a file does not use goes to the next ones
+            now = time.perf_counter()
+            deadline = now + (sampling_end - now) / (len(files) - number)
+            try:
+                with stage("sample", path) as record:
+                    sample = sample_dataset(path, rows, deadline, rng, method, engine)
+                    record.update(rows=sample.rows_read, bytes_read=sample.bytes_read)
+            except Exception as e:
+                print(f"Error sampling file {path}: {e}")
+                continue
+            with stage("estimate", path, rows=len(sample.frame)):
+                previews.append(PreviewProfile.from_sample(path, sample))
+            print(f"Sampled {len(sample.frame):,} rows of {path} in {sample.seconds:.1f}s")
+
+        renderer = ChartRenderer(chart_backend, cache_dir=os.path.join(reports_folder, ".cache", "charts"))
+        sections_html = "".join(render_preview_section(preview, renderer) for preview in previews)
+        renderer.close()
+
+        summary_html = ""
+        if os.path.isdir(input_path):
+            with stage("summary", rows=len(previews)):
+                summary_html = render_summary_html(previews)
+
+        pdf_path = os.path.join(reports_folder, report_name + "_preview.pdf")
+        with stage("render_pdf", rows=len(previews)) as record:
+            pdf = render_pdf(html_document(
+                generate_cover_page(input_path) + PAGE_BREAK + summary_html + sections_html
+            ))
+            with open(pdf_path, "wb") as pdf_file:
+                pdf_file.write(pdf)
+            record["bytes_written"] = len(pdf)
+
+        run_metrics.save(os.path.splitext(pdf_path)[0])
+
+    elapsed = time.perf_counter() - start
+    if elapsed > seconds:
+        print(f"The preview took {elapsed:.1f}s, over its budget of {seconds:g}s.")
+    print(f"Preview report generated: {pdf_path} ({elapsed:.1f}s)")
+    return pdf_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts preview`
+    main(["preview", *sys.argv[1:]])
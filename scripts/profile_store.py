@@ -0,0 +1,442 @@
+import datetime
+import html
+import os
+import sqlite3
+
+
+STORE_NAME = "profiles.sqlite"
+
+# Saved as the database's user_version, bump when the tables change
+STORE_VERSION = 1
+
+# Runs kept per dataset; the oldest are deleted as new ones are recorded
+KEEP_RUNS = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_dataset ON runs (dataset, id);
+
+CREATE TABLE IF NOT EXISTS files (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    row_count INTEGER NOT NULL,
+    empty_row_count INTEGER NOT NULL,
+    PRIMARY KEY (run_id, file)
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+
+CREATE TABLE IF NOT EXISTS columns (
+    run_id INTEGER NOT NULL,
+    file TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    non_null_count INTEGER NOT NULL,
+    null_count INTEGER NOT NULL,
+    distinct_count INTEGER NOT NULL,
+    has_zeros INTEGER NOT NULL,
+    distinct_exact INTEGER NOT NULL,
+    distinct_error REAL NOT NULL,
+    logical_type TEXT NOT NULL,
+    PRIMARY KEY (run_id, file, position),
+    FOREIGN KEY (run_id, file) REFERENCES files (run_id, file) ON DELETE CASCADE
+);
+"""
+
+COLUMN_FIELDS = ("name", "dtype", "non_null_count", "null_count", "distinct_count", "has_zeros", "distinct_exact",
+                 "distinct_error")
+
+CSS_PATH = os.path.join(os.path.dirname(__file__), "../assets/styles.css")
+
+
+def logical_type(dtype):
+    """
+    Returns the logical type of a pandas dtype name: "integer", "float", "boolean",
+    "date" or "text". Runs are compared on these rather than on dtypes, which also
+    depend on how a file was loaded: downcast integers, categorical text, or chunks
+    typed on their own.
+    """
+    dtype = str(dtype).lower()
+    if dtype in ("bool", "boolean"):
+        return "boolean"
+    if dtype.startswith(("int", "uint")):
+        return "integer"
+    if dtype.startswith("float"):
+        return "float"
+    if dtype.startswith("datetime"):
+        return "date"
+    if dtype in ("object", "category", "str") or dtype.startswith("string"):
+        return "text"
+    return dtype
+
+
+class ProfileStore:
+    """
+    Keeps the profiles of every report run in a SQLite database: one row per run, per
+    file of the run (with the content hash of the file) and per column of each file,
+    holding the statistics of `DatasetProfile`. Runs can then be compared without
+    reading their datasets again, see `diff_runs`.
+
+    Profiles are stored as the dicts of `DatasetProfile.to_dict`, with the `logical_type`
+    of each column, and loaded back as such, so reading the store needs neither pandas
+    nor the datasets.
+    """
+
+    def __init__(self, store_path):
+        self.path = store_path
+        os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(store_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def record_run(self, dataset, input_path, files, keep=KEEP_RUNS):
+        """
+        Saves the profiles of one report run. Every report build records a run, watch
+        rebuilds included, so only the last `keep` runs of each dataset are kept.
+
+        Parameters:
+            dataset (str): Name of the report, usually the name of its file or directory.
+            input_path (str): Path the report was built from.
+            files (list): (path, sha256, profile) of each file, the profile being a
+                `DatasetProfile` or its dict.
+            keep (int): Number of runs of the dataset to keep, None for all of them.
+
+        Returns:
+            int: The id of the run.
+        """
+        created = datetime.datetime.now().isoformat(timespec="seconds")
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO runs (dataset, input_path, created) VALUES (?, ?, ?)",
+                (dataset, os.path.abspath(input_path), created),
+            ).lastrowid
+            for path, sha256, profile in files:
+                if not isinstance(profile, dict):
+                    profile = profile.to_dict()
+                file_name = os.path.basename(path)
+                self.connection.execute(
+                    "INSERT INTO files (run_id, file, path, sha256, row_count, empty_row_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, file_name, os.path.abspath(path), sha256, profile["row_count"],
+                     profile["empty_row_count"]),
+                )
+                self.connection.executemany(
+                    f"INSERT INTO columns (run_id, file, position, {', '.join(COLUMN_FIELDS)}, logical_type) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(COLUMN_FIELDS))}, ?)",
+                    [(run_id, file_name, position, *(column[key] for key in COLUMN_FIELDS),
+                      logical_type(column["dtype"]))
+                     for position, column in enumerate(profile["columns"])],
+                )
+            if keep is not None:
+                # Files and columns of the deleted runs are deleted with them
+                self.connection.execute(
+                    "DELETE FROM runs WHERE dataset = ? AND id NOT IN "
+                    "(SELECT id FROM runs WHERE dataset = ? ORDER BY id DESC LIMIT ?)",
+                    (dataset, dataset, max(keep, 1)),
+                )
+        return run_id
+
+    def runs(self, dataset=None):
+        """
+        Returns the runs of a dataset, or of every dataset, oldest first, as dicts with
+        their id, dataset, input path, creation time and number of files.
+        """
+        query = """
+            SELECT runs.*, COUNT(files.file) AS file_count
+            FROM runs LEFT JOIN files ON files.run_id = runs.id
+            {where}
+            GROUP BY runs.id ORDER BY runs.id
+        """
+        if dataset is None:
+            rows = self.connection.execute(query.format(where=""))
+        else:
+            rows = self.connection.execute(query.format(where="WHERE runs.dataset = ?"), (dataset,))
+        return [dict(row) for row in rows]
+
+    def latest_runs(self, dataset, count=2):
+        """
+        Returns the ids of the last `count` runs of a dataset, oldest first.
+        """
+        rows = self.connection.execute(
+            "SELECT id FROM runs WHERE dataset = ? ORDER BY id DESC LIMIT ?", (dataset, count)
+        )
+        return [row["id"] for row in rows][::-1]
+
+    def load_run(self, run_id):
+        """
+        Returns a stored run: its details under "run" and, under "files", the profile
+        dict of each file by file name, with the file's content hash as "sha256".
+        """
+        run = self.connection.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if run is None:
+            raise ValueError(f"No run {run_id} in the profile store {self.path}.")
+
+        files = {}
+        for row in self.connection.execute("SELECT * FROM files WHERE run_id = ? ORDER BY rowid", (run_id,)):
+            files[row["file"]] = {
+                "path": row["path"],
+                "sha256": row["sha256"],
+                "row_count": row["row_count"],
+                "empty_row_count": row["empty_row_count"],
+                "columns": [],
+            }
+        rows = self.connection.execute(
+            f"SELECT file, {', '.join(COLUMN_FIELDS)}, logical_type FROM columns WHERE run_id = ? "
+            f"ORDER BY file, position",
+            (run_id,),
+        )
+        for row in rows:
+            column = {key: row[key] for key in (*COLUMN_FIELDS, "logical_type")}
+            column["has_zeros"] = bool(column["has_zeros"])
+            column["distinct_exact"] = bool(column["distinct_exact"])
+            files[row["file"]]["columns"].append(column)
+        return {"run": dict(run), "files": files}
+
+    def find_profile(self, sha256):
+        """
+        Returns the latest stored profile of a file with this content hash, or None.
+        """
+        row = self.connection.execute(
+            "SELECT run_id, file FROM files WHERE sha256 = ? ORDER BY run_id DESC LIMIT 1", (sha256,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self.load_run(row["run_id"])["files"][row["file"]]
+
+
+def _diff_file(old, new):
+    old_columns = {column["name"]: column for column in old["columns"]}
+    new_columns = {column["name"]: column for column in new["columns"]}
+    common = [name for name in new_columns if name in old_columns]
+
+    cardinality = []
+    for name in common:
+        before, after = old_columns[name]["distinct_count"], new_columns[name]["distinct_count"]
+        if before != after:
+            cardinality.append({
+                "column": name,
+                "old": before,
+                "new": after,
+                "change": (after - before) / before if before else None,
+                "estimated": not (old_columns[name]["distinct_exact"] and new_columns[name]["distinct_exact"]),
+            })
+    cardinality.sort(key=lambda shift: float("inf") if shift["change"] is None else abs(shift["change"]), reverse=True)
+
+    def all_null(name, columns):
+        return columns[name]["non_null_count"] == 0
+
+    return {
+        "changed": old.get("sha256") is None or old.get("sha256") != new.get("sha256"),
+        "old_rows": old["row_count"],
+        "new_rows": new["row_count"],
+        "added_columns": [name for name in new_columns if name not in old_columns],
+        "removed_columns": [name for name in old_columns if name not in new_columns],
+        "newly_dropped": [name for name in common if all_null(name, new_columns) and not all_null(name, old_columns)],
+        "no_longer_dropped": [name for name in common if all_null(name, old_columns) and not all_null(name, new_columns)],
+        "type_changes": [
+            {"column": name, "old": old_columns[name]["logical_type"], "new": new_columns[name]["logical_type"]}
+            for name in common if old_columns[name]["logical_type"] != new_columns[name]["logical_type"]
+        ],
+        "cardinality": cardinality,
+    }
+
+
+def diff_runs(old_run, new_run):
+    """
+    Compares two stored runs, see `ProfileStore.load_run`. Files are matched by name, so
+    runs over different directories, such as two monthly exports, can be compared.
+
+    Returns:
+        dict: The two runs, the files only in one of them, and for each file in both its
+        row counts, added and removed columns, columns that became or stopped being
+        all-null, logical type changes (see `logical_type`) and distinct count changes,
+        largest relative change first.
+    """
+    old_files, new_files = old_run["files"], new_run["files"]
+    return {
+        "old_run": old_run["run"],
+        "new_run": new_run["run"],
+        "added_files": [name for name in new_files if name not in old_files],
+        "removed_files": [name for name in old_files if name not in new_files],
+        "files": {name: _diff_file(old_files[name], new_files[name]) for name in new_files if name in old_files},
+    }
+
+
+def _names(names):
+    return ", ".join(html.escape(str(name)) for name in names) if names else "None"
+
+
+def _count(value, estimated):
+    return f"~{value}" if estimated else str(value)
+
+
+def render_diff_html(diff):
+    """
+    Generates the HTML content of a diff report from `diff_runs`.
+    """
+    old_run, new_run = diff["old_run"], diff["new_run"]
+    html_content = f"""
+    <h1 class="header">Changes from {html.escape(old_run['dataset'])} to {html.escape(new_run['dataset'])}</h1>
+    <p><strong>Old run:</strong> #{old_run['id']}, {html.escape(old_run['input_path'])}, {old_run['created']}</p>
+    <p><strong>New run:</strong> #{new_run['id']}, {html.escape(new_run['input_path'])}, {new_run['created']}</p>
+    <p><strong>Added files:</strong> {_names(diff['added_files'])}</p>
+    <p><strong>Removed files:</strong> {_names(diff['removed_files'])}</p>
+    <h2 class="sub-header">Files in Both Runs:</h2>
+    <table class="summary-table">
+        <thead>
+            <tr>
+                <th>File</th>
+                <th>Content</th>
+                <th>Old Rows</th>
+                <th>New Rows</th>
+                <th>Row Change</th>
+                <th>Added Columns</th>
+                <th>Removed Columns</th>
+            </tr>
+        </thead>
+        <tbody>
+    """
+    html_content += "".join(
+        f"""
+            <tr>
+                <td>{html.escape(name)}</td>
+                <td>{'changed' if file_diff['changed'] else 'unchanged'}</td>
+                <td>{file_diff['old_rows']}</td>
+                <td>{file_diff['new_rows']}</td>
+                <td>{file_diff['new_rows'] - file_diff['old_rows']:+d}</td>
+                <td>{len(file_diff['added_columns'])}</td>
+                <td>{len(file_diff['removed_columns'])}</td>
+            </tr>
+        """
+        for name, file_diff in diff["files"].items()
+    )
+    html_content += """
+        </tbody>
+    </table>
+    """
+
+    for name, file_diff in diff["files"].items():
+        if not file_diff["changed"]:
+            continue
+        html_content += f"""
+    <h1 class="header">{html.escape(name)}</h1>
+    <p><strong>Rows:</strong> {file_diff['old_rows']} &rarr; {file_diff['new_rows']}</p>
+    <p><strong>Added columns:</strong> {_names(file_diff['added_columns'])}</p>
+    <p><strong>Removed columns:</strong> {_names(file_diff['removed_columns'])}</p>
+    <p><strong>Newly dropped (all null):</strong> {_names(file_diff['newly_dropped'])}</p>
+    <p><strong>No longer dropped:</strong> {_names(file_diff['no_longer_dropped'])}</p>
+    """
+        if file_diff["type_changes"]:
+            type_changes = ", ".join(
+                f"{html.escape(change['column'])} ({change['old']} &rarr; {change['new']})"
+                for change in file_diff["type_changes"]
+            )
+            html_content += f"""
+    <p><strong>Type changes:</strong> {type_changes}</p>
+    """
+        if file_diff["cardinality"]:
+            html_content += """
+    <h2 class="sub-header">Unique Count Changes:</h2>
+    <table class="column-table">
+        <thead>
+            <tr>
+                <th>Column</th>
+                <th>Old Unique Count</th>
+                <th>New Unique Count</th>
+                <th>Change</th>
+            </tr>
+        </thead>
+        <tbody>
+    """
+            html_content += "".join(
+                f"""
+            <tr>
+                <td>{html.escape(shift['column'])}</td>
+                <td>{_count(shift['old'], shift['estimated'])}</td>
+                <td>{_count(shift['new'], shift['estimated'])}</td>
+                <td>{'new values' if shift['change'] is None else f"{shift['change']:+.1%}"}</td>
+            </tr>
+                """
+                for shift in file_diff["cardinality"]
+            )
+            html_content += """
+        </tbody>
+    </table>
+    """
+    return html_content
+
+
+def write_diff_report(store_path, old_run_id=None, new_run_id=None, dataset=None, output_path=None):
+    """
+    Writes an HTML report of the changes between two stored runs, built from the store
+    alone: no dataset is read.
+
+    Parameters:
+        store_path (str): Path to the profile store.
+        old_run_id (int): Run to compare from. Defaults to the second to last run of `dataset`.
+        new_run_id (int): Run to compare to. Defaults to the last run of `dataset`.
+        dataset (str): Dataset whose last two runs are compared when no run ids are given.
+        output_path (str): HTML file to write (default: `<new dataset>_diff_<old>_<new>.html` next to the store).
+
+    Returns:
+        str: Path of the HTML report.
+    """
+    with ProfileStore(store_path) as store:
+        if old_run_id is None or new_run_id is None:
+            if dataset is None:
+                raise ValueError("Give the ids of the two runs to compare, or a dataset to compare its last two runs.")
+            latest = store.latest_runs(dataset)
+            if len(latest) < 2:
+                raise ValueError(f"The profile store has fewer than two runs of '{dataset}'.")
+            old_run_id, new_run_id = latest
+        diff = diff_runs(store.load_run(old_run_id), store.load_run(new_run_id))
+
+    with open(CSS_PATH, "r") as css_file:
+        styles = css_file.read()
+    if output_path is None:
+        output_path = os.path.join(
+            os.path.dirname(os.path.abspath(store_path)),
+            f"{diff['new_run']['dataset']}_diff_{old_run_id}_{new_run_id}.html",
+        )
+    with open(output_path, "w", encoding="utf-8") as html_file:
+        html_file.write(f"""<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <style>{styles}</style>
+    </head>
+    <body>
+        {render_diff_html(diff)}
+    </body>
+</html>
+""")
+    print(f"Diff report generated: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # The `runs` and `diff` commands of `python -m scripts`
+    main(sys.argv[1:])
@@ -0,0 +1,534 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from scripts.datasets import (
+    csv_engine, csv_shard_offsets, dataset_format, iter_dataset_chunks, open_csv_arrow, read_columns, read_dataset,
+    read_view
+)
+from scripts.sketches import DistinctCounter, hash_values
+
+# Rows read per chunk when scanning a CSV file for the summary page
+SUMMARY_CHUNKSIZE = 100000
+
+# Large CSV files are profiled in shards of about this many bytes, at least one per worker
+SHARD_BYTES = 64 << 20
+# Shards are never smaller than this; smaller files are profiled in one process
+MIN_SHARD_BYTES = 1 << 20
+
+# Bytes of exact distinct hashes kept across all the columns of a dataset, see `DatasetAccumulator`
+DISTINCT_BYTES = 64 << 20
+
+
+@dataclass
+class ColumnProfile:
+    """
+    Statistics for one column of a dataset.
+
+    Attributes:
+        name (str): Column name.
+        dtype (str): Pandas dtype of the column as loaded.
+        non_null_count (int): Number of non-null values.
+        null_count (int): Number of null values.
+        distinct_count (int): Number of distinct values, counting null as a value like `unique()` does.
+        has_zeros (bool): Whether a non-numeric column contains the value 0.
+        distinct_exact (bool): False when `distinct_count` is a HyperLogLog estimate.
+        distinct_error (float): Relative standard error of an estimated `distinct_count`.
+    """
+    name: str
+    dtype: str
+    non_null_count: int
+    null_count: int
+    distinct_count: int
+    has_zeros: bool = False
+    distinct_exact: bool = True
+    distinct_error: float = 0.0
+
+    @property
+    def all_null(self):
+        return self.non_null_count == 0
+
+
+class ColumnAccumulator:
+    """
+    Mergeable statistics for one column, updated chunk by chunk. Null and non-null
+    counts are exact; distinct counts are exact up to `distinct_threshold` values and
+    estimated with a HyperLogLog sketch beyond that.
+    """
+
+    def __init__(self, name, distinct_threshold=100000, precision=14):
+        self.name = name
+        self.non_null_count = 0
+        self.null_count = 0
+        self.distinct = DistinctCounter(distinct_threshold, precision)
+        self.dtypes = set()
+        self.has_zeros = False
+
+    def update(self, series):
+        not_null = series.notna()
+        values = series[not_null]
+        self.non_null_count += len(values)
+        self.null_count += len(series) - len(values)
+        self.dtypes.add(str(series.dtype))
+        if len(values):
+            self.distinct.update(hash_values(values))
+            if not pd.api.types.is_numeric_dtype(series):
+                self.has_zeros = self.has_zeros or bool(values.eq(0).any())
+
+    def merge(self, other):
+        self.non_null_count += other.non_null_count
+        self.null_count += other.null_count
+        self.distinct.merge(other.distinct)
+        self.dtypes |= other.dtypes
+        self.has_zeros = self.has_zeros or other.has_zeros
+
+    @property
+    def dtype(self):
+        """
+        The dtype the whole column would have been loaded with: chunks that were all
+        null parse as float64, and a mix of numeric chunks widens to float64.
+        """
+        if len(self.dtypes) == 1:
+            return next(iter(self.dtypes))
+        if all(pd.api.types.is_numeric_dtype(dtype) and dtype != "bool" for dtype in self.dtypes):
+            return "float64"
+        return "object"
+
+    def to_profile(self):
+        dtype = self.dtype
+        distinct_count = self.distinct.count() + (1 if self.null_count else 0)
+        return ColumnProfile(
+            name=self.name,
+            dtype=dtype,
+            non_null_count=self.non_null_count,
+            null_count=self.null_count,
+            distinct_count=distinct_count if self.non_null_count else 1,
+            has_zeros=self.has_zeros and not pd.api.types.is_numeric_dtype(dtype),
+            distinct_exact=self.distinct.is_exact,
+            distinct_error=self.distinct.relative_error,
+        )
+
+
+class DatasetAccumulator:
+    """
+    Mergeable statistics for a whole dataset, built from chunks of rows.
+
+    Distinct values are counted exactly up to `distinct_threshold` per column, lowered
+    on wide datasets so that the exact hashes of all the columns together stay within
+    `DISTINCT_BYTES`. The threshold only depends on the number of columns, so shards of
+    one file switch to estimates at the same counts as a single pass.
+    """
+
+    def __init__(self, path, distinct_threshold=100000, precision=14):
+        self.path = path
+        self.distinct_threshold = distinct_threshold
+        self.precision = precision
+        self.row_count = 0
+        self.empty_row_count = 0
+        self.columns = {}
+
+    def _column_threshold(self, column_count):
+        return min(self.distinct_threshold, DISTINCT_BYTES // (8 * max(column_count, 1)))
+
+    def update(self, chunk):
+        self.row_count += len(chunk)
+        self.empty_row_count += int((~chunk.notna().any(axis=1)).sum())
+        threshold = self._column_threshold(len(set(self.columns) | set(chunk.columns)))
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnAccumulator(col, threshold, self.precision)
+            self.columns[col].update(chunk[col])
+
+    def add_null_column(self, name):
+        """
+        Adds a column first found after some rows were counted, null in all of them as
+        it would be in the earlier chunks of a CSV file.
+        """
+        accumulator = ColumnAccumulator(name, self._column_threshold(len(self.columns) + 1), self.precision)
+        accumulator.update(pd.Series(np.nan, index=pd.RangeIndex(self.row_count)))
+        self.columns[name] = accumulator
+
+    def merge(self, other):
+        self.row_count += other.row_count
+        self.empty_row_count += other.empty_row_count
+        for col, accumulator in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(accumulator)
+            else:
+                self.columns[col] = accumulator
+
+    def to_profile(self):
+        return DatasetProfile(
+            path=self.path,
+            row_count=self.row_count,
+            empty_row_count=self.empty_row_count,
+            columns=[accumulator.to_profile() for accumulator in self.columns.values()],
+        )
+
+
+class _ByteRange(io.RawIOBase):
+    # Bytes `start` to `end` of a file, read as they are needed
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._left)
+        if size <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._left -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _profile_shard(path, names, start, end, chunksize, distinct_threshold, precision):
+    # Runs in a pool worker: parses one byte range of a CSV file as it is read, the first with the header
+    accumulator = DatasetAccumulator(path, distinct_threshold, precision)
+    with io.BufferedReader(_ByteRange(path, start, end)) as data:
+        for chunk in pd.read_csv(data, header=0 if start == 0 else None, names=names, index_col=0,
+                                 chunksize=chunksize):
+            accumulator.update(chunk)
+    return accumulator
+
+
+def accumulate_csv_shards(path, chunksize, workers, distinct_threshold=100000, precision=14):
+    """
+    Profiles a CSV file map-reduce style: the file is split into byte ranges starting on
+    rows, see `csv_shard_offsets`, each shard is read `chunksize` rows at a time in a
+    separate process and the partial statistics are merged in file order. Only a few lines
+    are read around each split point before the workers start, so the whole file is parsed
+    once, in parallel.
+
+    A shard that does not end on a row fails to parse, ending inside a quoted value, and
+    the first shard starts at the header, so a wrong split point is never merged. Row, null
+    and empty-row counts are those of a single pass. pandas types each chunk on its own and
+    shards start new chunks, so, as between two chunk sizes, a column mixing numbers and
+    text may get another dtype and distinct count. Shards are parsed with pandas whatever
+    the engine.
+
+    Parameters:
+        path (str): Path to the CSV file.
+        chunksize (int): Number of rows read per chunk.
+        workers (int): Number of processes.
+        distinct_threshold (int): Distinct values counted exactly before switching to an estimate.
+        precision (int): HyperLogLog precision.
+
+    Returns:
+        DatasetAccumulator or None: The merged statistics, or None when the file is too
+        small to split or could not be split on its rows.
+    """
+    size = os.path.getsize(path)
+    shard_count = min(max(workers, -(-size // SHARD_BYTES)), size // MIN_SHARD_BYTES)
+    starts = csv_shard_offsets(path, shard_count) if shard_count > 1 else None
+    if starts is None or len(starts) < 2:
+        return None
+    ends = starts[1:] + [size]
+    shard_count = len(starts)
+
+    names = read_columns(path)
+    accumulator = DatasetAccumulator(path, distinct_threshold, precision)
+    with ProcessPoolExecutor(max_workers=min(workers, shard_count)) as executor:
+        partials = executor.map(
+            _profile_shard, [path] * shard_count, [names] * shard_count, starts, ends,
+            [chunksize] * shard_count, [distinct_threshold] * shard_count, [precision] * shard_count,
+        )
+        try:
+            for partial in partials:
+                accumulator.merge(partial)
+        except ValueError as e:
+            # Most likely quotes inside unquoted values, see `csv_shard_offsets`
+            print(f"Could not split {path} into shards, profiling it in one process: {e}")
+            executor.shutdown(cancel_futures=True)
+            return None
+    return accumulator
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Statistics for one file, computed in a single vectorized pass over its DataFrame or,
+    for files larger than memory, accumulated chunk by chunk. Both the summary table and
+    the per-file report sections are rendered from it.
+
+    Attributes:
+        path (str): Path of the profiled file.
+        row_count (int): Number of rows.
+        empty_row_count (int): Number of rows in which every value is null.
+        columns (list): One `ColumnProfile` per column, in file order.
+    """
+    path: str
+    row_count: int
+    empty_row_count: int
+    columns: list = field(default_factory=list)
+
+    @classmethod
+    def from_dataframe(cls, df, path):
+        """
+        Profiles a loaded dataset.
+
+        Parameters:
+            df (DataFrame): The dataset, before any columns are dropped.
+            path (str): Path of the file the dataset was loaded from.
+
+        Returns:
+            DatasetProfile: The profile of the dataset.
+        """
+        not_null = df.notna()
+        non_null_counts = not_null.sum()
+        empty_row_count = int((~not_null.any(axis=1)).sum())
+
+        # Distinct counts and zero checks only matter for columns that are kept
+        current = non_null_counts.index[non_null_counts > 0]
+        distinct_counts = df[current].nunique(dropna=False)
+        non_numeric = [col for col in current if not pd.api.types.is_numeric_dtype(df[col])]
+        has_zeros = df[non_numeric].eq(0).any() if non_numeric else pd.Series(dtype=bool)
+
+        row_count = int(df.shape[0])
+        columns = []
+        for col in df.columns:
+            non_null_count = int(non_null_counts[col])
+            columns.append(ColumnProfile(
+                name=col,
+                dtype=str(df[col].dtype),
+                non_null_count=non_null_count,
+                null_count=row_count - non_null_count,
+                distinct_count=int(distinct_counts[col]) if non_null_count else 1,
+                has_zeros=bool(has_zeros.get(col, False)),
+            ))
+
+        return cls(path=path, row_count=row_count, empty_row_count=empty_row_count, columns=columns)
+
+    @classmethod
+    def from_chunks(cls, path, chunksize, distinct_threshold=100000, precision=14, engine="pandas", workers=1):
+        """
+        Profiles a CSV, Parquet or Feather file out of core, reading `chunksize` rows at a
+        time so memory is bounded by the chunk size rather than the file size.
+
+        With `workers` > 1, a CSV file is split into shards profiled in separate processes
+        and merged, see `accumulate_csv_shards`. The counts are the same as in one process.
+
+        Parameters:
+            path (str): Path to the dataset file.
+            chunksize (int): Number of rows read per chunk.
+            distinct_threshold (int): Distinct values counted exactly before switching to an estimate.
+            precision (int): HyperLogLog precision; the relative error is about 1.04 / sqrt(2**precision).
+            engine (str): CSV reader, "pandas" or "pyarrow", see `iter_dataset_chunks`.
+            workers (int): Number of processes profiling shards of a CSV file. 0 uses every core.
+
+        Returns:
+            DatasetProfile: The profile of the file.
+        """
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        if workers > 1 and path.lower().endswith(".csv"):
+            accumulator = accumulate_csv_shards(path, chunksize, workers, distinct_threshold, precision)
+            if accumulator is not None:
+                return accumulator.to_profile()
+
+        accumulator = DatasetAccumulator(path, distinct_threshold, precision)
+        for chunk in iter_dataset_chunks(path, chunksize, index_col=0, engine=engine):
+            accumulator.update(chunk)
+        return accumulator.to_profile()
+
+    @classmethod
+    def from_dict(cls, data):
+        columns = [ColumnProfile(**column) for column in data["columns"]]
+        return cls(**{**data, "columns": columns})
+
+    def to_dict(self):
+        return asdict(self)
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def dropped_columns(self):
+        """Columns in which every value is null."""
+        return [column.name for column in self.columns if column.all_null]
+
+    @property
+    def current_columns(self):
+        """Columns kept after dropping the all-null ones."""
+        return [column for column in self.columns if not column.all_null]
+
+    @property
+    def estimated_columns(self):
+        """Kept columns whose distinct count is an estimate."""
+        return [column for column in self.current_columns if not column.distinct_exact]
+
+    def summary(self):
+        """
+        Returns the statistics shown for this file in the summary page.
+        """
+        return {
+            "File": self.file_name,
+            "Total Columns": len(self.columns),
+            "Dropped Columns": len(self.dropped_columns),
+            "Rows": self.row_count,
+            "Columns": self.column_names,
+        }
+
+
+def _all_null_positions(chunk, positions):
+    # Positions, among `positions`, of the columns of `chunk` without any value
+    has_values = chunk.notna().any(axis=0).to_numpy()
+    return {position for position, found in zip(positions, has_values) if not found}
+
+
+def _scan_csv_arrow(path, names, usecols):
+    import pyarrow as pa
+    empty = set(usecols) - {0}
+    row_count = 0
+    try:
+        for batch in open_csv_arrow(path, columns=[names[position] for position in usecols]):
+            row_count += batch.num_rows
+            empty = {position for position in empty if batch.column(names[position]).null_count == batch.num_rows}
+    except pa.ArrowInvalid:
+        return None
+    return row_count, empty
+
+
+def _scan_csv(path, names, chunksize, engine="pandas"):
+    positions = list(range(len(names)))
+    if csv_engine(engine) == "pyarrow":
+        # Arrow counts the nulls of every column without converting any value to Python
+        scanned = _scan_csv_arrow(path, names, positions)
+        if scanned is not None:
+            return scanned
+
+    # The first rows usually show which columns hold values. Only the columns still
+    # empty after them, and the index column to count rows, are read from the rest.
+    first = pd.read_csv(path, nrows=chunksize, dtype=object)
+    row_count = len(first)
+    empty = _all_null_positions(first, positions) - {0}
+    if row_count < chunksize:
+        return row_count, empty
+
+    usecols = sorted(empty | {0})
+    row_count = 0
+    chunks = pd.read_csv(path, usecols=usecols, chunksize=chunksize, dtype=object)
+    for chunk in chunks:
+        row_count += len(chunk)
+        if empty:
+            empty &= _all_null_positions(chunk, usecols)
+    return row_count, empty
+
+
+def _scan_columnar(path, columns):
+    # Row counts come from the file metadata, and Parquet statistics show most columns
+    # holding values without reading them. Float statistics are not trusted, as NaN
+    # counts as a value there but as null in pandas.
+    if dataset_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        import pyarrow.types as pa_types
+        metadata = pq.ParquetFile(path).metadata
+        row_count = metadata.num_rows
+        schema = metadata.schema.to_arrow_schema()
+        has_values = set()
+        for group in range(metadata.num_row_groups):
+            row_group = metadata.row_group(group)
+            for number in range(row_group.num_columns):
+                column = row_group.column(number)
+                statistics = column.statistics
+                if (statistics is not None and statistics.has_null_count
+                        and statistics.null_count < column.num_values
+                        and not pa_types.is_floating(schema.field(number).type)):
+                    has_values.add(column.path_in_schema)
+        candidates = [col for col in columns if col not in has_values]
+        df = read_dataset(path, columns=candidates)
+    else:
+        df = read_dataset(path)
+        row_count = len(df)
+        df = df.iloc[:, 1:]
+    empty = set(df.columns[~df.notna().any(axis=0)])
+    return row_count, {position for position, col in enumerate(columns, start=1) if col in empty}
+
+
+@dataclass
+class FileSummary:
+    """
+    The statistics of one file shown in the summary page, without the per-column
+    profiles of the report sections. As with `DatasetProfile`, the first column is the
+    index and is not counted.
+
+    Attributes:
+        path (str): Path of the file.
+        row_count (int): Number of rows.
+        columns (list): Column names, in file order.
+        dropped_columns (list): Columns in which every value is null.
+    """
+    path: str
+    row_count: int
+    columns: list = field(default_factory=list)
+    dropped_columns: list = field(default_factory=list)
+
+    @classmethod
+    def from_file(cls, path, chunksize=SUMMARY_CHUNKSIZE, engine="pandas"):
+        """
+        Summarizes a CSV, Parquet or Feather file while reading as little of it as
+        possible. Column names come from the header. CSV files are then streamed for the
+        row count, reading every column only for the first `chunksize` rows and after
+        that only the columns that have not shown a value yet; columnar files answer
+        from their metadata and read only the columns it leaves open. Column views answer
+        from the row count they recorded.
+
+        Parameters:
+            path (str): Path to the dataset file.
+            chunksize (int): Number of CSV rows read per chunk.
+            engine (str): CSV reader, "pandas" or "pyarrow". Arrow reads every column in
+                one multi-threaded pass but only counts nulls, never converting values.
+
+        Returns:
+            FileSummary: The summary of the file.
+        """
+        fmt = dataset_format(path)
+        if fmt == "view":
+            # The reports' views keep only the columns of their dataset that hold values
+            view = read_view(path)
+            if view["row_count"] is not None:
+                return cls(path=path, row_count=view["row_count"], columns=view["columns"][1:])
+        names = read_columns(path)
+        columns = names[1:]
+        if fmt == "view":
+            chunks = iter_dataset_chunks(path, chunksize, columns=names[:1], engine=engine)
+            row_count = sum(len(chunk) for chunk in chunks)
+            empty = set()
+        elif fmt == "csv":
+            row_count, empty = _scan_csv(path, names, chunksize, engine)
+        else:
+            row_count, empty = _scan_columnar(path, columns)
+        dropped_columns = [col for position, col in enumerate(columns, start=1) if position in empty]
+        return cls(path=path, row_count=int(row_count), columns=columns, dropped_columns=dropped_columns)
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    def summary(self):
+        """
+        Returns the statistics shown for this file in the summary page, as `DatasetProfile.summary` does.
+        """
+        return {
+            "File": self.file_name,
+            "Total Columns": len(self.columns),
+            "Dropped Columns": len(self.dropped_columns),
+            "Rows": self.row_count,
+            "Columns": self.columns,
+        }
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from scripts.cache import hash_file
+from scripts.datasets import dataset_format, iter_dataset_chunks, read_dataset, resolve_view
+
+# Bump when the meaning of the column kinds changes, so saved schemas are ignored
+SCHEMA_VERSION = 1
+
+# Only zero-padded ISO dates are parsed: valid ones are written back exactly as they were read
+DATE_FORMAT = "%Y-%m-%d"
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_RATIO = 0.5
+CATEGORY_SAMPLE = 10000
+
+# Whole numbers up to this magnitude are exact in float32
+FLOAT32_INTEGER_LIMIT = 2 ** 24
+
+# CSV files are read this many rows at a time and each chunk is compacted before the
+# next one is read, so the whole file is never held as Python strings at once
+LOAD_CHUNKSIZE = 20000
+
+
+def _to_integer(series):
+    if not pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return None
+    return pd.to_numeric(series, downcast="integer")
+
+
+def _to_float32(series):
+    # Only whole numbers (integer columns with nulls), which print the same in float32
+    if not pd.api.types.is_float_dtype(series):
+        return None
+    values = series.to_numpy()
+    values = values[~np.isnan(values)]
+    if len(values) and (np.abs(values).max() >= FLOAT32_INTEGER_LIMIT or not np.all(values == np.floor(values))):
+        return None
+    return series.astype("float32")
+
+
+def _to_date(series):
+    if series.dtype != object:
+        return None
+    # Parse each distinct value once
+    codes, unique_values = pd.factorize(series)
+    if not len(unique_values) or not isinstance(unique_values[0], str) or not re.fullmatch(DATE_PATTERN, unique_values[0]):
+        return None
+    dates = pd.to_datetime(unique_values, format=DATE_FORMAT, errors="coerce")
+    # Reject values that parse but would be written back differently
+    if dates.isna().any() or not (np.datetime_as_string(dates.to_numpy(), unit="D") == unique_values).all():
+        return None
+    values = np.append(dates.to_numpy(), np.datetime64("NaT", "ns"))[codes]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _to_category(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    if series.dtype != object:
+        return None
+    values = series.dropna()
+    if not len(values):
+        return None
+    # Free text is usually obvious from the first rows
+    head = values.iloc[:CATEGORY_SAMPLE]
+    if head.nunique() > CATEGORY_RATIO * len(head):
+        return None
+    if values.nunique() > CATEGORY_RATIO * len(values) or pd.api.types.infer_dtype(values, skipna=False) != "string":
+        return None
+    return series.astype("category")
+
+
+CONVERTERS = {"integer": _to_integer, "float32": _to_float32, "date": _to_date, "category": _to_category}
+
+
+def compact_column(series, kind=None, parse_dates=True):
+    """
+    Converts a column to the most compact dtype that keeps its values as they are
+    displayed and written: integers are downcast, whole-number floats become float32,
+    ISO date strings become datetimes and repetitive text becomes a categorical.
+
+    Parameters:
+        series (Series): The column as loaded.
+        kind (str): Optional conversion found on an earlier run, tried first.
+        parse_dates (bool): Whether text columns may be converted to datetimes.
+
+    Returns:
+        tuple: The converted column and the kind of conversion applied, "keep" if none.
+    """
+    kinds = [kind] if kind in CONVERTERS else []
+    if kind != "keep":
+        kinds += [name for name in CONVERTERS if name != kind]
+    for name in kinds:
+        if name == "date" and not parse_dates:
+            continue
+        converted = CONVERTERS[name](series)
+        if converted is not None:
+            return converted, name
+    return series, "keep"
+
+
+def compact_frame(df, schema=None, parse_dates=True):
+    """
+    Converts every column of a DataFrame with `compact_column`, in place.
+
+    Parameters:
+        df (DataFrame): The loaded dataset.
+        schema (dict): Optional column kinds from an earlier run.
+        parse_dates (bool): Whether text columns may be converted to datetimes.
+
+    Returns:
+        dict: The kind of conversion applied to each column.
+    """
+    schema = schema or {}
+    kinds = {}
+    for col in df.columns:
+        df[col], kinds[col] = compact_column(df[col], schema.get(col), parse_dates)
+    return kinds
+
+
+def _family(piece):
+    if not piece.notna().any():
+        return "null"
+    if pd.api.types.is_bool_dtype(piece):
+        return "bool"
+    return "number" if pd.api.types.is_numeric_dtype(piece) else "text"
+
+
+def _text_kind(piece, hint, parse_dates):
+    # The first chunk with values decides how a text column is stored
+    if hint in ("category", "keep") or hint == "date" and parse_dates:
+        return hint
+    if parse_dates and _to_date(piece) is not None:
+        return "date"
+    return "category" if _to_category(piece) is not None else "keep"
+
+
+def _convert_text(piece, kind):
+    if kind == "date":
+        return _to_date(piece) if _family(piece) == "text" else pd.to_datetime(piece)
+    if kind == "category":
+        if _family(piece) == "null":
+            empty = pd.Categorical.from_codes(np.full(len(piece), -1), categories=pd.Index([], dtype=object))
+            return pd.Series(empty, index=piece.index, name=piece.name)
+        return piece.astype("category")
+    return piece.astype(object)
+
+
+def _concat(pieces):
+    if isinstance(pieces[0].dtype, pd.CategoricalDtype):
+        return pd.Series(union_categoricals(pieces, ignore_order=True), name=pieces[0].name)
+    return pd.concat(pieces, ignore_index=True)
+
+
+def read_csv_compact(path, columns=None, index_col=None, schema=None, parse_dates=True, chunksize=LOAD_CHUNKSIZE,
+                     engine="pandas"):
+    """
+    Reads a CSV file chunk by chunk, compacting text columns as it goes.
+
+    A CSV read in chunks may type a column differently in each chunk, for instance as
+    numbers in one and as text in another, where a single read would make all of it
+    text. Numeric chunks are combined and compacted at the end; when text and numbers
+    meet in one column, or a chunk does not fit the dtype chosen for its column, None is
+    returned and the caller reads the file in one go instead.
+
+    Parameters:
+        path (str): Path to the CSV file.
+        columns (list): Optional columns to read. Cannot be combined with `index_col`.
+        index_col (int): Optional position of the column to use as the index.
+        schema (dict): Optional column kinds from an earlier run.
+        parse_dates (bool): Whether text columns may be converted to datetimes.
+        chunksize (int): Number of rows read per chunk.
+        engine (str): CSV reader, "pandas" or "pyarrow", see `iter_dataset_chunks`.
+
+    Returns:
+        tuple or None: The dataset and the kind of conversion applied to each column.
+    """
+    schema = schema or {}
+    pieces = {}
+    text_kinds = {}
+    families = {}
+    index = []
+    chunks = iter_dataset_chunks(
+        path, chunksize, columns=columns, index_col=index_col, engine=engine, **_category_dtypes(schema, columns)
+    )
+    for chunk in chunks:
+        index.append(chunk.index)
+        for col in chunk.columns:
+            piece = chunk[col]
+            family = _family(piece)
+            if family != "null":
+                if families.setdefault(col, family) != family and {family, families[col]} != {"number"}:
+                    return None
+            if family == "text" and col not in text_kinds:
+                text_kinds[col] = _text_kind(piece, schema.get(col), parse_dates)
+                # Earlier chunks of the column were empty
+                pieces[col] = [_convert_text(earlier, text_kinds[col]) for earlier in pieces.get(col, [])]
+            if col in text_kinds:
+                piece = _convert_text(piece, text_kinds[col])
+                if piece is None:
+                    return None
+            pieces.setdefault(col, []).append(piece)
+
+    if not index:
+        return None
+
+    kinds = {}
+    data = {}
+    for col, col_pieces in pieces.items():
+        series = _concat(col_pieces)
+        if col in text_kinds:
+            kinds[col] = text_kinds[col]
+        else:
+            series, kinds[col] = compact_column(series, schema.get(col), parse_dates)
+        data[col] = series.array
+        pieces[col] = None
+    if index_col is None:
+        index = pd.RangeIndex(sum(len(chunk_index) for chunk_index in index))
+    else:
+        index = index[0].append(index[1:])
+    # Without consolidating the columns into blocks, which would copy them all
+    return pd.DataFrame(data, index=index, copy=False), kinds
+
+
+def _category_dtypes(schema, columns):
+    dtype = {col: "category" for col, kind in schema.items() if kind == "category" and (not columns or col in columns)}
+    return {"dtype": dtype} if dtype else {}
+
+
+def schema_path(schema_dir, path):
+    """
+    Returns the file holding the saved schema of a dataset, named after the dataset and
+    a hash of its absolute path.
+    """
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(schema_dir, f"{base_name}_{digest}.json")
+
+
+def _same_content(path, data):
+    # As in `Manifest.lookup`, the content is only hashed when the size matches but the mtime does not
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != data.get("size"):
+        return False
+    return stat.st_mtime_ns == data.get("mtime_ns") or hash_file(path) == data.get("sha256")
+
+
+def load_schema(schema_dir, path):
+    """
+    Returns the column kinds saved for a dataset, or an empty dict when none were saved
+    or the dataset's content changed since. A categorical kind forced on new content
+    could otherwise merge values that no longer repeat, or hide new ones.
+    """
+    try:
+        with open(schema_path(schema_dir, path), "r") as schema_file:
+            data = json.load(schema_file)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != SCHEMA_VERSION or not _same_content(path, data):
+        return {}
+    return data.get("columns", {})
+
+
+def save_schema(schema_dir, path, columns):
+    os.makedirs(schema_dir, exist_ok=True)
+    file_path = schema_path(schema_dir, path)
+    tmp_path = f"{file_path}.tmp"
+    stat = os.stat(path)
+    data = {
+        "version": SCHEMA_VERSION,
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(path),
+        "columns": columns,
+    }
+    with open(tmp_path, "w") as schema_file:
+        json.dump(data, schema_file, indent=2)
+    os.replace(tmp_path, file_path)
+
+
+def load_dataset(path, columns=None, index_col=None, schema_dir=None, parse_dates=True, engine="pandas"):
+    """
+    Loads a dataset with compact dtypes, see `compact_column`. This is how the reports
+    load whole files; wide CollectiveAccess exports take several times less memory than
+    with every text column left as Python strings, and scans over them are faster.
+
+    CSV files are read in chunks of `LOAD_CHUNKSIZE` rows, see `read_csv_compact`, so
+    peak memory stays close to the size of the compacted frame.
+
+    With `schema_dir`, the dtypes inferred for the file are saved there and reused on
+    later runs: categorical columns are then parsed as categoricals straight from the
+    CSV, and columns that did not compact are not inferred again. A saved kind that no
+    longer fits the data is inferred afresh, and the whole schema is ignored once the
+    content of the file changes.
+
+    Parameters:
+        path (str): Path to the CSV, Parquet or Feather file, or to a column view of one.
+        columns (list): Optional columns to read. Cannot be combined with `index_col`.
+        index_col (int): Optional position of the column to use as the index.
+        schema_dir (str): Optional directory for the saved schemas.
+        parse_dates (bool): Convert ISO date columns to datetimes. Reports listing the
+            values themselves leave them as text.
+        engine (str): CSV reader, "pandas" or "pyarrow" for Arrow's multi-threaded reader.
+
+    Returns:
+        DataFrame: The dataset.
+    """
+    # Column views are loaded as the projection of their dataset
+    path, columns = resolve_view(path, columns)
+    schema = load_schema(schema_dir, path) if schema_dir else {}
+
+    loaded = None
+    if dataset_format(path) == "csv":
+        loaded = read_csv_compact(path, columns, index_col, schema, parse_dates, engine=engine)
+    if loaded is not None:
+        df, kinds = loaded
+    else:
+        df = read_dataset(path, columns=columns, index_col=index_col, engine=engine, **_category_dtypes(schema, columns))
+        kinds = compact_frame(df, schema, parse_dates)
+    if schema_dir:
+        if not parse_dates:
+            # Date columns were left as text on purpose
+            kinds = {col: kind for col, kind in kinds.items() if schema.get(col) != "date"}
+        if any(schema.get(col) != kind for col, kind in kinds.items()):
+            save_schema(schema_dir, path, {**schema, **kinds})
+    return df
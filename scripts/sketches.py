@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def hash_values(values):
+    """
+    Hashes non-null values to 64-bit integers so they can be counted without being kept.
+
+    Numeric values are hashed as float64, so the same number hashes the same whether a
+    chunk was parsed as integers or, because it held nulls, as floats.
+
+    Parameters:
+        values (Series): Non-null values of one column.
+
+    Returns:
+        ndarray: uint64 hash of each value.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        array = values.to_numpy(dtype=np.float64)
+    else:
+        array = values.to_numpy(dtype=object)
+    return pd.util.hash_array(array)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch estimating the number of distinct 64-bit hashes it has seen in
+    2**precision bytes, with a relative standard error of about 1.04 / sqrt(2**precision).
+    Sketches with the same precision can be merged.
+    """
+
+    def __init__(self, precision=14):
+        if not 11 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 11 and 18.")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, hashes):
+        """
+        Adds an array of uint64 hashes to the sketch.
+        """
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+
+        # Rank is the position of the leftmost 1 bit in the remaining bits. They fit in
+        # 53 bits, so float64 holds them exactly and frexp gives their bit length.
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (width + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precisions.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        # Small range correction
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class DistinctCounter:
+    """
+    Counts distinct values exactly until `threshold` of them have been seen, then
+    switches to a HyperLogLog sketch so memory stays bounded on high-cardinality columns.
+    The exact phase keeps the hashes seen as a sorted uint64 array, 8 bytes per value.
+    """
+
+    def __init__(self, threshold=100000, precision=14):
+        self.threshold = threshold
+        self.precision = precision
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.sketch = None
+
+    @property
+    def is_exact(self):
+        return self.sketch is None
+
+    @property
+    def relative_error(self):
+        return 0.0 if self.is_exact else self.sketch.relative_error
+
+    def _switch_to_sketch(self):
+        self.sketch = HyperLogLog(self.precision)
+        self.sketch.update(self.hashes)
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, hashes):
+        """
+        Adds an array of uint64 hashes, see `hash_values`.
+        """
+        if self.is_exact:
+            self.hashes = np.union1d(self.hashes, np.asarray(hashes, dtype=np.uint64))
+            if len(self.hashes) > self.threshold:
+                self._switch_to_sketch()
+        else:
+            self.sketch.update(hashes)
+
+    def merge(self, other):
+        if self.is_exact and other.is_exact:
+            self.hashes = np.union1d(self.hashes, other.hashes)
+            if len(self.hashes) > self.threshold:
+                self._switch_to_sketch()
+            return
+        if self.is_exact:
+            self._switch_to_sketch()
+        if other.is_exact:
+            self.sketch.update(other.hashes)
+        else:
+            self.sketch.merge(other.sketch)
+
+    def count(self):
+        return len(self.hashes) if self.is_exact else self.sketch.estimate()
@@ -0,0 +1,192 @@
+import os
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+# Control characters that turn up in real exports and that the converters filter out
+GREMLIN_CHARS = ["\x0b", "\x0c", "\x1a", "\x1f", "\x7f", "\x95"]
+
+MATERIALS = ["wood", "bronze", "paper", "silk", "glass", "clay", "oil on canvas", "silver", "ivory", "stone"]
+
+
+@dataclass
+class DatasetSpec:
+    """
+    Shape of a synthetic dataset. The same spec and seed always produce the same data.
+
+    Attributes:
+        rows (int): Number of records.
+        columns (int): Number of fields per record, including the identifier columns.
+        null_density (float): Share of values left empty, between 0 and 1.
+        cardinality (int): Number of distinct values in each categorical text column.
+        gremlin_rate (float): Share of text values containing a control character.
+        seed (int): Seed of the random generator.
+    """
+    rows: int = 1000
+    columns: int = 20
+    null_density: float = 0.2
+    cardinality: int = 100
+    gremlin_rate: float = 0.0
+    seed: int = 0
+
+
+def generate_frame(spec):
+    """
+    Builds a CollectiveAccess-style table of objects: an id and idno, then a rotation
+    of categorical text, free text, integer, decimal and date fields, with nulls
+    spread at random.
+
+    Parameters:
+        spec (DatasetSpec): Shape of the dataset.
+
+    Returns:
+        DataFrame: The synthetic records, every value as text.
+    """
+    rng = np.random.default_rng(spec.seed)
+    data = {
+        "object_id": np.arange(1, spec.rows + 1).astype(str),
+        "idno": np.char.add("2024.", np.arange(1, spec.rows + 1).astype(str)),
+    }
+    vocabulary = np.array([f"{MATERIALS[i % len(MATERIALS)]} {i}" for i in range(spec.cardinality)], dtype=object)
+
+    for index in range(max(spec.columns - len(data), 0)):
+        kind = index % 5
+        if kind == 0:
+            values = vocabulary[rng.integers(0, spec.cardinality, spec.rows)]
+            name = f"material_{index}"
+        elif kind == 1:
+            words = vocabulary[rng.integers(0, spec.cardinality, (spec.rows, 4))]
+            values = np.array([" ".join(row) for row in words], dtype=object)
+            name = f"description_{index}"
+        elif kind == 2:
+            values = rng.integers(0, 10000, spec.rows).astype(str)
+            name = f"count_{index}"
+        elif kind == 3:
+            values = np.round(rng.uniform(0, 500, spec.rows), 2).astype(str)
+            name = f"dimension_{index}"
+        else:
+            days = rng.integers(0, 365 * 200, spec.rows)
+            values = (np.datetime64("1850-01-01") + days).astype(str)
+            name = f"date_{index}"
+        data[name] = values.astype(object)
+
+    df = pd.DataFrame(data)
+
+    # Keep the identifiers complete, empty the other fields at random
+    value_columns = df.columns[2:]
+    if len(value_columns) and spec.null_density:
+        mask = rng.random((spec.rows, len(value_columns))) < spec.null_density
+        df[value_columns] = df[value_columns].mask(mask)
+
+    if spec.gremlin_rate:
+        for col in value_columns[::5]:
+            hit = df[col].notna() & (rng.random(spec.rows) < spec.gremlin_rate)
+            gremlins = np.array(GREMLIN_CHARS, dtype=object)[rng.integers(0, len(GREMLIN_CHARS), int(hit.sum()))]
+            df.loc[hit, col] = df.loc[hit, col] + gremlins
+
+    return df
+
+
+def write_xml(df, path, chunk_size=10000):
+    """
+    Writes records as a CollectiveAccess XML export: one element per record under the
+    root, one child per non-empty field. Like real exports, the first record and the
+    first field of each record are bookkeeping that the converter drops.
+    """
+    with open(path, "w", encoding="utf-8") as xml_file:
+        xml_file.write('<?xml version="1.0" encoding="utf-8"?>\n<export>\n')
+        xml_file.write(' <record><export_id>0</export_id><exported>synthetic</exported></record>\n')
+        columns = list(df.columns)
+        for start in range(0, len(df), chunk_size):
+            lines = []
+            for row in df.iloc[start:start + chunk_size].itertuples(index=False):
+                fields = "".join(
+                    f"<{col}>{escape(value)}</{col}>" for col, value in zip(columns, row) if isinstance(value, str)
+                )
+                lines.append(f" <record><export_id>{start + len(lines) + 1}</export_id>{fields}</record>\n")
+            xml_file.write("".join(lines))
+        xml_file.write("</export>\n")
+
+
+def write_excel(df, path):
+    """
+    Writes records to an .xlsx workbook with openpyxl in write-only mode, or to an .xls
+    workbook when xlwt is installed. Numeric fields are written as numbers. Excel cannot
+    store control characters, so gremlins are left out.
+    """
+    typed = df.copy()
+    gremlins = str.maketrans(dict.fromkeys(GREMLIN_CHARS))
+    for col in df.columns:
+        numbers = pd.to_numeric(df[col], errors="coerce")
+        if numbers.notna().sum() == df[col].notna().sum():
+            typed[col] = numbers
+        else:
+            typed[col] = df[col].str.translate(gremlins)
+    rows = typed.astype(object).where(typed.notna(), None).itertuples(index=False)
+
+    if path.endswith(".xls"):
+        try:
+            import xlwt
+        except ImportError:
+            raise ImportError("Writing .xls files requires xlwt: pip install xlwt")
+        if len(df) >= 65536:
+            raise ValueError(".xls sheets hold at most 65535 rows, use .xlsx instead.")
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Objects")
+        for col_index, col in enumerate(df.columns):
+            sheet.write(0, col_index, col)
+        for row_index, row in enumerate(rows, start=1):
+            for col_index, value in enumerate(row):
+                if value is not None:
+                    sheet.write(row_index, col_index, value)
+        workbook.save(path)
+        return
+
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Objects")
+    sheet.append(list(df.columns))
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def write_csv(df, path):
+    """
+    Writes records to CSV the way the converters do, without an index.
+    """
+    df.to_csv(path, index=False)
+
+
+WRITERS = {"xml": write_xml, "xlsx": write_excel, "xls": write_excel, "csv": write_csv}
+
+
+def generate_dataset(directory, spec, formats=("xml", "xlsx", "csv"), name="objects"):
+    """
+    Writes one synthetic dataset in each of the given formats.
+
+    Parameters:
+        directory (str): Directory to write into, created if needed. Each format goes to
+            its own subdirectory, so every directory holds files of a single type.
+        spec (DatasetSpec): Shape of the dataset.
+        formats (tuple): Any of "xml", "xlsx", "xls" and "csv".
+        name (str): Base name of the files.
+
+    Returns:
+        dict: Path of the file written for each format.
+    """
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown synthetic formats: {', '.join(unknown)}")
+
+    df = generate_frame(spec)
+    paths = {}
+    for fmt in formats:
+        fmt_directory = os.path.join(directory, fmt)
+        os.makedirs(fmt_directory, exist_ok=True)
+        path = os.path.join(fmt_directory, f"{name}.{fmt}")
+        WRITERS[fmt](df, path)
+        paths[fmt] = path
+    return paths
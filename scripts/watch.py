@@ -0,0 +1,174 @@
+import os
+import time
+
+from scripts.cache import MANIFEST_NAME, Manifest
+from scripts.convert_to_csv import convert_excel_to_csv, xml_to_csv
+from scripts.data_processing import process_and_generate_report
+from scripts.datasets import is_dataset
+from scripts.paths import find_directory
+
+# Files still being written by the ingest, or left behind by editors
+IGNORED_PREFIXES = (".", "~$")
+IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload")
+
+
+def snapshot(directory):
+    """
+    Returns the size and mtime of every file directly in a directory, skipping hidden
+    and partially written files. Comparing two snapshots costs one `stat` per file.
+    """
+    files = {}
+    for entry in os.scandir(directory):
+        if entry.name.startswith(IGNORED_PREFIXES) or entry.name.endswith(IGNORED_SUFFIXES):
+            continue
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            continue
+    return files
+
+
+def changed_files(before, after):
+    """
+    Returns the files added, modified or removed between two snapshots.
+    """
+    return sorted(path for path in before.keys() | after.keys() if before.get(path) != after.get(path))
+
+
+def export_kind(files):
+    """
+    Returns "xml" or "excel" for a directory of raw exports, or None for a directory of
+    CSV, Parquet or Feather datasets.
+    """
+    if any(path.endswith(".xml") for path in files):
+        return "xml"
+    if any(path.endswith((".xls", ".xlsx")) for path in files):
+        return "excel"
+    return None
+
+
+def prune_outputs(output_directory):
+    """
+    Removes the converted files of exports that were deleted, so they also leave the report.
+
+    Returns:
+        list: Paths of the removed files.
+    """
+    manifest = Manifest(os.path.join(output_directory, MANIFEST_NAME))
+    removed = []
+    for input_path in [path for path in manifest.entries if not os.path.exists(path)]:
+        for output in manifest.entries[input_path]["outputs"]:
+            if os.path.exists(output):
+                os.remove(output)
+                removed.append(output)
+        manifest.invalidate(input_path)
+    if removed:
+        manifest.save()
+        for output in removed:
+            print(f"Removed output of deleted export: {output}")
+    return removed
+
+
+def default_output_directory(directory):
+    """
+    Returns where the exports of a directory are converted by default: `<name>_csv` in
+    the data directory, next to the other datasets, so that `data/exports` converts to
+    `data/exports_csv` and watching `data` itself does not write outside of it.
+    """
+    name = os.path.basename(os.path.normpath(os.path.abspath(directory)))
+    return os.path.join(find_directory("data"), f"{name}_csv")
+
+
+def rebuild(directory, output_directory=None, workers=1, **report_options):
+    """
+    Brings the report of a directory up to date. Raw exports are converted first, then
+    the report is built from the converted directory. Conversions and report sections
+    are cached by content, so only new and changed files are converted, profiled and
+    rendered; the summary and the final PDF are then assembled from cached parts.
+
+    Parameters:
+        directory (str): Directory of XML or Excel exports, or of CSV, Parquet or Feather files.
+        output_directory (str): Optional directory for converted exports, see `default_output_directory`.
+        workers (int): Number of processes for conversions and PDF rendering. 0 uses every core.
+        **report_options: Extra options for `process_and_generate_report`.
+
+    Returns:
+        str: Path of the PDF report.
+    """
+    kind = export_kind(snapshot(directory))
+    report_input = directory
+    if kind is not None:
+        report_input = output_directory or default_output_directory(directory)
+        os.makedirs(report_input, exist_ok=True)
+        prune_outputs(report_input)
+        if kind == "xml":
+            xml_to_csv(directory, report_input, workers=workers)
+        else:
+            convert_excel_to_csv(directory, report_input, workers=workers)
+
+    if not any(is_dataset(path) for path in snapshot(report_input)):
+        print(f"No datasets in {report_input} yet, waiting for files.")
+        return None
+    return process_and_generate_report(report_input, workers=workers, **report_options)
+
+
+def watch(directory=None, output_directory=None, interval=2.0, debounce=5.0, workers=1, **report_options):
+    """
+    Watches a directory and rebuilds its report whenever files are added, changed or
+    removed. Runs until interrupted.
+
+    The directory is polled every `interval` seconds. A burst of changes, such as an
+    ingest copying many exports, is handled as one batch once no file has changed for
+    `debounce` seconds, so files are never read while they are still being written.
+    Each rebuild only does the work of the changed files, see `rebuild`.
+
+    Parameters:
+        directory (str): Directory to watch (default: the `data` directory found by `find_directory`).
+        output_directory (str): Optional directory for converted exports, see `default_output_directory`.
+        interval (float): Seconds between polls.
+        debounce (float): Seconds without changes before a batch is rebuilt.
+        workers (int): Number of processes for conversions and PDF rendering. 0 uses every core.
+        **report_options: Extra options for `process_and_generate_report`, e.g. `chart_backend`.
+    """
+    directory = directory or find_directory("data")
+    if not os.path.isdir(directory):
+        raise ValueError(f"The directory '{directory}' does not exist or is not a directory.")
+
+    print(f"Watching {directory} (polling every {interval:g}s, rebuilding after {debounce:g}s without changes)")
+    built = {}
+    current = snapshot(directory)
+    try:
+        while True:
+            if current != built:
+                changes = changed_files(built, current)
+                start = time.perf_counter()
+                try:
+                    rebuild(directory, output_directory, workers=workers, **report_options)
+                    print(f"Rebuilt after {len(changes)} changed files in {time.perf_counter() - start:.2f}s")
+                except Exception as e:
+                    print(f"Error rebuilding the report of {directory}: {e}")
+                built = current
+
+            # Wait for a change, then for the directory to settle
+            while (current := snapshot(directory)) == built:
+                time.sleep(interval)
+            settled_since = time.monotonic()
+            while time.monotonic() - settled_since < debounce:
+                time.sleep(interval)
+                latest = snapshot(directory)
+                if latest != current:
+                    current = latest
+                    settled_since = time.monotonic()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from scripts.cli import main
+
+    # Same options as `python -m scripts watch`
+    main(["watch", *sys.argv[1:]])
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from scripts import cache
+from scripts.cache import Manifest
+
+SETTINGS = {"converter": "xml", "formats": ["csv"]}
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    input_path, output_path = tmp_path / "objects.xml", tmp_path / "objects.csv"
+    input_path.write_text("<export/>")
+    output_path.write_text("id\n")
+    manifest = Manifest(str(tmp_path / cache.MANIFEST_NAME))
+    manifest.record(str(input_path), SETTINGS, [str(output_path)])
+    manifest.save()
+    return str(input_path), str(output_path), Manifest(manifest.path)
+
+
+def touch(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+def test_unchanged_input_is_a_hit(recorded):
+    input_path, output_path, manifest = recorded
+    assert manifest.lookup(input_path, SETTINGS)["outputs"] == [output_path]
+
+
+def test_touched_but_unmodified_input_is_a_hit(recorded):
+    input_path, _, manifest = recorded
+    touch(input_path)
+    assert manifest.lookup(input_path, SETTINGS) is not None
+
+
+def test_changed_content_settings_or_outputs_are_misses(recorded):
+    input_path, output_path, manifest = recorded
+    assert manifest.lookup(input_path, {**SETTINGS, "formats": ["parquet"]}) is None
+
+    with open(input_path, "w") as file:
+        file.write("<EXPORT/>")
+    touch(input_path)
+    assert manifest.lookup(input_path, SETTINGS) is None
+
+    manifest.record(input_path, SETTINGS, [output_path])
+    os.remove(output_path)
+    assert manifest.lookup(input_path, SETTINGS) is None
+
+
+def test_a_miss_hashes_the_input_once(recorded, monkeypatch):
+    input_path, output_path, manifest = recorded
+    with open(input_path, "w") as file:
+        file.write("<EXPORT/>")
+    touch(input_path)
+
+    hashed = []
+    monkeypatch.setattr(cache, "hash_file", lambda path: hashed.append(path) or "digest")
+    assert manifest.lookup(input_path, SETTINGS) is None
+    manifest.record(input_path, SETTINGS, [output_path])
+    assert hashed == [input_path] and manifest.content_hash(input_path) == "digest"
@@ -0,0 +1,93 @@
+import datetime
+import hashlib
+import re
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from scripts.convert_to_csv import convert_excel_file, convert_xml_file, iter_excel_sheets, stream_sheet_to_csv
+from scripts.synthetic import GREMLIN_CHARS, DatasetSpec, generate_dataset
+
+
+@pytest.fixture(scope="module")
+def exports(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("exports")
+    spec = DatasetSpec(rows=300, columns=12, gremlin_rate=0.05, seed=3)
+    return generate_dataset(str(directory), spec, formats=("xml", "xlsx"))
+
+
+def test_xml_streaming_matches_dataframe(exports, tmp_path):
+    streamed, loaded = tmp_path / "streamed.csv", tmp_path / "loaded.csv"
+    assert convert_xml_file(exports["xml"], str(streamed), streaming=True)["status"] == "converted"
+    assert convert_xml_file(exports["xml"], str(loaded), streaming=False)["status"] == "converted"
+    assert streamed.read_text(encoding="utf-8") == loaded.read_text(encoding="utf-8")
+
+
+def test_xml_streaming_widens_the_header_to_later_columns(exports, tmp_path):
+    # The first data record has missing values, so its batch of one writes a narrower header
+    streamed, loaded = tmp_path / "streamed.csv", tmp_path / "loaded.csv"
+    assert convert_xml_file(exports["xml"], str(streamed), batch_size=1)["status"] == "converted"
+    assert convert_xml_file(exports["xml"], str(loaded), streaming=False)["status"] == "converted"
+    assert streamed.read_text(encoding="utf-8") == loaded.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_gremlin_filtering_leaves_the_input_unchanged(exports, tmp_path, streaming):
+    with open(exports["xml"], "rb") as file:
+        before = hashlib.sha256(file.read()).hexdigest()
+    result = convert_xml_file(exports["xml"], str(tmp_path / "objects.csv"), streaming=streaming)
+    assert result["status"] == "converted" and result["gremlins"] > 0
+    text = (tmp_path / "objects.csv").read_text(encoding="utf-8")
+    assert not any(char in text for char in GREMLIN_CHARS)
+    with open(exports["xml"], "rb") as file:
+        assert hashlib.sha256(file.read()).hexdigest() == before
+
+
+def test_excel_streaming_matches_pandas_values(exports, tmp_path):
+    streamed, loaded = tmp_path / "streamed.csv", tmp_path / "loaded.csv"
+    assert convert_excel_file(exports["xlsx"], str(streamed), streaming=True)["status"] == "converted"
+    assert convert_excel_file(exports["xlsx"], str(loaded), streaming=False)["status"] == "converted"
+    # Whole numbers of float columns are written "6581" by the stream and "6581.0" by
+    # pandas, see `stream_sheet_to_csv`, but they read back as the same values
+    pd.testing.assert_frame_equal(pd.read_csv(streamed), pd.read_csv(loaded))
+
+
+def test_excel_streaming_takes_a_blank_first_row_as_header(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append([])
+    sheet.append(["id", "name", "acquired"])
+    sheet.append([1, "vase", datetime.datetime(2020, 1, 1, 12, 30)])
+    sheet.append([2, "bowl", None])
+    path = tmp_path / "blank.xlsx"
+    workbook.save(path)
+
+    csv_path = tmp_path / "blank.csv"
+    for _, rows in iter_excel_sheets(str(path), "openpyxl"):
+        assert stream_sheet_to_csv(rows, str(csv_path)) == 3
+    expected = pd.read_excel(path, engine="openpyxl")
+    streamed = pd.read_csv(csv_path)
+    assert list(streamed.columns) == list(expected.columns) == ["Unnamed: 0", "Unnamed: 1", "Unnamed: 2"]
+    assert streamed.iloc[0].tolist() == ["id", "name", "acquired"]
+
+
+def test_excel_streaming_ignores_a_wrong_sheet_dimension(tmp_path):
+    workbook = openpyxl.Workbook()
+    for row in [["id", "name", "count"], [1, "vase", 2], [2, "bowl", 3]]:
+        workbook.active.append(row)
+    workbook.save(tmp_path / "saved.xlsx")
+
+    # Declare a range smaller than the cells of the sheet, as some exporters do
+    path = tmp_path / "dimension.xlsx"
+    with zipfile.ZipFile(tmp_path / "saved.xlsx") as source, zipfile.ZipFile(path, "w") as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"/>', b'<dimension ref="A1:B2"/>', data)
+            target.writestr(item, data)
+
+    csv_path = tmp_path / "dimension.csv"
+    assert convert_excel_file(str(path), str(csv_path), streaming=True)["status"] == "converted"
+    pd.testing.assert_frame_equal(pd.read_csv(csv_path), pd.read_excel(path, engine="openpyxl"))
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.datasets import list_datasets, read_columns, read_dataset, read_view, write_dataset, write_view
+from scripts.paths import dataset_name
+
+FRAME = pd.DataFrame({"id": [1, 2, 3], "title": ["vase", "bowl", "cup"], "empty": [None, None, None]})
+
+
+@pytest.fixture
+def view(tmp_path):
+    source_path = str(tmp_path / "objects.csv")
+    FRAME.to_csv(source_path, index=False)
+    path = str(tmp_path / "dropped" / "objects_dropped.columns.json")
+    os.makedirs(os.path.dirname(path))
+    write_view(path, source_path, ["id", "title"], ["empty"], row_count=3)
+    return path, source_path
+
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_view_reads_as_the_projection_of_its_dataset(view):
+    path, source_path = view
+    recorded = read_view(path)
+    assert recorded["source"] == os.path.abspath(source_path)
+    assert (recorded["columns"], recorded["dropped_columns"], recorded["row_count"]) == (["id", "title"], ["empty"], 3)
+    assert read_columns(path) == ["id", "title"]
+    pd.testing.assert_frame_equal(read_dataset(path), FRAME[["id", "title"]])
+    pd.testing.assert_frame_equal(read_dataset(path, columns=["title"]), FRAME[["title"]])
+
+
+def test_view_refuses_a_column_it_does_not_keep(view):
+    with pytest.raises(ValueError):
+        read_dataset(view[0], columns=["empty"])
+
+
+def test_view_of_a_changed_or_missing_dataset_is_not_read(view):
+    path, source_path = view
+    FRAME.iloc[:2].to_csv(source_path, index=False)
+    with pytest.raises(ValueError, match="changed"):
+        read_view(path)
+    os.remove(source_path)
+    with pytest.raises(ValueError, match="missing"):
+        read_view(path)
+
+
+def test_dataset_name_strips_the_whole_extension():
+    assert [dataset_name(path) for path in ("a/objects.csv", "objects.csv.gz", "b/objects.columns.json")] == \
+        ["objects"] * 3
+
+
+def test_list_datasets_prefers_columnar_copies(tmp_path):
+    for extension in (".csv", ".parquet"):
+        write_dataset(FRAME, str(tmp_path / f"objects{extension}"))
+    assert list_datasets(str(tmp_path)) == [str(tmp_path / "objects.parquet")]
+
+
+@pytest.mark.parametrize("newer", ["objects.columns.json", "objects.csv"])
+def test_list_datasets_prefers_the_newer_of_a_view_and_a_copy(view, newer):
+    path, source_path = view
+    directory = os.path.dirname(path)
+    write_view(os.path.join(directory, "objects.columns.json"), source_path, ["id"])
+    write_dataset(FRAME, os.path.join(directory, "objects.csv"))
+    set_mtime(os.path.join(directory, "objects.columns.json"), 1000)
+    set_mtime(os.path.join(directory, "objects.csv"), 1000)
+    set_mtime(os.path.join(directory, newer), 2000)
+    assert sorted(list_datasets(directory)) == sorted([path, os.path.join(directory, newer)])
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from scripts.normalize import normalize_column, suggest_clusters, variant_lookup
+
+LOOKUP = variant_lookup({"3-D": ["3 - D", "3D"], "Textile": ["Texile"]})
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_normalize_column_replaces_variants(dtype):
+    series = pd.Series(["3D", "Textile", None, "Texile", "3 - D", "Paper"], dtype=dtype, name="material")
+    normalized, replaced = normalize_column(series, LOOKUP)
+    assert replaced == 3
+    assert normalized.tolist()[:2] == ["3-D", "Textile"] and pd.isna(normalized.iloc[2])
+    assert normalized.tolist()[3:] == ["Textile", "3-D", "Paper"]
+    assert normalized.name == "material"
+    assert isinstance(normalized.dtype, pd.CategoricalDtype) == (dtype == "category")
+
+
+def test_normalize_column_leaves_a_column_without_variants_alone():
+    series = pd.Series(["Paper", "Wood"])
+    normalized, replaced = normalize_column(series, LOOKUP)
+    assert replaced == 0 and normalized is series
+
+
+def test_variant_listed_twice_is_rejected():
+    with pytest.raises(ValueError):
+        variant_lookup({"3-D": ["3D"], "Three-D": ["3D"]})
+
+
+def test_suggest_clusters_groups_variants_by_method():
+    series = pd.Series(["Textile"] * 5 + ["Texile"] * 2 + ["3-D"] * 4 + ["3D", "3 - D"]
+                       + ["Linen, Handkerchief", "handkerchief linen"] + ["Paper"] * 3 + [None])
+    clusters = {cluster.canonical: cluster for cluster in suggest_clusters(series)}
+    assert set(clusters) == {"Textile", "3-D", "Linen, Handkerchief"}
+    assert clusters["Textile"].values == {"Textile": 5, "Texile": 2} and clusters["Textile"].methods == ["edit"]
+    assert sorted(clusters["3-D"].variants) == ["3 - D", "3D"] and "ngram" in clusters["3-D"].methods
+    assert "fingerprint" in clusters["Linen, Handkerchief"].methods
+
+
+def test_suggest_clusters_only_uses_the_methods_asked_for():
+    series = pd.Series(["Textile", "Textile", "Texile", "3-D", "3D"])
+    clusters = suggest_clusters(series, methods=("fingerprint",))
+    assert clusters == []
+    assert [cluster.canonical for cluster in suggest_clusters(series, methods=("edit",))] == ["Textile"]
@@ -0,0 +1,115 @@
+import functools
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import preview
+from scripts.datasets import iter_dataset_chunks
+from scripts.preview import PreviewProfile, proportion_interval, seek_sample, stream_sample
+
+ROWS = 20000
+GROUPS = 40
+
+
+@pytest.fixture(scope="module")
+def known_csv(tmp_path_factory):
+    # Titles, the index column, run over several lines on every other row and notes on every
+    # fifth row, the only rows with a note: lines inside a value often parse as rows too
+    rng = np.random.default_rng(2)
+    index = np.arange(ROWS)
+    df = pd.DataFrame({
+        "title": [f"title {i}" if i % 2 else "\n".join(f"line {k} of {i}" for k in range(rng.integers(2, 6)))
+                  for i in index],
+        "group": [f"g{i % GROUPS}" for i in index],
+        "year": rng.integers(1800, 2000, ROWS),
+        "note": [f"note\n{i}" if i % 5 == 0 else None for i in index],
+    })
+    path = tmp_path_factory.mktemp("preview") / "known.csv"
+    df.to_csv(path, index=False)
+    return str(path), pd.read_csv(path, index_col=0)
+
+
+def deadline(seconds=60):
+    return time.perf_counter() + seconds
+
+
+def test_stream_sample_of_a_small_file_is_exact(known_csv):
+    path, full = known_csv
+    sample = stream_sample(path, ROWS, deadline(), np.random.default_rng(0))
+    assert sample.exact and sample.row_count.exact and sample.row_count.value == ROWS
+    pd.testing.assert_frame_equal(sample.frame, full.loc[sample.frame.index])
+
+
+def test_stream_sample_reads_no_chunk_after_the_deadline(known_csv, monkeypatch):
+    path, _ = known_csv
+    chunks = []
+
+    def read_chunks(*args, **kwargs):
+        for chunk in iter_dataset_chunks(*args, **kwargs):
+            chunks.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(preview, "iter_dataset_chunks", read_chunks)
+    # A chunk shorter than `chunksize` is the last one, so the sample is complete
+    sample = stream_sample(path, 1000, time.perf_counter() - 1, np.random.default_rng(0), chunksize=ROWS + 1)
+    assert sample.complete and sample.rows_read == ROWS
+    assert sample.row_count.exact and sample.row_count.value == ROWS
+
+    sample = stream_sample(path, 1000, time.perf_counter() - 1, np.random.default_rng(0), chunksize=ROWS // 2)
+    assert not sample.complete and sample.rows_read == ROWS // 2
+    assert sample.row_count.low == ROWS // 2 and sample.row_count.high is None
+    assert chunks == [ROWS, ROWS // 2]
+
+
+def test_stream_fallback_only_gets_the_time_left(known_csv, monkeypatch):
+    path, _ = known_csv
+
+    def fail(*args):
+        # Uses up the time of the file before failing
+        time.sleep(0.2)
+        raise ValueError("no row start")
+
+    monkeypatch.setattr(preview, "SEEK_MIN_BYTES", 0)
+    monkeypatch.setattr(preview, "seek_sample", fail)
+    monkeypatch.setattr(preview, "stream_sample", functools.partial(stream_sample, chunksize=ROWS // 4))
+    sample = preview.sample_dataset(path, 1000, time.perf_counter() + 0.1, np.random.default_rng(0), method="auto")
+    assert sample.method == "stream" and sample.rows_read == ROWS // 4
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_seek_sample_only_draws_rows_of_the_file(known_csv, seed):
+    path, full = known_csv
+    sample = seek_sample(path, 2000, deadline(), np.random.default_rng(seed))
+    assert len(sample.frame) == 2000 and sample.frame.index.is_unique
+    pd.testing.assert_frame_equal(sample.frame, full.loc[sample.frame.index])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_seek_row_count_interval_covers_the_row_count(known_csv, seed):
+    path, _ = known_csv
+    row_count = seek_sample(path, 2000, deadline(), np.random.default_rng(seed)).row_count
+    assert row_count.low <= ROWS <= row_count.high
+    assert row_count.value == pytest.approx(ROWS, rel=0.05)
+
+
+def test_preview_estimates_cover_known_values(known_csv):
+    path, _ = known_csv
+    preview = PreviewProfile.from_sample(path, seek_sample(path, 4000, deadline(), np.random.default_rng(1)))
+    columns = {column.name: column for column in preview.columns}
+
+    null_rate = columns["note"].null_rate
+    assert null_rate.low <= 0.8 <= null_rate.high
+    group = columns["group"].distinct
+    assert group.low <= GROUPS <= group.high and group.value == pytest.approx(GROUPS, abs=1)
+    # Every note is distinct: the estimate must not stop at the notes seen
+    note = columns["note"].distinct
+    assert note.low <= ROWS // 5 + 1 <= note.high and note.value > 2 * note.low
+
+
+def test_proportion_interval_is_not_empty_at_the_bounds():
+    low, high = proportion_interval(0.0, 100)
+    assert low == 0.0 and 0.0 < high < 0.05
+    low, high = proportion_interval(1.0, 100)
+    assert 0.95 < low < 1.0 and high == 1.0
@@ -0,0 +1,67 @@
+import pytest
+
+from scripts.profile_store import ProfileStore, diff_runs, write_diff_report
+
+
+def column(name, dtype="object", non_null=10, distinct=5, exact=True):
+    return {"name": name, "dtype": dtype, "non_null_count": non_null, "null_count": 10 - non_null,
+            "distinct_count": distinct, "has_zeros": False, "distinct_exact": exact, "distinct_error": 0.0}
+
+
+def profile(*columns, rows=10):
+    return {"path": "objects.csv", "row_count": rows, "empty_row_count": 0, "columns": list(columns)}
+
+
+OLD = profile(column("id", "int64", distinct=10), column("title"), column("width", "float64"), column("maker"),
+              column("note", non_null=0, distinct=1))
+NEW = profile(column("id", "int16", distinct=12), column("title", distinct=8), column("width"),
+              column("maker", non_null=0, distinct=1), column("note"), column("place"), rows=12)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ProfileStore(str(tmp_path / "profiles.sqlite")) as store:
+        yield store
+
+
+def test_diff_runs_reports_the_changes_between_runs(store):
+    old_id = store.record_run("exports", "data/exports", [("objects.csv", "a", OLD), ("places.csv", "b", OLD)])
+    new_id = store.record_run("exports", "data/exports", [("objects.csv", "c", NEW), ("people.csv", "d", NEW)])
+    diff = diff_runs(store.load_run(old_id), store.load_run(new_id))
+
+    assert (diff["added_files"], diff["removed_files"]) == (["people.csv"], ["places.csv"])
+    file_diff = diff["files"]["objects.csv"]
+    assert file_diff["changed"] and (file_diff["old_rows"], file_diff["new_rows"]) == (10, 12)
+    assert (file_diff["added_columns"], file_diff["removed_columns"]) == (["place"], [])
+    assert (file_diff["newly_dropped"], file_diff["no_longer_dropped"]) == (["maker"], ["note"])
+    # int64 to int16 is the same logical type, float64 to object is not
+    assert file_diff["type_changes"] == [{"column": "width", "old": "float", "new": "text"}]
+    assert [(shift["column"], shift["old"], shift["new"]) for shift in file_diff["cardinality"]] == \
+        [("note", 1, 5), ("maker", 5, 1), ("title", 5, 8), ("id", 10, 12)]
+
+
+def test_unchanged_files_are_not_reported_as_changed(store):
+    old_id = store.record_run("exports", "data/exports", [("objects.csv", "a", OLD)])
+    new_id = store.record_run("exports", "data/exports", [("objects.csv", "a", OLD)])
+    file_diff = diff_runs(store.load_run(old_id), store.load_run(new_id))["files"]["objects.csv"]
+    assert not file_diff["changed"] and not file_diff["cardinality"] and not file_diff["type_changes"]
+
+
+def test_only_the_last_runs_of_a_dataset_are_kept(store):
+    other = store.record_run("places", "data/places", [("places.csv", "p", OLD)])
+    ids = [store.record_run("exports", "data/exports", [("objects.csv", str(n), OLD)], keep=3) for n in range(5)]
+    assert [run["id"] for run in store.runs("exports")] == ids[-3:]
+    assert [run["id"] for run in store.runs("places")] == [other]
+    assert store.find_profile("0") is None and store.find_profile("4")["row_count"] == 10
+    remaining = store.connection.execute("SELECT COUNT(*) FROM columns WHERE run_id = ?", (ids[0],)).fetchone()[0]
+    assert remaining == 0
+
+
+def test_diff_report_of_the_last_two_runs(store, tmp_path):
+    store.record_run("exports", "data/exports", [("objects.csv", "a", OLD)])
+    store.record_run("exports", "data/exports", [("objects.csv", "c", NEW)])
+    path = write_diff_report(store.path, dataset="exports", output_path=str(tmp_path / "diff.html"))
+    html = open(path, encoding="utf-8").read()
+    assert "Changes from exports to exports" in html and "width (float &rarr; text)" in html
+    with pytest.raises(ValueError):
+        write_diff_report(store.path, dataset="places")
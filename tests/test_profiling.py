@@ -0,0 +1,99 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import profiling
+from scripts.datasets import csv_shard_offsets
+from scripts.profiling import DatasetProfile, accumulate_csv_shards
+from scripts.synthetic import DatasetSpec, generate_dataset
+
+# Fields compared between profiles; dtypes differ by design, chunks being typed on their own
+COUNT_FIELDS = ("name", "non_null_count", "null_count", "distinct_count", "has_zeros")
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("datasets")
+    spec = DatasetSpec(rows=5000, columns=15, null_density=0.3, cardinality=50, seed=7)
+    return generate_dataset(str(directory), spec, formats=("csv",))["csv"]
+
+
+def counts(profile):
+    return [tuple(getattr(column, key) for key in COUNT_FIELDS) for column in profile.columns]
+
+
+def test_chunked_profile_matches_whole_file(csv_path):
+    whole = DatasetProfile.from_dataframe(pd.read_csv(csv_path, index_col=0, low_memory=False), csv_path)
+    chunked = DatasetProfile.from_chunks(csv_path, 700)
+    assert (chunked.row_count, chunked.empty_row_count) == (whole.row_count, whole.empty_row_count)
+    assert counts(chunked) == counts(whole)
+    assert all(column.distinct_exact for column in chunked.columns)
+
+
+def test_estimated_distinct_counts_are_flagged(csv_path):
+    whole = DatasetProfile.from_dataframe(pd.read_csv(csv_path, index_col=0, low_memory=False), csv_path)
+    estimated = DatasetProfile.from_chunks(csv_path, 1000, distinct_threshold=100, precision=12)
+    for exact, column in zip(whole.columns, estimated.columns):
+        if column.distinct_exact:
+            assert column.distinct_count == exact.distinct_count
+        else:
+            assert column.distinct_count == pytest.approx(exact.distinct_count, rel=5 * column.distinct_error)
+    assert not all(column.distinct_exact for column in estimated.columns)
+
+
+@pytest.fixture(scope="module")
+def multiline_csv(tmp_path_factory):
+    # Titles run over several lines on every other row, so many lines inside them start with
+    # text that also parses as a row
+    rng = np.random.default_rng(2)
+    index = np.arange(20000)
+    df = pd.DataFrame({
+        "id": index,
+        "title": [f"title {i}" if i % 2 else "\n".join(f"line {k} of {i}" for k in range(rng.integers(2, 6)))
+                  for i in index],
+        "year": rng.integers(1800, 2000, len(index)),
+        "note": [f"note\n{i}" if i % 5 == 0 else None for i in index],
+    })
+    path = tmp_path_factory.mktemp("multiline") / "multiline.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(profiling, "MIN_SHARD_BYTES", 16 << 10)
+
+
+@pytest.mark.parametrize("dataset", ["csv_path", "multiline_csv"])
+def test_sharded_profile_matches_single_pass(small_shards, request, dataset):
+    path = request.getfixturevalue(dataset)
+    single = DatasetProfile.from_chunks(path, 700)
+    sharded = accumulate_csv_shards(path, 700, workers=3)
+    assert sharded is not None
+    assert sharded.to_profile().to_dict() == single.to_dict()
+
+
+def test_shards_start_on_rows(multiline_csv):
+    offsets = csv_shard_offsets(multiline_csv, 40)
+    assert len(offsets) == 40 and offsets[0] == 0
+    with open(multiline_csv, "rb") as csv_file:
+        data = csv_file.read()
+    parsed = pd.read_csv(multiline_csv, index_col=0)
+    for start, end in zip(offsets[1:], offsets[2:] + [len(data)]):
+        shard = pd.read_csv(io.BytesIO(data[start:end]), header=None, names=["id", *parsed.columns],
+                            index_col=0)
+        pd.testing.assert_frame_equal(shard, parsed.loc[shard.index], check_dtype=False)
+
+
+def test_split_inside_a_quoted_value_falls_back(small_shards, multiline_csv, monkeypatch):
+    with open(multiline_csv, "rb") as csv_file:
+        data = csv_file.read()
+    inside = data.index(b"line 1 of ", len(data) // 2)
+    monkeypatch.setattr(profiling, "csv_shard_offsets", lambda path, count: [0, inside])
+    assert accumulate_csv_shards(multiline_csv, 700, workers=2) is None
+
+
+def test_small_files_are_not_sharded(csv_path):
+    assert accumulate_csv_shards(csv_path, 700, workers=2) is None
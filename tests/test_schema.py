@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.schema import load_dataset, load_schema, save_schema
+
+COLUMNS = {"material": "category"}
+
+
+@pytest.fixture
+def saved(tmp_path):
+    path = tmp_path / "objects.csv"
+    path.write_text("id,material\n1,wood\n2,wood\n3,paper\n")
+    schema_dir = str(tmp_path / "schemas")
+    save_schema(schema_dir, str(path), COLUMNS)
+    return schema_dir, str(path)
+
+
+def test_saved_schema_is_reused_while_the_file_is_unchanged(saved):
+    schema_dir, path = saved
+    assert load_schema(schema_dir, path) == COLUMNS
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_schema(schema_dir, path) == COLUMNS
+
+
+@pytest.mark.parametrize("content", [
+    "id,material\n1,wood\n2,wood\n3,paper\n4,silk\n",
+    "id,material\n1,wood\n2,iron\n3,paper\n",
+])
+def test_saved_schema_is_ignored_once_the_content_changes(saved, content):
+    schema_dir, path = saved
+    stat = os.stat(path)
+    with open(path, "w") as file:
+        file.write(content)
+    # The second content has the same size, only its hash tells it apart
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_schema(schema_dir, path) == {}
+
+
+def test_load_dataset_saves_and_reuses_the_schema(tmp_path):
+    path = tmp_path / "objects.csv"
+    pd.DataFrame({"id": range(1000), "material": ["wood", "paper"] * 500}).to_csv(path, index=False)
+    schema_dir = str(tmp_path / "schemas")
+    first = load_dataset(str(path), schema_dir=schema_dir)
+    assert load_schema(schema_dir, str(path)).get("material") == "category"
+    pd.testing.assert_frame_equal(load_dataset(str(path), schema_dir=schema_dir), first)
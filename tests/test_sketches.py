@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.sketches import DistinctCounter, HyperLogLog, hash_values
+
+
+def hashes(start, stop):
+    return hash_values(pd.Series(np.arange(start, stop)))
+
+
+def test_hash_values_match_across_integer_and_float_chunks():
+    assert (hash_values(pd.Series([1, 2, 3])) == hash_values(pd.Series([1.0, 2.0, 3.0]))).all()
+
+
+def test_merged_sketches_estimate_the_union():
+    left, right = HyperLogLog(precision=12), HyperLogLog(precision=12)
+    left.update(hashes(0, 60000))
+    right.update(hashes(40000, 100000))
+    left.merge(right)
+    assert left.estimate() == pytest.approx(100000, rel=5 * left.relative_error)
+
+
+def test_sketches_of_different_precisions_do_not_merge():
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=12).merge(HyperLogLog(precision=14))
+
+
+def test_exact_counters_merge_exactly():
+    left, right = DistinctCounter(threshold=1000), DistinctCounter(threshold=1000)
+    left.update(hashes(0, 400))
+    right.update(hashes(200, 600))
+    left.merge(right)
+    assert left.is_exact and left.count() == 600
+
+
+@pytest.mark.parametrize("left_stop, right_stop", [(400, 5000), (5000, 400), (5000, 5000), (900, 900)])
+def test_merged_counters_stay_exact_up_to_the_threshold(left_stop, right_stop):
+    # Both counters count from 0, so the union has max(left_stop, right_stop) distinct values
+    left, right = DistinctCounter(threshold=1000, precision=12), DistinctCounter(threshold=1000, precision=12)
+    left.update(hashes(0, left_stop))
+    right.update(hashes(0, right_stop))
+    left.merge(right)
+    expected = max(left_stop, right_stop)
+    if expected <= 1000:
+        assert left.is_exact and left.count() == expected
+    else:
+        assert not left.is_exact
+        assert left.count() == pytest.approx(expected, rel=5 * left.relative_error)
@@ -0,0 +1,39 @@
+import os
+import shutil
+
+import pytest
+
+from scripts.cache import MANIFEST_NAME, Manifest
+from scripts.convert_to_csv import xml_to_csv
+from scripts.synthetic import DatasetSpec, generate_dataset
+from scripts.watch import changed_files, prune_outputs, snapshot
+
+
+@pytest.fixture
+def converted(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    xml_path = generate_dataset(str(tmp_path), DatasetSpec(rows=50, columns=5, seed=1), formats=("xml",))["xml"]
+    for name in ("objects", "places"):
+        shutil.copy(xml_path, exports / f"{name}.xml")
+    output_directory = str(tmp_path / "exports_csv")
+    xml_to_csv(str(exports), output_directory)
+    return exports, output_directory
+
+
+def test_prune_outputs_removes_the_outputs_of_deleted_exports(converted):
+    exports, output_directory = converted
+    os.remove(exports / "objects.xml")
+
+    removed = prune_outputs(output_directory)
+    assert removed == [os.path.join(output_directory, "objects.csv")]
+    assert sorted(os.listdir(output_directory)) == [".conversion_metrics.json", MANIFEST_NAME, "places.csv"]
+    manifest = Manifest(os.path.join(output_directory, MANIFEST_NAME))
+    assert list(manifest.entries) == [os.path.abspath(exports / "places.xml")]
+
+
+def test_prune_outputs_keeps_everything_while_the_exports_exist(converted):
+    _, output_directory = converted
+    before = snapshot(output_directory)
+    assert prune_outputs(output_directory) == []
+    assert changed_files(before, snapshot(output_directory)) == []